@@ -11,9 +11,12 @@
 """
 
 from bluepy.btle import Scanner, DefaultDelegate, BTLEException
+import importlib
 import logging
+import os
 import sys
 import time
+import types
 
 # -----------------------------------------------
 # Настройки логирования
@@ -26,11 +29,22 @@ logging.basicConfig(
 _LOGGER = logging.getLogger("BTScan")
 
 # -----------------------------------------------
-# Ключевые слова для фильтрации устройств
+# Поддерживаемые модели — из реестра интеграции (models.py),
+# загружаемого как в elkbledom_cli.py, минуя __init__.py с Home Assistant
 # -----------------------------------------------
-TARGET_NAMES = [
-    "ELK-BLE", "ELK-BLEDDM", "LEDBLE", "MELK", "ELK-BULB", "ELK-LAMPL"
-]
+PACKAGE = "elkbledom_fastlink"
+CORE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "custom_components", PACKAGE)
+
+
+def load_models(path: str = CORE_DIR) -> types.ModuleType:
+    if PACKAGE not in sys.modules:
+        package = types.ModuleType(PACKAGE)
+        package.__path__ = [path]
+        sys.modules[PACKAGE] = package
+    return importlib.import_module(f"{PACKAGE}.models")
+
+
+models = load_models()
 
 # -----------------------------------------------
 # Обработчик событий сканирования
@@ -80,7 +94,7 @@ class BluetoothScanner:
                     break
 
             target_flag = ""
-            if name and any(key.lower() in name.lower() for key in TARGET_NAMES):
+            if name and models.is_supported_name(name):
                 target_flag = "⭐"
             elif name is None:
                 name = "(Без имени)"
@@ -1,20 +1,48 @@
 from __future__ import annotations
 
 import logging
-from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant, Event
-from homeassistant.const import CONF_MAC, EVENT_HOMEASSISTANT_STOP, Platform
+from datetime import timedelta
 
-from .const import DOMAIN, CONF_RESET, CONF_DELAY
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant, Event, callback
+from homeassistant.const import CONF_MAC, CONF_PORT, CONF_PROTOCOL, EVENT_HOMEASSISTANT_STOP, Platform
+from homeassistant.exceptions import ConfigEntryNotReady
+from homeassistant.helpers.event import async_track_time_interval
+from homeassistant.util import dt as dt_util
+
+from .const import (
+    DOMAIN,
+    CONF_RESET,
+    CONF_DELAY,
+    CONF_BRIGHTNESS_MODE,
+    CONF_CIRCADIAN,
+    CONF_VIRTUAL,
+    CONF_MEMBERS,
+    CONF_REALTIME,
+    CONF_UNIVERSE,
+    CONF_START_CHANNEL,
+    DEFAULT_BRIGHTNESS_MODE,
+)
+from .adapter import create_instance, instance_lookup
+from .circadian import CIRCADIAN_INTERVAL, CircadianEngine, CircadianSettings
 from .elkbledom import BLEDOMInstance
+from .realtime import RealtimeReceiver
+from .services import async_setup_services
 
 LOGGER = logging.getLogger(__name__)
 
+# Один циркадный движок на все записи
+DATA_CIRCADIAN = f"{DOMAIN}_circadian"
+# (отписка таймера, записи контроллеров, которые держат движок)
+DATA_CIRCADIAN_USERS = f"{DOMAIN}_circadian_users"
+
 PLATFORMS: list[Platform] = [
     Platform.LIGHT,
     Platform.NUMBER,
     Platform.SELECT,  # добавили select-платформу для выбора режима яркости
 ]
+# Виртуальная лента — только light, поверх уже настроенных контроллеров
+VIRTUAL_PLATFORMS: list[Platform] = [Platform.LIGHT]
 
 
 # =========================================================
@@ -23,10 +51,17 @@ PLATFORMS: list[Platform] = [
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up ELK-BLEDOM from a config entry."""
     hass.data.setdefault(DOMAIN, {})
+    async_setup_services(hass)
+
+    if entry.data.get(CONF_VIRTUAL):
+        await hass.config_entries.async_forward_entry_setups(entry, VIRTUAL_PLATFORMS)
+        return True
+
+    if entry.data.get(CONF_REALTIME):
+        return await _async_setup_realtime(hass, entry)
 
     # Получаем параметры (опции приоритетнее)
-    reset = entry.options.get(CONF_RESET, entry.data.get(CONF_RESET, False))
-    delay = entry.options.get(CONF_DELAY, entry.data.get(CONF_DELAY, 120))
+    reset, delay, brightness_mode = _entry_options(entry)
     mac = entry.data.get(CONF_MAC) or entry.options.get(CONF_MAC)
 
     if not mac:
@@ -36,13 +71,16 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     LOGGER.info("Initializing ELK-BLEDOM: MAC=%s | reset=%s | delay=%s", mac, reset, delay)
 
     # Создаем экземпляр устройства
-    instance = BLEDOMInstance(mac, reset, delay, hass)
+    instance = create_instance(hass, mac, reset, delay)
+    await instance.async_apply_options(reset, delay, brightness_mode)
     hass.data[DOMAIN][entry.entry_id] = instance
+    # Режим включается в опциях на лету — движок нужен каждой записи контроллера
+    _async_setup_circadian(hass, entry)
 
     # Регистрируем платформы
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
 
-    # Обработчик обновления параметров (перезагрузка всей интеграции)
+    # Обработчик обновления параметров (применяются на лету)
     entry.async_on_unload(entry.add_update_listener(_async_update_listener))
 
     # Гарантированное отключение при остановке HA
@@ -58,24 +96,118 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     return True
 
 
+# =========================================================
+# Циркадный режим: один таймер и одна цель на все контроллеры
+# =========================================================
+def _async_setup_circadian(hass: HomeAssistant, entry: ConfigEntry) -> CircadianEngine:
+    if DATA_CIRCADIAN not in hass.data:
+        _async_start_circadian(hass)
+    record = hass.data[DATA_CIRCADIAN_USERS]
+    unsub, users = record
+    users.add(entry.entry_id)
+
+    @callback
+    def _async_release() -> None:
+        # Последняя запись выгружена — таймер не должен тикать по пустому списку
+        users.discard(entry.entry_id)
+        if not users and hass.data.get(DATA_CIRCADIAN_USERS) is record:
+            unsub()
+            hass.data.pop(DATA_CIRCADIAN_USERS)
+            hass.data.pop(DATA_CIRCADIAN)
+
+    entry.async_on_unload(_async_release)
+    return hass.data[DATA_CIRCADIAN]
+
+
+def _async_start_circadian(hass: HomeAssistant) -> None:
+    def _instances() -> list[BLEDOMInstance]:
+        return [
+            inst
+            for entry in hass.config_entries.async_entries(DOMAIN)
+            if entry.options.get(CONF_CIRCADIAN)
+            and isinstance(inst := hass.data[DOMAIN].get(entry.entry_id), BLEDOMInstance)
+        ]
+
+    engine = CircadianEngine(
+        _instances,
+        CircadianSettings(hass.config.latitude, hass.config.longitude),
+        now=dt_util.utcnow,
+    )
+
+    async def _async_tick(_now=None) -> None:
+        report = await engine.async_tick()
+        LOGGER.debug("Circadian tick: %s", report)
+
+    unsub = async_track_time_interval(
+        hass, _async_tick, timedelta(seconds=CIRCADIAN_INTERVAL), name=f"{DOMAIN} circadian"
+    )
+    hass.data[DATA_CIRCADIAN] = engine
+    hass.data[DATA_CIRCADIAN_USERS] = (unsub, set())
+
+
+# =========================================================
+# Приёмник E1.31 / DDP: без платформ, только UDP-сокет
+# =========================================================
+async def _async_setup_realtime(hass: HomeAssistant, entry: ConfigEntry) -> bool:
+    receiver = RealtimeReceiver(
+        entry.data[CONF_MEMBERS],
+        instance_lookup(hass),
+        protocol=entry.data[CONF_PROTOCOL],
+        universe=entry.data.get(CONF_UNIVERSE, 1),
+        start_channel=entry.data[CONF_START_CHANNEL],
+        port=entry.data[CONF_PORT],
+    )
+    try:
+        await receiver.async_start()
+    except OSError as e:
+        raise ConfigEntryNotReady(f"Cannot listen on UDP port {entry.data[CONF_PORT]}: {e}") from e
+    hass.data[DOMAIN][entry.entry_id] = receiver
+
+    async def _async_stop(event: Event) -> None:
+        await receiver.stop()
+
+    entry.async_on_unload(hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, _async_stop))
+    return True
+
+
 # =========================================================
 # Выгрузка интеграции
 # =========================================================
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
     LOGGER.info("Unloading ELK-BLEDOM: %s", entry.entry_id)
-    unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
+    if entry.data.get(CONF_REALTIME):
+        platforms: list[Platform] = []
+    elif entry.data.get(CONF_VIRTUAL):
+        platforms = VIRTUAL_PLATFORMS
+    else:
+        platforms = PLATFORMS
+    unload_ok = await hass.config_entries.async_unload_platforms(entry, platforms)
     if unload_ok:
-        instance: BLEDOMInstance = hass.data[DOMAIN].pop(entry.entry_id, None)
+        instance: BLEDOMInstance | RealtimeReceiver = hass.data[DOMAIN].pop(entry.entry_id, None)
         if instance:
             await instance.stop()
     return unload_ok
 
 
 # =========================================================
-# Перезагрузка при изменении опций
+# Применение опций без перезагрузки
 # =========================================================
+def _entry_options(entry: ConfigEntry) -> tuple[bool, int, str]:
+    """Return (reset, delay, brightness_mode); options override data."""
+    reset = entry.options.get(CONF_RESET, entry.data.get(CONF_RESET, False))
+    delay = entry.options.get(CONF_DELAY, entry.data.get(CONF_DELAY, 120))
+    brightness_mode = entry.options.get(CONF_BRIGHTNESS_MODE, DEFAULT_BRIGHTNESS_MODE)
+    return reset, delay, brightness_mode
+
+
 async def _async_update_listener(hass: HomeAssistant, entry: ConfigEntry) -> None:
-    """Handle options update (reset/delay/brightness_mode)."""
-    LOGGER.debug("Reloading ELK-BLEDOM after options change")
-    await hass.config_entries.async_reload(entry.entry_id)
+    """Handle options update (reset/delay/brightness_mode) on the live instance."""
+    instance: BLEDOMInstance | None = hass.data[DOMAIN].get(entry.entry_id)
+    if instance is None:
+        return
+    LOGGER.debug("Applying ELK-BLEDOM options in place: %s", dict(entry.options))
+    await instance.async_apply_options(*_entry_options(entry))
+    if entry.options.get(CONF_CIRCADIAN) and DATA_CIRCADIAN in hass.data:
+        # Включили режим — не ждём следующего такта
+        hass.async_create_task(hass.data[DATA_CIRCADIAN].async_tick())
@@ -0,0 +1,98 @@
+"""Адаптер ядра к Home Assistant: Bluetooth-стек HA, его executor и хранилище в /config."""
+from __future__ import annotations
+
+from collections.abc import Callable
+
+from bleak.backends.device import BLEDevice
+from homeassistant.components.bluetooth import (
+    BluetoothCallbackMatcher,
+    BluetoothScanningMode,
+    async_ble_device_from_address,
+    async_register_callback,
+)
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.exceptions import ConfigEntryNotReady
+from homeassistant.util import dt as dt_util
+
+from .airtime import AirtimeScheduler
+from .backend import DeviceNotFound, JsonFileStore
+from .const import DOMAIN
+from .elkbledom import BLEDOMInstance, async_validate_ble_device
+
+STATE_FILE = ".storage/elkbledom_fastlink_state.json"  # относительно каталога конфигурации
+
+# Один файл — одно хранилище (и один lock) на все записи интеграции
+_STORES: dict[str, JsonFileStore] = {}
+
+# Бюджеты эфира адаптеров и прокси — общие для всех записей
+DATA_AIRTIME = f"{DOMAIN}_airtime"
+
+
+class HassDeviceResolver:
+    """BLEDevice и реклама — из Bluetooth-интеграции HA (адаптеры и прокси)."""
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        self._hass = hass
+
+    def resolve(self, address: str) -> BLEDevice | None:
+        return async_ble_device_from_address(self._hass, address, connectable=True)
+
+    def watch(self, address: str, on_seen: Callable[[BLEDevice], None]) -> Callable[[], None]:
+        @callback
+        def _on_advertisement(service_info, _change) -> None:
+            on_seen(service_info.device)
+
+        return async_register_callback(
+            self._hass,
+            _on_advertisement,
+            BluetoothCallbackMatcher(address=address, connectable=True),
+            BluetoothScanningMode.PASSIVE,
+        )
+
+
+def state_store(hass: HomeAssistant) -> JsonFileStore:
+    path = hass.config.path(STATE_FILE)
+    if path not in _STORES:
+        _STORES[path] = JsonFileStore(path)
+    return _STORES[path]
+
+
+def airtime_scheduler(hass: HomeAssistant) -> AirtimeScheduler:
+    if DATA_AIRTIME not in hass.data:
+        hass.data[DATA_AIRTIME] = AirtimeScheduler()
+    return hass.data[DATA_AIRTIME]
+
+
+def create_instance(hass: HomeAssistant, address: str, reset: bool, delay: int) -> BLEDOMInstance:
+    """BLEDOMInstance поверх HA; устройство не видно — ConfigEntryNotReady (HA повторит)."""
+    try:
+        return BLEDOMInstance(
+            address,
+            reset,
+            delay,
+            HassDeviceResolver(hass),
+            state_store(hass),
+            run_blocking=hass.async_add_executor_job,
+            now=dt_util.now,
+            airtime=airtime_scheduler(hass),
+        )
+    except DeviceNotFound as e:
+        raise ConfigEntryNotReady(str(e)) from e
+
+
+async def async_validate_device(hass: HomeAssistant, address: str) -> tuple[bool, float, str | None]:
+    """Проверка при добавлении: реальное подключение и запись (см. async_validate_ble_device)."""
+    device = async_ble_device_from_address(hass, address, connectable=True)
+    return await async_validate_ble_device(device, address)
+
+
+def instance_lookup(hass: HomeAssistant) -> Callable[[str], BLEDOMInstance | None]:
+    """MAC -> загруженный экземпляр контроллера (для приёмника realtime)."""
+
+    def _lookup(address: str) -> BLEDOMInstance | None:
+        for inst in hass.data.get(DOMAIN, {}).values():
+            if isinstance(inst, BLEDOMInstance) and inst.address == address:
+                return inst
+        return None
+
+    return _lookup
@@ -0,0 +1,168 @@
+"""Бюджет эфира адаптера: token bucket записей в секунду на все его контроллеры.
+
+Все подключённые через один адаптер (или BLE-прокси) контроллеры делят его
+эфир. Токены выдаются строго по классам приоритета, внутри класса — по кругу
+между устройствами, так что анимация одной ленты не отнимает очередь у
+остальных. Часть ёмкости (reserve) доступна только INTERACTIVE-записям:
+нажатие в UI не ждёт, пока фоновые кадры выберут бюджет до нуля.
+Модуль не зависит от Home Assistant.
+"""
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from collections.abc import Callable
+from typing import Any
+
+from .writer import Priority
+
+AIRTIME_RATE = 100.0  # записей/с на адаптер
+AIRTIME_BURST = 20  # ёмкость корзины
+INTERACTIVE_RESERVE = 5  # токенов, недоступных не-INTERACTIVE записям
+
+
+class AirtimeBudget:
+    """Token bucket одного адаптера со справедливой очередью ожидающих."""
+
+    def __init__(
+        self,
+        rate: float = AIRTIME_RATE,
+        burst: int = AIRTIME_BURST,
+        reserve: int = INTERACTIVE_RESERVE,
+    ) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.reserve = min(reserve, burst - 1)
+        self._tokens = float(burst)
+        self._stamp: float | None = None
+        # priority -> устройство -> очередь (токенов, future); порядок dict — круг устройств
+        self._waiting: list[dict[str, deque[tuple[int, asyncio.Future]]]] = [{} for _ in Priority]
+        self._timer: asyncio.TimerHandle | None = None
+        self.granted = 0
+        self.waits = 0
+
+    def _floor(self, priority: Priority) -> int:
+        return 0 if priority == Priority.INTERACTIVE else self.reserve
+
+    def _refill(self, now: float) -> None:
+        if self._stamp is not None:
+            self._tokens = min(self.burst, self._tokens + (now - self._stamp) * self.rate)
+        self._stamp = now
+
+    async def acquire(self, device: str, priority: Priority, count: int = 1) -> int:
+        """Ждёт токены на count записей; возвращает выданное число (не больше ёмкости)."""
+        count = max(1, min(count, self.burst - self._floor(priority)))
+        loop = asyncio.get_running_loop()
+        self._refill(loop.time())
+        ahead = any(self._waiting[p] for p in range(priority + 1))
+        if not ahead and self._tokens - count >= self._floor(priority):
+            self._tokens -= count
+            self.granted += count
+            return count
+
+        self.waits += 1
+        fut = loop.create_future()
+        self._waiting[priority].setdefault(device, deque()).append((count, fut))
+        if self._timer is None:
+            self._dispatch()
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                self.refund(count)  # выдали, но ждущий уже отменён
+            raise
+        return count
+
+    def refund(self, count: int) -> None:
+        """Возврат невыбранных токенов (кадры окна устарели, пока ждали)."""
+        if count <= 0:
+            return
+        self._tokens = min(self.burst, self._tokens + count)
+        self.granted -= count
+        if self._timer is None and any(self._waiting):
+            self._dispatch()
+
+    def _dispatch(self) -> None:
+        self._timer = None
+        loop = asyncio.get_running_loop()
+        self._refill(loop.time())
+        for priority in Priority:
+            queues = self._waiting[priority]
+            while queues:
+                device, queue = next(iter(queues.items()))
+                count, fut = queue[0]
+                if fut.done():  # ждущий отменён
+                    queue.popleft()
+                    if not queue:
+                        del queues[device]
+                    continue
+                floor = self._floor(priority)
+                if self._tokens - count < floor:
+                    self._timer = loop.call_later((count + floor - self._tokens) / self.rate, self._dispatch)
+                    return
+                queue.popleft()
+                self._tokens -= count
+                self.granted += count
+                fut.set_result(None)
+                # Устройство — в конец круга
+                del queues[device]
+                if queue:
+                    queues[device] = queue
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "rate": self.rate,
+            "tokens": round(self._tokens, 2),
+            "granted": self.granted,
+            "waits": self.waits,
+            "waiting": {
+                p.name: sum(len(q) for q in self._waiting[p].values()) for p in Priority if self._waiting[p]
+            },
+        }
+
+
+class AirtimeScheduler:
+    """Бюджеты по адаптерам; один на процесс (один радиоэфир)."""
+
+    def __init__(
+        self,
+        rate: float = AIRTIME_RATE,
+        burst: int = AIRTIME_BURST,
+        reserve: int = INTERACTIVE_RESERVE,
+    ) -> None:
+        self._params = (rate, burst, reserve)
+        self._budgets: dict[str, AirtimeBudget] = {}
+
+    def budget(self, adapter: str) -> AirtimeBudget:
+        if adapter not in self._budgets:
+            self._budgets[adapter] = AirtimeBudget(*self._params)
+        return self._budgets[adapter]
+
+    def share(self, device: str, adapter: Callable[[], str]) -> AirtimeShare:
+        return AirtimeShare(self, device, adapter)
+
+    def diagnostics(self) -> dict[str, Any]:
+        return {adapter: budget.stats() for adapter, budget in self._budgets.items()}
+
+
+class AirtimeShare:
+    """Доля одного устройства: бюджет берётся по адаптеру, через который оно видно сейчас."""
+
+    def __init__(self, scheduler: AirtimeScheduler, device: str, adapter: Callable[[], str]) -> None:
+        self._scheduler = scheduler
+        self._device = device
+        self._adapter = adapter
+        self._budget: AirtimeBudget | None = None
+
+    async def acquire(self, priority: Priority, count: int) -> int:
+        # Возврат — в ту же корзину, из которой брали (адаптер мог смениться)
+        self._budget = self._scheduler.budget(self._adapter())
+        return await self._budget.acquire(self._device, priority, count)
+
+    def refund(self, count: int) -> None:
+        if self._budget is not None:
+            self._budget.refund(count)
+
+    def stats(self) -> dict[str, Any]:
+        adapter = self._adapter()
+        return {"adapter": adapter, **self._scheduler.budget(adapter).stats()}
@@ -0,0 +1,348 @@
+"""Светомузыка: PCM из FIFO, файла или потока (через ffmpeg) -> FFT -> цвета контроллеров.
+
+Окно анализа сдвигается на половину своей длины; энергии полос и детектор
+долей считаются NumPy по всем полосам сразу, кадры уходят через ColorSender
+(последний цвет выигрывает). Модуль не зависит от Home Assistant.
+"""
+from __future__ import annotations
+
+import asyncio
+import colorsys
+import logging
+import os
+import stat
+import time
+import wave
+from collections.abc import Callable
+from typing import TYPE_CHECKING, Any
+
+import numpy as np
+
+from .backend import RunBlocking, run_in_executor
+from .realtime import REALTIME_MAX_RATE, ColorSender
+
+if TYPE_CHECKING:
+    from .elkbledom import BLEDOMInstance
+
+LOGGER = logging.getLogger(__name__)
+
+AUDIO_MODE_BANDS = "bands"  # все контроллеры: R — басы, G — середина, B — верха
+AUDIO_MODE_SPECTRUM = "spectrum"  # контроллер i — своя полоса спектра, свой оттенок
+AUDIO_MODES = [AUDIO_MODE_BANDS, AUDIO_MODE_SPECTRUM]
+
+DEFAULT_SAMPLE_RATE = 44100
+WINDOW = 1024  # отсчётов; ~23 мс при 44.1 кГц
+HOP = WINDOW // 2
+BAND_EDGES_HZ = (20.0, 250.0, 2000.0, 12000.0)  # bands: басы / середина / верха
+SPECTRUM_RANGE_HZ = (40.0, 12000.0)
+BEAT_RANGE_HZ = (40.0, 150.0)  # бочка
+BEAT_HISTORY = 43  # окон (~1 с) для средней энергии басов
+BEAT_SENSITIVITY = 1.4  # доля — энергия басов выше средней во столько раз
+BEAT_REFRACTORY = 0.15  # сек; минимальный интервал между долями
+BEAT_FLASH = 0.5  # добавка к уровню на доле, затухает за ~0.2 с
+FLASH_DECAY = 0.8  # за окно
+RELEASE = 0.85  # спад уровня за окно: быстрая атака, медленный спад
+AGC_DECAY = 0.999  # забывание пикового уровня за окно (~53 с до -20 дБ при ~86 окнах/с)
+SILENCE_RMS = 1e-3
+
+
+class AudioAnalyzer:
+    """Энергии полос (0..1, с автоусилением) и доли по окнам PCM."""
+
+    def __init__(self, sample_rate: int, edges_hz: np.ndarray, window: int = WINDOW) -> None:
+        self._taper = np.hanning(window).astype(np.float32)
+        freqs = np.fft.rfftfreq(window, 1.0 / sample_rate)
+        edges = np.searchsorted(freqs, edges_hz)
+        # Узкие полосы на низах — минимум один бин на полосу
+        self._starts = np.minimum(edges[:-1], len(freqs) - 1)
+        self._stops = np.maximum(edges[1:], self._starts + 1)
+        self._bins = self._stops - self._starts
+        self._beat = slice(*np.searchsorted(freqs, BEAT_RANGE_HZ))
+        self._peak = np.full(len(self._starts), 1e-9)
+        self._levels = np.zeros(len(self._starts))
+        self._history = np.zeros(BEAT_HISTORY)
+        self._cursor = 0
+        self._last_beat = 0.0
+        self._hop_seconds = (window // 2) / sample_rate
+        self._clock = 0.0
+
+    def analyze(self, samples: np.ndarray) -> tuple[np.ndarray, bool]:
+        """samples — float32 [-1, 1] длиной окна; возвращает (уровни полос, доля)."""
+        self._clock += self._hop_seconds
+        if float(np.sqrt(np.mean(samples * samples))) < SILENCE_RMS:
+            self._levels *= RELEASE
+            return self._levels, False
+
+        power = np.abs(np.fft.rfft(samples * self._taper)) ** 2
+        cumulative = np.concatenate(([0.0], np.cumsum(power)))
+        energy = (cumulative[self._stops] - cumulative[self._starts]) / self._bins
+        self._peak = np.maximum(energy, self._peak * AGC_DECAY)
+        # sqrt — ближе к восприятию громкости, чем линейная энергия
+        self._levels = np.maximum(np.sqrt(energy / self._peak), self._levels * RELEASE)
+
+        bass = float(power[self._beat].sum())
+        average = self._history.mean()
+        self._history[self._cursor] = bass
+        self._cursor = (self._cursor + 1) % BEAT_HISTORY
+        beat = (
+            average > 0
+            and bass > BEAT_SENSITIVITY * average
+            and self._clock - self._last_beat >= BEAT_REFRACTORY
+        )
+        if beat:
+            self._last_beat = self._clock
+        return self._levels, beat
+
+
+def spectrum_colors(count: int) -> np.ndarray:
+    """Оттенки от красного (басы) к фиолетовому (верха), (count, 3) в 0..1."""
+    return np.array([colorsys.hsv_to_rgb(0.8 * i / max(count - 1, 1), 1.0, 1.0) for i in range(count)])
+
+
+# =========================================================
+# Источники PCM: s16le, на выходе — байты окна
+# =========================================================
+class _FileSource:
+    """FIFO, сырой s16le-файл или WAV.
+
+    Обычный файл читается в executor'е в темпе реального времени. FIFO
+    открывается без блокировки и читается через event loop (add_reader):
+    audio_start не ждёт подключения писателя, а close() сразу прерывает
+    ожидание данных — поток executor'а на FIFO не висит.
+    """
+
+    def __init__(self, path: str, sample_rate: int, channels: int, run_blocking: RunBlocking) -> None:
+        self._path = path
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self._run_blocking = run_blocking
+        self._file = None
+        self._wave: wave.Wave_read | None = None
+        self._paced = False
+        self._fd: int | None = None  # FIFO
+        self._readable: asyncio.Future | None = None
+        self._fifo_data = False  # писатель уже что-то прислал
+
+    def _open(self) -> None:
+        mode = os.stat(self._path).st_mode
+        if stat.S_ISFIFO(mode):
+            self._fd = os.open(self._path, os.O_RDONLY | os.O_NONBLOCK)
+            return
+        self._paced = stat.S_ISREG(mode)
+        self._file = open(self._path, "rb")
+        if self._paced and self._file.read(4) == b"RIFF":
+            self._file.seek(0)
+            self._wave = wave.open(self._file)
+            if self._wave.getsampwidth() != 2:
+                raise ValueError(f"{self._path}: only 16-bit WAV is supported")
+            self.sample_rate = self._wave.getframerate()
+            self.channels = self._wave.getnchannels()
+        elif self._paced:
+            self._file.seek(0)
+
+    async def open(self) -> None:
+        await self._run_blocking(self._open)
+
+    def _read(self, frames: int) -> bytes:
+        if self._wave is not None:
+            return self._wave.readframes(frames)
+        return self._file.read(frames * self.channels * 2)
+
+    async def read(self, frames: int) -> bytes:
+        if self._fd is None:
+            return await self._run_blocking(self._read, frames)
+        size = frames * self.channels * 2
+        data = bytearray()
+        woke = False
+        while len(data) < size:
+            try:
+                chunk = os.read(self._fd, size - len(data))
+            except BlockingIOError:
+                chunk = None
+            if chunk:
+                data += chunk
+                self._fifo_data = True
+                continue
+            # Пустое чтение до первого писателя — ещё не подключились;
+            # после пробуждения или данных — писатель закрыл FIFO
+            if chunk == b"" and (woke or self._fifo_data):
+                break
+            await self._async_wait_readable()
+            woke = True
+        return bytes(data)
+
+    async def _async_wait_readable(self) -> None:
+        loop = asyncio.get_running_loop()
+        self._readable = fut = loop.create_future()
+        loop.add_reader(self._fd, lambda: fut.done() or fut.set_result(None))
+        try:
+            await fut
+        finally:
+            if self._fd is not None:
+                loop.remove_reader(self._fd)
+            self._readable = None
+
+    @property
+    def paced(self) -> bool:
+        return self._paced
+
+    async def close(self) -> None:
+        if self._fd is not None:
+            fd, self._fd = self._fd, None
+            asyncio.get_running_loop().remove_reader(fd)
+            if self._readable is not None and not self._readable.done():
+                self._readable.cancel()  # прерывает ожидающий read()
+            os.close(fd)
+        if self._file is not None:
+            self._file.close()
+
+
+class _FfmpegSource:
+    """Любой поток, который понимает ffmpeg (радио, камера, media_player URL)."""
+
+    paced = False
+
+    def __init__(self, url: str, sample_rate: int, binary: str) -> None:
+        self._url = url
+        self._binary = binary
+        self.sample_rate = sample_rate
+        self.channels = 1
+        self._proc: asyncio.subprocess.Process | None = None
+
+    async def open(self) -> None:
+        self._proc = await asyncio.create_subprocess_exec(
+            self._binary, "-nostdin", "-loglevel", "error", "-i", self._url,
+            "-vn", "-f", "s16le", "-ac", "1", "-ar", str(self.sample_rate), "-",
+            stdout=asyncio.subprocess.PIPE,
+        )
+
+    async def read(self, frames: int) -> bytes:
+        try:
+            return await self._proc.stdout.readexactly(frames * 2)
+        except asyncio.IncompleteReadError as e:
+            return e.partial
+
+    async def close(self) -> None:
+        if self._proc is not None and self._proc.returncode is None:
+            self._proc.kill()
+            await self._proc.wait()
+
+
+# =========================================================
+# Движок
+# =========================================================
+class AudioReactive:
+    """Чтение PCM -> анализ -> кадр для всех контроллеров -> ColorSender."""
+
+    def __init__(
+        self,
+        addresses: list[str],
+        lookup: Callable[[str], "BLEDOMInstance | None"],
+        source: str,
+        mode: str = AUDIO_MODE_BANDS,
+        sample_rate: int = DEFAULT_SAMPLE_RATE,
+        channels: int = 1,
+        run_blocking: RunBlocking = run_in_executor,
+        max_rate: float = REALTIME_MAX_RATE,
+        ffmpeg: str = "ffmpeg",
+    ) -> None:
+        self.source = source
+        self.mode = mode
+        self._count = len(addresses)
+        self._sender = ColorSender(addresses, lookup, max_rate)
+        if "://" in source:
+            self._source: _FileSource | _FfmpegSource = _FfmpegSource(source, sample_rate, ffmpeg)
+        else:
+            self._source = _FileSource(source, sample_rate, channels, run_blocking)
+        self._task: asyncio.Task | None = None
+        self.windows = 0
+        self.beats = 0
+        self.error: str | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def async_start(self) -> None:
+        await self._source.open()
+        self._sender.start()
+        self._task = asyncio.create_task(self._async_run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        await self._sender.stop()
+        await self._source.close()
+
+    def _analyzer(self) -> AudioAnalyzer:
+        rate = self._source.sample_rate
+        if self.mode == AUDIO_MODE_SPECTRUM:
+            edges = np.geomspace(*SPECTRUM_RANGE_HZ, self._count + 1)
+        else:
+            edges = np.array(BAND_EDGES_HZ)
+        return AudioAnalyzer(rate, np.minimum(edges, rate / 2))
+
+    async def _async_run(self) -> None:
+        source = self._source
+        analyzer = self._analyzer()
+        channels = source.channels
+        window = np.zeros(WINDOW, dtype=np.float32)
+        base = spectrum_colors(self._count) if self.mode == AUDIO_MODE_SPECTRUM else None
+        flash = 0.0
+        started = time.monotonic()
+        played = 0  # отсчётов; для темпа чтения обычного файла
+        try:
+            while True:
+                chunk = await source.read(HOP)
+                frames = len(chunk) // (2 * channels)
+                if frames == 0:
+                    LOGGER.info("Audio source %s ended", self.source)
+                    return
+                # frombuffer — без копии; float32 и сведение в моно — одна копия на окно
+                pcm = np.frombuffer(chunk, dtype="<i2", count=frames * channels)
+                mono = pcm.reshape(frames, channels).mean(axis=1, dtype=np.float32) / 32768.0
+                window[:-frames] = window[frames:]
+                window[-frames:] = mono
+
+                levels, beat = analyzer.analyze(window)
+                self.windows += 1
+                if beat:
+                    self.beats += 1
+                    flash = BEAT_FLASH
+                else:
+                    flash *= FLASH_DECAY
+                self._render(levels, flash, base)
+
+                if source.paced:
+                    played += frames
+                    ahead = played / source.sample_rate - (time.monotonic() - started)
+                    if ahead > 0:
+                        await asyncio.sleep(ahead)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.error = str(e) or type(e).__name__
+            LOGGER.error("Audio source %s failed: %s", self.source, self.error)
+
+    def _render(self, levels: np.ndarray, flash: float, base: np.ndarray | None) -> None:
+        if base is None:
+            # bands: один цвет на всех
+            pixel = (np.clip(levels + flash, 0.0, 1.0) * 255).astype(np.uint8).tobytes()
+            for i in range(self._count):
+                self._sender.submit(i, pixel)
+            return
+        frame = (base * np.clip(levels + flash, 0.0, 1.0)[:, None] * 255).astype(np.uint8)
+        for i in range(self._count):
+            self._sender.submit(i, frame[i].tobytes())
+
+    def diagnostics(self) -> dict[str, Any]:
+        return {
+            "source": self.source,
+            "mode": self.mode,
+            "running": self.running,
+            "error": self.error,
+            "windows": self.windows,
+            "beats": self.beats,
+            "devices": {slot.address: self._sender.stats(slot) for slot in self._sender.slots},
+        }
@@ -0,0 +1,142 @@
+"""Подключаемые зависимости ядра: поиск BLE-устройств и хранилище состояния.
+
+Ядро (elkbledom.py и его модули) не импортирует Home Assistant: интеграция
+передаёт свои реализации (adapter.py), автономные скрипты — эти.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import threading
+from collections.abc import Awaitable, Callable
+from typing import Any, Protocol
+
+from bleak import BleakScanner
+from bleak.backends.device import BLEDevice
+
+LOGGER = logging.getLogger(__name__)
+
+
+class DeviceNotFound(Exception):
+    """Адрес не виден ни одному адаптеру."""
+
+
+class DeviceResolver(Protocol):
+    def resolve(self, address: str) -> BLEDevice | None:
+        """Актуальный BLEDevice для подключения (или None)."""
+
+    def watch(self, address: str, on_seen: Callable[[BLEDevice], None]) -> Callable[[], None]:
+        """Вызывать on_seen при каждой рекламе устройства; возвращает отписку."""
+
+
+class StateStore(Protocol):
+    """Блокирующее хранилище; ядро вызывает его через run_blocking (executor)."""
+
+    def load(self, address: str) -> dict[str, Any]:
+        ...
+
+    def save(self, address: str, payload: dict[str, Any]) -> None:
+        ...
+
+
+RunBlocking = Callable[..., Awaitable[Any]]
+
+
+async def run_in_executor(func: Callable[..., Any], *args: Any) -> Any:
+    """run_blocking по умолчанию: стандартный executor event loop."""
+    return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+
+# =========================================================
+# JSON-файл: одна запись на адрес
+# =========================================================
+class JsonFileStore:
+    """Общий JSON-файл состояния всех устройств (чтение-изменение-запись целиком).
+
+    Сохранения разных устройств идут из потоков executor'а параллельно —
+    lock не даёт им затереть друг друга.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+
+    def _read(self) -> dict[str, Any]:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except json.JSONDecodeError:
+            return {}
+
+    def load(self, address: str) -> dict[str, Any]:
+        try:
+            with self._lock:
+                return self._read().get(address, {})
+        except Exception as e:
+            LOGGER.warning("Failed to load state for %s: %s", address, e)
+            return {}
+
+    def save(self, address: str, payload: dict[str, Any]) -> None:
+        try:
+            with self._lock:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                data = self._read()
+                data[address] = payload
+                with open(self.path, "w", encoding="utf-8") as f:
+                    json.dump(data, f, indent=2, ensure_ascii=False)
+        except Exception as e:
+            LOGGER.error("Failed to save state for %s: %s", address, e)
+
+
+# =========================================================
+# Поиск устройств без Home Assistant — через BleakScanner
+# =========================================================
+class ScannerResolver:
+    """Кэш BLEDevice по результатам сканирования bleak.
+
+    async_scan() нужно вызвать до создания экземпляров; пока идёт
+    async_watch_forever(), подписчики watch() получают рекламу.
+    """
+
+    def __init__(self) -> None:
+        self._devices: dict[str, BLEDevice] = {}
+        self._watchers: dict[str, list[Callable[[BLEDevice], None]]] = {}
+
+    def resolve(self, address: str) -> BLEDevice | None:
+        return self._devices.get(address.upper())
+
+    def watch(self, address: str, on_seen: Callable[[BLEDevice], None]) -> Callable[[], None]:
+        callbacks = self._watchers.setdefault(address.upper(), [])
+        callbacks.append(on_seen)
+        return lambda: callbacks.remove(on_seen)
+
+    def _on_detection(self, device: BLEDevice, _adv: Any) -> None:
+        address = device.address.upper()
+        self._devices[address] = device
+        for on_seen in list(self._watchers.get(address, ())):
+            on_seen(device)
+
+    async def async_scan(self, timeout: float = 5.0, addresses: set[str] | None = None) -> list[BLEDevice]:
+        """Сканирует timeout секунд (или до обнаружения всех addresses)."""
+        wanted = {a.upper() for a in addresses} if addresses else None
+        found = asyncio.Event()
+
+        def _detected(device: BLEDevice, adv: Any) -> None:
+            self._on_detection(device, adv)
+            if wanted and wanted <= self._devices.keys():
+                found.set()
+
+        async with BleakScanner(detection_callback=_detected):
+            try:
+                await asyncio.wait_for(found.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return list(self._devices.values())
+
+    async def async_watch_forever(self) -> None:
+        async with BleakScanner(detection_callback=self._on_detection):
+            await asyncio.Event().wait()
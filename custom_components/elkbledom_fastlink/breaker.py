@@ -0,0 +1,80 @@
+"""Предохранитель (circuit breaker) подключения к одному контроллеру."""
+from __future__ import annotations
+
+from enum import StrEnum
+
+BREAKER_THRESHOLD = 3  # неудачных подключений подряд — размыкаем
+BREAKER_BASE_TIMEOUT = 5.0  # сек до первой пробы после размыкания
+BREAKER_MAX_TIMEOUT = 300.0  # потолок экспоненциальной паузы между пробами
+
+
+class BreakerState(StrEnum):
+    CLOSED = "closed"  # всё работает, подключаемся по требованию
+    OPEN = "open"  # устройство мертво: команды не ждут, подключений нет
+    HALF_OPEN = "half_open"  # одна пробная попытка в полёте
+
+
+class CircuitBreaker:
+    """Состояние предохранителя; время — монотонное время event loop.
+
+    После BREAKER_THRESHOLD неудач подряд размыкается. Пробное подключение
+    разрешается по таймеру (пауза удваивается с каждой неудачной пробой)
+    или досрочно — когда устройство снова видно в эфире (reset_timeout).
+    """
+
+    def __init__(
+        self,
+        threshold: int = BREAKER_THRESHOLD,
+        base_timeout: float = BREAKER_BASE_TIMEOUT,
+        max_timeout: float = BREAKER_MAX_TIMEOUT,
+    ) -> None:
+        self._threshold = threshold
+        self._base_timeout = base_timeout
+        self._max_timeout = max_timeout
+        self.state = BreakerState.CLOSED
+        self.failures = 0
+        self._trips = 0
+        self._retry_at = 0.0
+
+    @property
+    def closed(self) -> bool:
+        return self.state is BreakerState.CLOSED
+
+    def retry_in(self, now: float) -> float:
+        return max(0.0, self._retry_at - now)
+
+    def allow(self, now: float) -> bool:
+        """Можно ли подключаться сейчас; из OPEN по истечении паузы — в HALF_OPEN."""
+        if self.state is BreakerState.CLOSED:
+            return True
+        if self.state is BreakerState.OPEN and now >= self._retry_at:
+            self.state = BreakerState.HALF_OPEN
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.state = BreakerState.CLOSED
+        self.failures = 0
+        self._trips = 0
+
+    def record_failure(self, now: float) -> None:
+        self.failures += 1
+        if self.state is BreakerState.HALF_OPEN or self.failures >= self._threshold:
+            self.state = BreakerState.OPEN
+            self._retry_at = now + min(self._base_timeout * 2**self._trips, self._max_timeout)
+            self._trips += 1
+
+    def reset_timeout(self, now: float) -> bool:
+        """Досрочная проба (устройство снова в эфире); True — если пауза была сокращена."""
+        if self.state is BreakerState.OPEN and self._retry_at > now:
+            self._retry_at = now
+            return True
+        return False
+
+    def as_dict(self, now: float) -> dict:
+        return {
+            "state": self.state.value,
+            "failures": self.failures,
+            "trips": self._trips,
+            "next_probe_in_s": round(self.retry_in(now), 1) if self.state is BreakerState.OPEN else None,
+        }
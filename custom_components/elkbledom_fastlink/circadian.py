@@ -0,0 +1,148 @@
+"""Циркадный режим: цветовая температура и яркость следуют за солнцем.
+
+Цель считается один раз за такт для всех устройств; контроллер получает кадр,
+только если изменение заметно глазу. Отправки разнесены по времени внутри
+каждого адаптера, разные адаптеры работают параллельно. Модуль не зависит
+от Home Assistant.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from .elkbledom import BLEDOMInstance
+
+LOGGER = logging.getLogger(__name__)
+
+CIRCADIAN_INTERVAL = 60.0  # сек между тактами
+CIRCADIAN_STAGGER = 0.2  # сек между отправками через один адаптер
+CIRCADIAN_MIRED_THRESHOLD = 5.0  # ~порог различимости оттенка белого
+CIRCADIAN_BRIGHTNESS_THRESHOLD = 0.05  # относительное изменение (закон Вебера)
+TWILIGHT_DEPTH = 12.0  # градусов под горизонтом — яркость доходит до минимума
+
+
+@dataclass(frozen=True, slots=True)
+class CircadianSettings:
+    latitude: float
+    longitude: float
+    min_kelvin: int = 2200
+    max_kelvin: int = 5500
+    min_brightness: int = 40
+    max_brightness: int = 255
+
+
+def sun_position(when: datetime, latitude: float, longitude: float) -> tuple[float, float]:
+    """(высота солнца сейчас, высота в полдень) в градусах — приближение NOAA."""
+    utc = when.astimezone(timezone.utc)
+    hour = utc.hour + utc.minute / 60 + utc.second / 3600
+    gamma = 2 * math.pi / 365 * (utc.timetuple().tm_yday - 1 + (hour - 12) / 24)
+    eqtime = 229.18 * (
+        0.000075 + 0.001868 * math.cos(gamma) - 0.032077 * math.sin(gamma)
+        - 0.014615 * math.cos(2 * gamma) - 0.040849 * math.sin(2 * gamma)
+    )
+    decl = (
+        0.006918 - 0.399912 * math.cos(gamma) + 0.070257 * math.sin(gamma)
+        - 0.006758 * math.cos(2 * gamma) + 0.000907 * math.sin(2 * gamma)
+        - 0.002697 * math.cos(3 * gamma) + 0.00148 * math.sin(3 * gamma)
+    )
+    lat = math.radians(latitude)
+    solar_minutes = hour * 60 + eqtime + 4 * longitude
+    hour_angle = math.radians(solar_minutes / 4 - 180)
+
+    def _elevation(ha: float) -> float:
+        s = math.sin(lat) * math.sin(decl) + math.cos(lat) * math.cos(decl) * math.cos(ha)
+        return math.degrees(math.asin(max(-1.0, min(1.0, s))))
+
+    return _elevation(hour_angle), _elevation(0.0)
+
+
+def circadian_target(elevation: float, noon_elevation: float, settings: CircadianSettings) -> tuple[int, int]:
+    """(kelvin, brightness): днём — температура по высоте солнца, в сумерках — гаснет яркость."""
+    if elevation >= 0:
+        pct = math.sin(math.radians(elevation)) / math.sin(math.radians(noon_elevation)) if noon_elevation > 0 else 0.0
+        pct = min(pct, 1.0)
+    else:
+        pct = max(elevation / TWILIGHT_DEPTH, -1.0)
+    kelvin = settings.min_kelvin + (settings.max_kelvin - settings.min_kelvin) * max(pct, 0.0)
+    brightness = settings.max_brightness + (settings.max_brightness - settings.min_brightness) * min(pct, 0.0)
+    return round(kelvin), round(brightness)
+
+
+def _noticeable(inst: "BLEDOMInstance", kelvin: int, brightness: int) -> bool:
+    # Сравнение в майредах: равные шаги в них — равные на глаз шаги оттенка
+    current = max(inst.color_temp_kelvin, 1)
+    if abs(1e6 / current - 1e6 / kelvin) >= CIRCADIAN_MIRED_THRESHOLD:
+        return True
+    return abs(brightness - inst.brightness) >= max(2, CIRCADIAN_BRIGHTNESS_THRESHOLD * inst.brightness)
+
+
+class CircadianEngine:
+    """Один такт — одна цель на всех; instances() отдаёт участвующие контроллеры."""
+
+    def __init__(
+        self,
+        instances: Callable[[], list["BLEDOMInstance"]],
+        settings: CircadianSettings,
+        now: Callable[[], datetime] = lambda: datetime.now(timezone.utc),
+        stagger: float = CIRCADIAN_STAGGER,
+    ) -> None:
+        self._instances = instances
+        self.settings = settings
+        self._now = now
+        self._stagger = stagger
+        self._lock = asyncio.Lock()
+        self.last_target: tuple[int, int] | None = None
+        self.sent = 0
+        self.skipped = 0
+
+    def target(self) -> tuple[int, int]:
+        elevation, noon = sun_position(self._now(), self.settings.latitude, self.settings.longitude)
+        return circadian_target(elevation, noon, self.settings)
+
+    async def async_tick(self) -> dict[str, Any]:
+        if self._lock.locked():
+            return {"skipped": "previous tick still running"}
+        async with self._lock:
+            kelvin, brightness = self.last_target = self.target()
+            # Подстраиваем только включённые в режиме цветовой температуры:
+            # выбранный вручную цвет или эффект режим не перебивает
+            by_adapter: dict[str, list[tuple["BLEDOMInstance", int]]] = {}
+            for inst in self._instances():
+                if not (inst.available and inst.is_on and inst.color_mode == "color_temp" and not inst.effect):
+                    continue
+                k = max(inst.min_color_temp_kelvin, min(kelvin, inst.max_color_temp_kelvin))
+                if not _noticeable(inst, k, brightness):
+                    self.skipped += 1
+                    continue
+                by_adapter.setdefault(inst.adapter, []).append((inst, k))
+            results = await asyncio.gather(
+                *(self._async_send(batch, brightness) for batch in by_adapter.values())
+            )
+            sent = sum(results)
+            self.sent += sent
+            return {"kelvin": kelvin, "brightness": brightness, "sent": sent}
+
+    async def _async_send(self, batch: list[tuple["BLEDOMInstance", int]], brightness: int) -> int:
+        sent = 0
+        for i, (inst, kelvin) in enumerate(batch):
+            if i:
+                await asyncio.sleep(self._stagger)
+            try:
+                await inst.push_color_temp(kelvin, brightness)
+                sent += 1
+            except Exception as e:
+                LOGGER.debug("Circadian: %s update failed: %s", inst.address, e)
+        return sent
+
+    def diagnostics(self) -> dict[str, Any]:
+        return {
+            "target": {"kelvin": self.last_target[0], "brightness": self.last_target[1]} if self.last_target else None,
+            "sent": self.sent,
+            "skipped": self.skipped,
+        }
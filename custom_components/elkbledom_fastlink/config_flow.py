@@ -3,15 +3,22 @@ import logging
 from typing import Any
 
 from homeassistant import config_entries
-from homeassistant.const import CONF_MAC
+from homeassistant.const import CONF_MAC, CONF_PORT, CONF_PROTOCOL
 from homeassistant.core import callback
-from homeassistant.data_entry_flow import FlowResult
+from homeassistant.data_entry_flow import FlowResult, FlowResultType
 from homeassistant.components.bluetooth import (
     BluetoothServiceInfoBleak,
     async_discovered_service_info,
     async_ble_device_from_address,
 )
 import voluptuous as vol
+from homeassistant.helpers import config_validation as cv
+from homeassistant.helpers.selector import (
+    SelectOptionDict,
+    SelectSelector,
+    SelectSelectorConfig,
+    SelectSelectorMode,
+)
 from homeassistant.helpers.device_registry import format_mac
 
 from .const import (
@@ -19,12 +26,29 @@ from .const import (
     CONF_RESET,
     CONF_DELAY,
     CONF_BRIGHTNESS_MODE,
+    CONF_CIRCADIAN,
+    CONF_OPTIMISTIC,
+    DEFAULT_OPTIMISTIC,
+    CONF_VIRTUAL,
+    CONF_MEMBERS,
+    CONF_REALTIME,
+    CONF_UNIVERSE,
+    CONF_START_CHANNEL,
     BRIGHTNESS_MODES,
     DEFAULT_BRIGHTNESS_MODE,
 )
+from .adapter import async_validate_device
+from .models import is_supported_name
+from .realtime import DEFAULT_PORTS, PROTOCOL_E131, REALTIME_PROTOCOLS
 
 LOGGER = logging.getLogger(__name__)
 MANUAL_MAC = "manual"
+BULK_ADD = "bulk"
+VIRTUAL_ADD = "virtual"
+REALTIME_ADD = "realtime"
+CONF_DEVICES = "devices"
+SOURCE_BULK_IMPORT = "bulk_import"
+BULK_VALIDATE_CONCURRENCY = 4  # одновременных проверочных подключений
 
 
 class BLEDOMFlowHandler(config_entries.ConfigFlow, domain=DOMAIN):
@@ -35,7 +59,12 @@ class BLEDOMFlowHandler(config_entries.ConfigFlow, domain=DOMAIN):
     def __init__(self) -> None:
         self.mac: str | None = None
         self.name: str | None = None
-        self._discovered_devices: list[dict[str, str]] = []
+        # address -> имя; dict вместо списка — дедупликация за O(1)
+        self._discovered_devices: dict[str, str] = {}
+        # address -> (доступно, время подключения, ошибка)
+        self._bulk_results: dict[str, tuple[bool, float, str | None]] = {}
+        # address -> причина, по которой запись не создана
+        self._bulk_failed: dict[str, str] = {}
 
     # =========================================================
     # Автообнаружение Bluetooth
@@ -56,8 +85,8 @@ class BLEDOMFlowHandler(config_entries.ConfigFlow, domain=DOMAIN):
         await self.async_set_unique_id(discovery_info.address)
         self._abort_if_unique_id_configured()
 
-        # Проверяем имя без использования DeviceData
-        if any(x in discovery_info.name.upper() for x in ["ELK", "LED", "MELK"]):
+        # Проверяем имя по реестру моделей
+        if is_supported_name(discovery_info.name):
             return await self.async_step_bluetooth_confirm()
 
         return self.async_abort(reason="not_supported")
@@ -79,9 +108,16 @@ class BLEDOMFlowHandler(config_entries.ConfigFlow, domain=DOMAIN):
         if user_input is not None:
             if user_input[CONF_MAC] == MANUAL_MAC:
                 return await self.async_step_manual()
+            if user_input[CONF_MAC] == BULK_ADD:
+                return await self.async_step_bulk()
+            if user_input[CONF_MAC] == VIRTUAL_ADD:
+                return await self.async_step_virtual()
+            if user_input[CONF_MAC] == REALTIME_ADD:
+                return await self.async_step_realtime()
 
             self.mac = user_input[CONF_MAC]
-            self.name = user_input["name"]
+            # Пустое имя — берём BLE-имя устройства
+            self.name = user_input.get("name") or self._discovered_devices.get(self.mac, self.mac)
 
             result = await self.async_set_unique_id(self.mac, raise_on_progress=False)
             if result is not None:
@@ -95,30 +131,255 @@ class BLEDOMFlowHandler(config_entries.ConfigFlow, domain=DOMAIN):
         discovered_devices = async_discovered_service_info(self.hass)
 
         for d in discovered_devices:
-            if d.address in current_addresses:
-                continue
-            if any(dev["address"] == d.address for dev in self._discovered_devices):
+            if d.address in current_addresses or d.address in self._discovered_devices:
                 continue
-            if d.name and any(x in d.name.upper() for x in ["ELK", "LED", "MELK"]):
-                self._discovered_devices.append({"address": d.address, "name": d.name})
+            if is_supported_name(d.name):
+                self._discovered_devices[d.address] = d.name
 
-        if not self._discovered_devices:
+        configured = len(self._configured_devices())
+        can_add_virtual = configured > 1
+        if not self._discovered_devices and not configured:
             return await self.async_step_manual()
 
-        mac_dict = {dev["address"]: dev["name"] for dev in self._discovered_devices}
+        mac_dict = dict(self._discovered_devices)
         mac_dict[MANUAL_MAC] = "Manually add MAC address"
+        if len(self._discovered_devices) > 1:
+            mac_dict[BULK_ADD] = "Add several discovered devices at once"
+        if can_add_virtual:
+            mac_dict[VIRTUAL_ADD] = "Combine configured devices into a virtual strip"
+        if configured:
+            mac_dict[REALTIME_ADD] = "Receive E1.31 (sACN) / DDP from a lighting desk"
 
         return self.async_show_form(
             step_id="user",
             data_schema=vol.Schema(
                 {
                     vol.Required(CONF_MAC): vol.In(mac_dict),
-                    vol.Required("name"): str,
+                    vol.Optional("name", default=""): str,
                 }
             ),
             errors={},
         )
 
+    # =========================================================
+    # Массовое добавление: выбор нескольких устройств
+    # =========================================================
+    async def async_step_bulk(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Выбор нескольких найденных устройств и их параллельная проверка."""
+        errors: dict[str, str] = {}
+        if user_input is not None:
+            selected = user_input[CONF_DEVICES]
+            if not selected:
+                errors["base"] = "no_devices_selected"
+            else:
+                self._bulk_results = await self._async_validate_many(selected)
+                return await self.async_step_bulk_confirm()
+
+        return self.async_show_form(
+            step_id="bulk",
+            data_schema=vol.Schema(
+                {
+                    vol.Required(
+                        CONF_DEVICES, default=list(self._discovered_devices)
+                    ): cv.multi_select(
+                        {addr: f"{name} ({addr})" for addr, name in self._discovered_devices.items()}
+                    ),
+                }
+            ),
+            errors=errors,
+        )
+
+    async def _async_validate_many(
+        self, addresses: list[str]
+    ) -> dict[str, tuple[bool, float, str | None]]:
+        """Проверка подключением и записью, не больше BULK_VALIDATE_CONCURRENCY сразу."""
+        semaphore = asyncio.Semaphore(BULK_VALIDATE_CONCURRENCY)
+
+        async def _validate(address: str) -> tuple[bool, float, str | None]:
+            async with semaphore:
+                return await async_validate_device(self.hass, address)
+
+        results = await asyncio.gather(*(_validate(addr) for addr in addresses))
+        return dict(zip(addresses, results))
+
+    async def async_step_bulk_confirm(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Отчёт о доступности и создание записей для доступных устройств."""
+        reachable = [addr for addr, (ok, _, _) in self._bulk_results.items() if ok]
+
+        if user_input is not None:
+            if not reachable:
+                return self.async_abort(reason="cannot_connect")
+            self._async_abort_discovery_flows(reachable)
+            first, *rest = reachable
+            # Остальные устройства — отдельными потоками, каждое своей записью;
+            # результат ждём, чтобы показать, какие не добавились
+            for address in rest:
+                result = await self.hass.config_entries.flow.async_init(
+                    DOMAIN,
+                    context={"source": SOURCE_BULK_IMPORT},
+                    data={CONF_MAC: address, "name": self._discovered_devices.get(address, address)},
+                )
+                if result["type"] != FlowResultType.CREATE_ENTRY:
+                    self._bulk_failed[address] = result.get("reason") or str(result["type"])
+            self.mac = first
+            self.name = self._discovered_devices.get(first, first)
+            await self.async_set_unique_id(self.mac, raise_on_progress=False)
+            self._abort_if_unique_id_configured()
+            if self._bulk_failed:
+                return await self.async_step_bulk_report()
+            return self._async_create_device_entry()
+
+        lines = []
+        for address, (ok, connect_time, error) in self._bulk_results.items():
+            name = self._discovered_devices.get(address, address)
+            if ok:
+                lines.append(f"✅ {name} ({address}) — {connect_time:.2f} s")
+            else:
+                lines.append(f"❌ {name} ({address}) — {error}")
+
+        return self.async_show_form(
+            step_id="bulk_confirm",
+            description_placeholders={
+                "results": "\n".join(lines),
+                "reachable": str(len(reachable)),
+                "total": str(len(self._bulk_results)),
+            },
+        )
+
+    async def async_step_bulk_report(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Какие из доступных устройств не удалось добавить."""
+        if user_input is not None:
+            return self._async_create_device_entry()
+        return self.async_show_form(
+            step_id="bulk_report",
+            description_placeholders={
+                "failed": "\n".join(
+                    f"❌ {self._discovered_devices.get(address, address)} ({address}) — {reason}"
+                    for address, reason in self._bulk_failed.items()
+                ),
+            },
+        )
+
+    @callback
+    def _async_abort_discovery_flows(self, addresses: list[str]) -> None:
+        """Закрывает ожидающие Bluetooth-обнаружения этих устройств: их заменяет массовое добавление."""
+        wanted = set(addresses)
+        for flow in self.hass.config_entries.flow.async_progress_by_handler(DOMAIN):
+            if flow["flow_id"] != self.flow_id and flow["context"].get("unique_id") in wanted:
+                self.hass.config_entries.flow.async_abort(flow["flow_id"])
+
+    async def async_step_bulk_import(self, import_data: dict[str, Any]) -> FlowResult:
+        """Запись для устройства, уже проверенного в массовом добавлении."""
+        self.mac = import_data[CONF_MAC]
+        self.name = import_data["name"]
+        # Обнаружение того же устройства могло появиться уже после отмены — не мешает
+        await self.async_set_unique_id(self.mac, raise_on_progress=False)
+        self._abort_if_unique_id_configured()
+        return self._async_create_device_entry()
+
+    # =========================================================
+    # Виртуальная лента из уже настроенных контроллеров
+    # =========================================================
+    def _configured_devices(self) -> dict[str, str]:
+        """MAC -> название для всех настроенных физических контроллеров."""
+        return {
+            entry.data[CONF_MAC]: entry.title
+            for entry in self._async_current_entries(include_ignore=False)
+            if not entry.data.get(CONF_VIRTUAL) and entry.data.get(CONF_MAC)
+        }
+
+    def _members_selector(self, devices: dict[str, str]) -> SelectSelector:
+        return SelectSelector(
+            SelectSelectorConfig(
+                options=[
+                    SelectOptionDict(value=mac, label=f"{title} ({mac})")
+                    for mac, title in devices.items()
+                ],
+                multiple=True,
+                mode=SelectSelectorMode.DROPDOWN,
+            )
+        )
+
+    async def async_step_virtual(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Упорядоченный выбор контроллеров: порядок выбора — порядок вдоль ленты."""
+        errors: dict[str, str] = {}
+        devices = self._configured_devices()
+        if user_input is not None:
+            members = [m for m in user_input[CONF_MEMBERS] if m in devices]
+            if len(members) < 2:
+                errors["base"] = "not_enough_members"
+            else:
+                await self.async_set_unique_id(f"virtual_{'_'.join(members)}")
+                self._abort_if_unique_id_configured()
+                return self.async_create_entry(
+                    title=user_input["name"],
+                    data={CONF_VIRTUAL: True, "name": user_input["name"], CONF_MEMBERS: members},
+                )
+
+        return self.async_show_form(
+            step_id="virtual",
+            data_schema=vol.Schema(
+                {
+                    vol.Required("name"): str,
+                    vol.Required(CONF_MEMBERS): self._members_selector(devices),
+                }
+            ),
+            errors=errors,
+        )
+
+    # =========================================================
+    # Приём E1.31 (sACN) / DDP: контроллеры подряд по 3 канала
+    # =========================================================
+    async def async_step_realtime(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Порядок выбора — порядок пикселей начиная с universe/start_channel."""
+        errors: dict[str, str] = {}
+        devices = self._configured_devices()
+        if user_input is not None:
+            members = [m for m in user_input[CONF_MEMBERS] if m in devices]
+            port = user_input.get(CONF_PORT) or DEFAULT_PORTS[user_input[CONF_PROTOCOL]]
+            if not members:
+                errors["base"] = "no_devices_selected"
+            else:
+                # Один приёмник на порт: второй сокет на том же порту пакетов не получит
+                await self.async_set_unique_id(f"realtime_{port}")
+                self._abort_if_unique_id_configured()
+                protocol = user_input[CONF_PROTOCOL]
+                return self.async_create_entry(
+                    title=f"{protocol.upper()} :{port}",
+                    data={
+                        CONF_REALTIME: True,
+                        CONF_PROTOCOL: protocol,
+                        CONF_PORT: port,
+                        CONF_UNIVERSE: user_input[CONF_UNIVERSE],
+                        CONF_START_CHANNEL: user_input[CONF_START_CHANNEL],
+                        CONF_MEMBERS: members,
+                    },
+                )
+
+        return self.async_show_form(
+            step_id="realtime",
+            data_schema=vol.Schema(
+                {
+                    vol.Required(CONF_PROTOCOL, default=PROTOCOL_E131): vol.In(REALTIME_PROTOCOLS),
+                    vol.Optional(CONF_PORT): vol.All(vol.Coerce(int), vol.Range(min=1, max=65535)),
+                    vol.Required(CONF_UNIVERSE, default=1): vol.All(vol.Coerce(int), vol.Range(min=1, max=63999)),
+                    vol.Required(CONF_START_CHANNEL, default=1): vol.All(vol.Coerce(int), vol.Range(min=1)),
+                    vol.Required(CONF_MEMBERS): self._members_selector(devices),
+                }
+            ),
+            errors=errors,
+        )
+
     # =========================================================
     # Проверка доступности устройства
     # =========================================================
@@ -135,22 +396,26 @@ class BLEDOMFlowHandler(config_entries.ConfigFlow, domain=DOMAIN):
                 return self.async_abort(reason="cannot_connect")
 
             LOGGER.info("Validated ELK-BLEDOM: %s (%s)", self.name, self.mac)
-            return self.async_create_entry(
-                title=self.name,
-                data={
-                    CONF_MAC: self.mac,
-                    "name": self.name,
-                    CONF_RESET: False,
-                    CONF_DELAY: 0,
-                },
-                options={
-                    CONF_BRIGHTNESS_MODE: DEFAULT_BRIGHTNESS_MODE
-                }
-            )
+            return self._async_create_device_entry()
         except Exception as e:
             LOGGER.error("Validation error for %s: %s", self.mac, e)
             return self.async_abort(reason="cannot_connect")
 
+    @callback
+    def _async_create_device_entry(self) -> FlowResult:
+        return self.async_create_entry(
+            title=self.name,
+            data={
+                CONF_MAC: self.mac,
+                "name": self.name,
+                CONF_RESET: False,
+                CONF_DELAY: 0,
+            },
+            options={
+                CONF_BRIGHTNESS_MODE: DEFAULT_BRIGHTNESS_MODE
+            }
+        )
+
     # =========================================================
     # Ввод MAC вручную
     # =========================================================
@@ -183,6 +448,12 @@ class BLEDOMFlowHandler(config_entries.ConfigFlow, domain=DOMAIN):
         """Возврат обработчика опций."""
         return OptionsFlowHandler(config_entry)
 
+    @classmethod
+    @callback
+    def async_supports_options_flow(cls, config_entry: config_entries.ConfigEntry) -> bool:
+        """У виртуальной ленты и приёмника нет собственного соединения — и опций тоже."""
+        return not (config_entry.data.get(CONF_VIRTUAL) or config_entry.data.get(CONF_REALTIME))
+
 
 # =========================================================
 # Меню опций интеграции (Options Flow)
@@ -214,6 +485,8 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
                     CONF_RESET: user_input[CONF_RESET],
                     CONF_DELAY: user_input[CONF_DELAY],
                     CONF_BRIGHTNESS_MODE: user_input[CONF_BRIGHTNESS_MODE],
+                    CONF_CIRCADIAN: user_input[CONF_CIRCADIAN],
+                    CONF_OPTIMISTIC: user_input[CONF_OPTIMISTIC],
                 },
             )
 
@@ -227,6 +500,10 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
                         CONF_BRIGHTNESS_MODE,
                         default=options.get(CONF_BRIGHTNESS_MODE, DEFAULT_BRIGHTNESS_MODE),
                     ): vol.In(BRIGHTNESS_MODES),
+                    vol.Optional(CONF_CIRCADIAN, default=options.get(CONF_CIRCADIAN, False)): bool,
+                    vol.Optional(
+                        CONF_OPTIMISTIC, default=options.get(CONF_OPTIMISTIC, DEFAULT_OPTIMISTIC)
+                    ): bool,
                 }
             ),
             errors=errors,
@@ -1,4 +1,4 @@
-from enum import Enum
+from enum import Enum, IntFlag
 
 # =========================================================
 # Основные константы
@@ -8,6 +8,13 @@ DOMAIN = "elkbledom_fastlink"
 CONF_RESET = "reset"
 CONF_DELAY = "delay"
 
+# Оптимистичное состояние: UI обновляется сразу, запись идёт в фоне
+CONF_OPTIMISTIC = "optimistic"
+DEFAULT_OPTIMISTIC = True
+
+# Циркадный режим (температура и яркость следуют за солнцем)
+CONF_CIRCADIAN = "circadian"
+
 # Режимы яркости
 CONF_BRIGHTNESS_MODE = "brightness_mode"
 BRIGHTNESS_MODES = ["auto", "rgb", "native"]
@@ -122,6 +129,15 @@ EFFECT_PROFILES = {
 # =========================================================
 EFFECT_LABELS = {key: data["label"] for key, data in EFFECT_PROFILES.items()}
 
+# Таблицы для UI строятся один раз на процесс и разделяются всеми светильниками:
+# порядок — "none" первым, далее остальные по исходному EFFECTS_MAP
+EFFECT_KEY_TO_LABEL = {k: EFFECT_LABELS.get(k, k) for k in EFFECTS_MAP}
+EFFECT_LABEL_TO_KEY = {v: k for k, v in EFFECT_KEY_TO_LABEL.items()}
+EFFECT_ID_TO_KEY = {v: k for k, v in EFFECTS_MAP.items()}
+EFFECT_LABEL_LIST = [EFFECT_KEY_TO_LABEL["none"]] + [
+    label for key, label in EFFECT_KEY_TO_LABEL.items() if key != "none"
+]
+
 
 # =========================================================
 # Дни недели (для расписаний)
@@ -140,6 +156,71 @@ class WEEK_DAYS(Enum):
     none = 0x00
 
 
+def week_days_mask(days: list[str]) -> int:
+    """["monday", "weekend_days", ...] -> битовая маска WEEK_DAYS."""
+    mask = 0
+    for day in days:
+        mask |= WEEK_DAYS[day].value
+    return mask
+
+
+def week_days_names(mask: int) -> list[str]:
+    """Битовая маска -> список отдельных дней (monday..sunday)."""
+    return [
+        d.name for d in WEEK_DAYS
+        if d.value and d.value & (d.value - 1) == 0 and mask & d.value
+    ]
+
+
+# =========================================================
+# Встроенные таймеры контроллера
+# =========================================================
+TIMER_ON = "on"
+TIMER_OFF = "off"
+TIMER_TYPES = [TIMER_ON, TIMER_OFF]
+
+SERVICE_SET_TIMER = "set_timer"
+SERVICE_CLEAR_TIMER = "clear_timer"
+SERVICE_GET_TIMERS = "get_timers"
+
+# Потоковая отправка «сырых» кадров
+SERVICE_STREAM_FRAMES = "stream_frames"
+
+# Виртуальная лента из нескольких контроллеров
+CONF_VIRTUAL = "virtual"
+CONF_MEMBERS = "members"
+SERVICE_SET_GRADIENT = "set_gradient"
+
+# Приём E1.31 (sACN) / DDP от пульта или xLights
+CONF_REALTIME = "realtime"
+CONF_UNIVERSE = "universe"
+CONF_START_CHANNEL = "start_channel"
+
+# Синхронный старт эффектов на нескольких контроллерах
+SERVICE_SYNC_EFFECT = "sync_effect"
+
+# Трассировка команд
+SERVICE_EXPORT_TRACE = "export_trace"
+
+# Профилирование по запросу
+SERVICE_PROFILE = "profile"
+
+# Светомузыка
+SERVICE_AUDIO_START = "audio_start"
+SERVICE_AUDIO_STOP = "audio_stop"
+
+
+# =========================================================
+# Возможности сущностей для сервисов платформы light
+# =========================================================
+class BLEDOMEntityFeature(IntFlag):
+    """Биты выше LightEntityFeature: HA по ним отбирает сущности для сервиса."""
+
+    TIMERS = 1 << 16
+    STREAM_FRAMES = 1 << 17
+    GRADIENT = 1 << 18
+
+
 # =========================================================
 # Экспорт для других модулей
 # =========================================================
@@ -148,13 +229,41 @@ __all__ = [
     "CONF_RESET",
     "CONF_DELAY",
     "CONF_BRIGHTNESS_MODE",
+    "CONF_OPTIMISTIC",
+    "DEFAULT_OPTIMISTIC",
+    "CONF_CIRCADIAN",
     "BRIGHTNESS_MODES",
     "DEFAULT_BRIGHTNESS_MODE",
     "EFFECTS",
     "EFFECTS_MAP",
     "EFFECT_LABELS",
     "EFFECT_PROFILES",
+    "EFFECT_KEY_TO_LABEL",
+    "EFFECT_LABEL_TO_KEY",
+    "EFFECT_ID_TO_KEY",
+    "EFFECT_LABEL_LIST",
     "WEEK_DAYS",
+    "week_days_mask",
+    "week_days_names",
+    "TIMER_ON",
+    "TIMER_OFF",
+    "TIMER_TYPES",
+    "SERVICE_SET_TIMER",
+    "SERVICE_CLEAR_TIMER",
+    "SERVICE_GET_TIMERS",
+    "SERVICE_STREAM_FRAMES",
+    "CONF_VIRTUAL",
+    "CONF_MEMBERS",
+    "SERVICE_SET_GRADIENT",
+    "BLEDOMEntityFeature",
+    "CONF_REALTIME",
+    "CONF_UNIVERSE",
+    "CONF_START_CHANNEL",
+    "SERVICE_SYNC_EFFECT",
+    "SERVICE_EXPORT_TRACE",
+    "SERVICE_PROFILE",
+    "SERVICE_AUDIO_START",
+    "SERVICE_AUDIO_STOP",
 ]
 
 
@@ -0,0 +1,44 @@
+"""Диагностика ELK-BLEDOM FastLink: соединение, состояние и трассировка команд."""
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from . import DATA_CIRCADIAN
+from .const import DOMAIN, CONF_CIRCADIAN, CONF_MEMBERS, CONF_REALTIME, CONF_VIRTUAL
+from .elkbledom import BLEDOMInstance
+from .realtime import RealtimeReceiver
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    """Файл «Скачать диагностику» для записи интеграции."""
+    data: dict[str, Any] = {
+        "entry": {
+            # MAC не скрываем — по нему диагностика сопоставляется с логами адаптера
+            "data": dict(entry.data),
+            "options": dict(entry.options),
+        }
+    }
+    if entry.data.get(CONF_VIRTUAL):
+        loaded = {
+            inst.address
+            for inst in hass.data.get(DOMAIN, {}).values()
+            if isinstance(inst, BLEDOMInstance)
+        }
+        data["members"] = {addr: addr in loaded for addr in entry.data[CONF_MEMBERS]}
+        return data
+
+    if entry.data.get(CONF_REALTIME):
+        receiver: RealtimeReceiver | None = hass.data.get(DOMAIN, {}).get(entry.entry_id)
+        data["receiver"] = receiver.diagnostics() if receiver else None
+        return data
+
+    instance: BLEDOMInstance | None = hass.data.get(DOMAIN, {}).get(entry.entry_id)
+    data["device"] = instance.diagnostics() if instance else None
+    if entry.options.get(CONF_CIRCADIAN) and DATA_CIRCADIAN in hass.data:
+        data["circadian"] = hass.data[DATA_CIRCADIAN].diagnostics()
+    return data
@@ -1,10 +1,18 @@
 import asyncio
+import contextvars
+import dataclasses
+import functools
+import hashlib
 import logging
 import json
-import os
+import time
+from datetime import datetime
 from typing import Tuple, TypeVar, Callable, cast, Any
+from bleak.backends.device import BLEDevice
 from bleak.backends.service import BleakGATTServiceCollection
 
+from bleak.exc import BleakError
+
 # Совместимость с разными версиями bleak
 try:
     from bleak.exc import BleakDBusError
@@ -21,45 +29,60 @@ from bleak_retry_connector import (
     BLEAK_RETRY_EXCEPTIONS as BLEAK_EXCEPTIONS,
     establish_connection,
 )
-from homeassistant.components.bluetooth import async_ble_device_from_address
-from homeassistant.exceptions import ConfigEntryNotReady
-from .const import DEFAULT_BRIGHTNESS_MODE
+from .backend import DeviceNotFound, DeviceResolver, RunBlocking, StateStore, run_in_executor
+from .const import DEFAULT_BRIGHTNESS_MODE, TIMER_ON, TIMER_OFF, week_days_names
+from .airtime import AirtimeScheduler
+from .breaker import CircuitBreaker
+from .models import DeviceState, ModelProfile, profile_for_name
+from .tracing import Tracer
+from .writer import (
+    COMMAND_DEADLINE,
+    BLEDOMWriter,
+    CommandToken,
+    Priority,
+    Superseded,
+    command_scope,
+    current_command,
+    raise_if_superseded,
+    write_priority,
+)
 
 LOGGER = logging.getLogger(__name__)
 
 # ---------------------------------------------------------
 # BLE-названия и настройки
 # ---------------------------------------------------------
-NAME_ARRAY = ["ELK-BLEDDM", "ELK-BLE", "LEDBLE", "MELK", "ELK-BULB2", "ELK-BULB", "ELK-LAMPL", "MELK-OG10W"]
-WRITE_CHARACTERISTIC_UUIDS = ["0000fff3-0000-1000-8000-00805f9b34fb"] * 8
-TURN_ON_CMD = [
-    [0x7E, 0x00, 0x04, 0xF0, 0x00, 0x01, 0xFF, 0x00, 0xEF],  # ELK-BLEDDM
-    [0x7E, 0x00, 0x04, 0xF0, 0x00, 0x01, 0xFF, 0x00, 0xEF],  # ELK-BLE
-    [0x7E, 0x00, 0x04, 0xF0, 0x00, 0x01, 0xFF, 0x00, 0xEF],  # LEDBLE
-    [0x7E, 0x00, 0x04, 0xF0, 0x00, 0x01, 0xFF, 0x00, 0xEF],  # MELK
-    [0x7E, 0x00, 0x04, 0xF0, 0x00, 0x01, 0xFF, 0x00, 0xEF],  # ELK-BULB2
-    [0x7E, 0x00, 0x04, 0xF0, 0x00, 0x01, 0xFF, 0x00, 0xEF],  # ELK-BULB
-    [0x7E, 0x00, 0x04, 0xF0, 0x00, 0x01, 0xFF, 0x00, 0xEF],  # ELK-LAMPL
-    [0x7E, 0x07, 0x04, 0xFF, 0x00, 0x01, 0x02, 0x01, 0xEF],  # MELK-OG10W
-]
-TURN_OFF_CMD = [
-    [0x7E, 0x00, 0x04, 0x00, 0x00, 0x00, 0xFF, 0x00, 0xEF],  # ELK-BLEDDM
-    [0x7E, 0x00, 0x04, 0x00, 0x00, 0x00, 0xFF, 0x00, 0xEF],  # ELK-BLE
-    [0x7E, 0x00, 0x04, 0x00, 0x00, 0x00, 0xFF, 0x00, 0xEF],  # LEDBLE
-    [0x7E, 0x00, 0x04, 0x00, 0x00, 0x00, 0xFF, 0x00, 0xEF],  # MELK
-    [0x7E, 0x00, 0x04, 0x00, 0x00, 0x00, 0xFF, 0x00, 0xEF],  # ELK-BULB2
-    [0x7E, 0x00, 0x04, 0x00, 0x00, 0x00, 0xFF, 0x00, 0xEF],  # ELK-BULB
-    [0x7E, 0x00, 0x04, 0x00, 0x00, 0x00, 0xFF, 0x00, 0xEF],  # ELK-LAMPL
-    [0x7E, 0x07, 0x04, 0x00, 0x00, 0x00, 0x02, 0x01, 0xEF],  # MELK-OG10W
-]
-
-# Реалистичные диапазоны кельвинов для RGB-эмуляции
-MIN_COLOR_TEMPS_K = [1800] * 7 + [1800]
-MAX_COLOR_TEMPS_K = [7000] * 7 + [7000]
+WRITE_CHARACTERISTIC_UUIDS = ["0000fff3-0000-1000-8000-00805f9b34fb"]
+NOTIFY_CHARACTERISTIC_UUID = "0000fff4-0000-1000-8000-00805f9b34fb"
+FIRMWARE_REVISION_UUID = "00002a26-0000-1000-8000-00805f9b34fb"
+QUERY_STATE_CMD = [0x7E, 0x00, 0x81, 0x00, 0x00, 0x00, 0x00, 0x00, 0xEF]
+
+# Встроенные таймеры: 7E 00 82 HH MM 00 <тип> <дни | 0x80 если включён> EF
+TIMER_CODES = {TIMER_ON: 0x00, TIMER_OFF: 0x01}
+TIMER_ENABLED_FLAG = 0x80
+
+# Переподключение и офлайн-журнал
+RECONNECT_BACKOFF = 5.0  # пауза перед повтором, пока предохранитель замкнут
+POWER_ON_SETTLE = 0.2  # пауза после кадра включения перед цветом
+
+# Анимации: быстрый путь цвета и отложенное сохранение состояния
+ANIMATION_FRAME_DEADLINE = 0.5  # кадр анимации старше этого уже не нужен
+SAVE_DEBOUNCE = 5.0
+
+# Синхронный старт эффектов на нескольких контроллерах
+SYNC_LATENCY_SAMPLES = 3
+SYNC_MARGIN = 0.05  # сек; запас сверх задержки самого медленного контроллера
+
+# Потоковая отправка «сырых» кадров
+MAX_FRAME_LEN = 20  # полезная нагрузка одного ATT-пакета при MTU 23
+MAX_STREAM_FRAMES = 10000
+
+# Проба нативной яркости для режима "auto"
+BRIGHTNESS_PROBE_TIMEOUT = 1.5
+STATUS_MIN_LEN = 4  # 7E, длина, данные..., EF
 
 DEFAULT_ATTEMPTS = 3
 BLEAK_BACKOFF_TIME = 0.25
-STATE_FILE = "/config/.storage/elkbledom_fastlink_state.json"
 RETRY_BACKOFF_EXCEPTIONS = (BleakDBusError,)
 WrapFuncType = TypeVar("WrapFuncType", bound=Callable[..., Any])
 
@@ -69,133 +92,467 @@ WrapFuncType = TypeVar("WrapFuncType", bound=Callable[..., Any])
 def retry_bluetooth_connection_error(func: WrapFuncType) -> WrapFuncType:
     async def _async_wrap_retry(self: "BLEDOMInstance", *args, **kwargs):
         for attempt in range(DEFAULT_ATTEMPTS):
+            token = current_command()
+            if attempt and token is not None and token.expired(asyncio.get_running_loop().time()):
+                # Пришла более новая команда (или истёк дедлайн) — повтор бессмыслен
+                LOGGER.debug("%s: retry of %s dropped (superseded)", self.name, token.key)
+                self._tracer.event("retry_dropped", op=func.__name__, key=token.key)
+                return None
             try:
                 return await func(self, *args, **kwargs)
             except BleakNotFoundError:
                 raise
             except RETRY_BACKOFF_EXCEPTIONS as err:
+                self._tracer.event("retry", op=func.__name__, attempt=attempt, error=str(err))
                 if attempt == DEFAULT_ATTEMPTS - 1:
                     LOGGER.error("%s: BLE retry exhausted: %s", self.name, err)
                     raise
-                await asyncio.sleep(BLEAK_BACKOFF_TIME)
+                with self._tracer.span("sleep", reason="retry_backoff"):
+                    await asyncio.sleep(BLEAK_BACKOFF_TIME)
             except BLEAK_EXCEPTIONS as err:
+                self._tracer.event("retry", op=func.__name__, attempt=attempt, error=str(err))
                 if attempt == DEFAULT_ATTEMPTS - 1:
                     LOGGER.error("%s: BLE exception: %s", self.name, err)
                     raise
     return cast(WrapFuncType, _async_wrap_retry)
 
+# ---------------------------------------------------------
+# Проверка устройства при добавлении: реальное подключение + запись
+# ---------------------------------------------------------
+async def async_validate_ble_device(device: BLEDevice | None, address: str) -> tuple[bool, float, str | None]:
+    """Подключается, пишет безобидный запрос состояния и отключается.
+
+    Возвращает (доступно, время подключения в секундах, ошибка).
+    """
+    if not device:
+        return False, 0.0, "not found"
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    client: BleakClientWithServiceCache | None = None
+    try:
+        client = await establish_connection(
+            BleakClientWithServiceCache, device, device.name or address
+        )
+        connect_time = loop.time() - started
+        char = None
+        for uuid in WRITE_CHARACTERISTIC_UUIDS:
+            char = client.services.get_characteristic(uuid)
+            if char:
+                break
+        if char is None:
+            return False, connect_time, "write characteristic not found"
+        await client.write_gatt_char(char, bytearray(QUERY_STATE_CMD), False)
+        return True, connect_time, None
+    except Exception as e:
+        return False, loop.time() - started, str(e) or type(e).__name__
+    finally:
+        if client is not None:
+            try:
+                await client.disconnect()
+            except Exception:
+                pass
+
+def _brightness_echoed(first: bytes, second: bytes, p1: int, p2: int) -> bool:
+    """Статусы после яркости p1 и p2 различаются только байтами, равными p1 / p2."""
+    if len(first) != len(second):
+        return False
+    changed = [i for i in range(1, len(first) - 1) if first[i] != second[i]]
+    return bool(changed) and all(first[i] == p1 and second[i] == p2 for i in changed)
+
+# ---------------------------------------------------------
+# Разбор потока «сырых» кадров: "7E0004F00001FF00EF" или "7E 00 ... EF@50"
+# (после @ — пауза в миллисекундах после кадра)
+# ---------------------------------------------------------
+def parse_frame_stream(entries: list[str], default_delay_ms: float = 0.0) -> list[tuple[bytes, float]]:
+    frames: list[tuple[bytes, float]] = []
+    for entry in entries:
+        data, _, delay = str(entry).partition("@")
+        try:
+            frame = bytes.fromhex(data.replace(":", " "))
+            delay_ms = float(delay) if delay else default_delay_ms
+        except ValueError as e:
+            raise ValueError(f"invalid frame {entry!r}: {e}") from e
+        if not 0 < len(frame) <= MAX_FRAME_LEN:
+            raise ValueError(f"invalid frame {entry!r}: length must be 1..{MAX_FRAME_LEN} bytes")
+        if delay_ms < 0:
+            raise ValueError(f"invalid frame {entry!r}: negative delay")
+        frames.append((frame, delay_ms / 1000))
+    if len(frames) > MAX_STREAM_FRAMES:
+        raise ValueError(f"too many frames ({len(frames)} > {MAX_STREAM_FRAMES})")
+    return frames
+
+# ---------------------------------------------------------
+# Синхронный старт эффекта на нескольких контроллерах
+# ---------------------------------------------------------
+async def async_sync_effect(
+    instances: list["BLEDOMInstance"], value: int | None = None, speed: int | None = None
+) -> dict[str, Any]:
+    """Запускает эффект на нескольких контроллерах так, чтобы кадры пришли одновременно.
+
+    У каждого контроллера замеряется задержка доставки, общий момент прихода
+    назначается с запасом на самый медленный, а кадр каждому уходит раньше
+    на его собственную задержку. value=None — перезапуск текущего эффекта
+    каждого контроллера (выравнивание фазы).
+    """
+    if speed is not None:
+        await asyncio.gather(*(inst.set_effect_speed(speed) for inst in instances), return_exceptions=True)
+
+    targets = [(inst, value if value is not None else inst.effect) for inst in instances]
+    report: dict[str, Any] = {
+        inst.address: {"ok": False, "error": "no effect running"} for inst, v in targets if not v
+    }
+    targets = [(inst, v) for inst, v in targets if v]
+
+    latencies = await asyncio.gather(*(inst.measure_latency() for inst, _ in targets), return_exceptions=True)
+    ready = []
+    for (inst, v), lat in zip(targets, latencies):
+        if isinstance(lat, BaseException):
+            report[inst.address] = {"ok": False, "error": str(lat) or type(lat).__name__}
+        else:
+            ready.append((inst, v, lat))
+    if not ready:
+        return {"devices": report}
+
+    loop = asyncio.get_running_loop()
+    arrival = loop.time() + max(lat for _, _, lat in ready) + SYNC_MARGIN
+    results = await asyncio.gather(
+        *(inst.fire_effect_at(arrival - lat, v) for inst, v, lat in ready), return_exceptions=True
+    )
+    for (inst, _, lat), res in zip(ready, results):
+        entry: dict[str, Any] = {"ok": not isinstance(res, BaseException), "latency_ms": round(lat * 1000, 2)}
+        if isinstance(res, BaseException):
+            entry["error"] = str(res) or type(res).__name__
+        report[inst.address] = entry
+    return {"devices": report}
+
+
+# ---------------------------------------------------------
+# Декоратор поколений команд: новая команда над тем же атрибутом
+# отменяет ещё не отправленные кадры и повторы предыдущих
+# ---------------------------------------------------------
+def supersedable(key: str, deadline: float = COMMAND_DEADLINE) -> Callable[[WrapFuncType], WrapFuncType]:
+    def decorator(func: WrapFuncType) -> WrapFuncType:
+        @functools.wraps(func)
+        async def _async_wrap_command(self: "BLEDOMInstance", *args, **kwargs):
+            outer = current_command()
+            if outer is not None and outer.key == key:
+                # Вложенный вызов той же команды — остаётся в её поколении
+                return await func(self, *args, **kwargs)
+            generation = self._generations.get(key, 0) + 1
+            self._generations[key] = generation
+            token = CommandToken(
+                key, generation, asyncio.get_running_loop().time() + deadline, self._generations
+            )
+            with command_scope(token):
+                try:
+                    return await func(self, *args, **kwargs)
+                except Superseded:
+                    # Состояние уже принадлежит более новой команде
+                    LOGGER.debug("%s: %s superseded", self.name, func.__name__)
+                    self._tracer.event("superseded", op=func.__name__, key=key)
+                    return None
+        return cast(WrapFuncType, _async_wrap_command)
+    return decorator
+
 # ---------------------------------------------------------
 # Класс экземпляра устройства
 # ---------------------------------------------------------
 class BLEDOMInstance:
-    def __init__(self, address, reset: bool, delay: int, hass) -> None:
+    """Управление одним контроллером; не зависит от Home Assistant.
+
+    resolver находит BLEDevice и сообщает о рекламе, store хранит состояние
+    между перезапусками, run_blocking выполняет блокирующий ввод-вывод вне
+    event loop, now — локальное время для часов и таймеров контроллера,
+    airtime — общий на процесс бюджет эфира адаптеров (None — без ограничения).
+    """
+
+    def __init__(
+        self,
+        address: str,
+        reset: bool,
+        delay: int,
+        resolver: DeviceResolver,
+        store: StateStore,
+        run_blocking: RunBlocking = run_in_executor,
+        now: Callable[[], datetime] = lambda: datetime.now().astimezone(),
+        airtime: AirtimeScheduler | None = None,
+    ) -> None:
         self.address = address
         self._reset = reset
         self._delay = delay
-        self._hass = hass
+        self._store = store
+        self._run_blocking = run_blocking
+        self._now = now
+        self._stopping = False
 
-        self._device = async_ble_device_from_address(hass, address)
+        self._device = resolver.resolve(address)
         if not self._device:
-            raise ConfigEntryNotReady(f"Bluetooth device {address} not found.")
+            raise DeviceNotFound(f"Bluetooth device {address} not found.")
 
         self._client: BleakClientWithServiceCache | None = None
         self._connect_lock = asyncio.Lock()
         self._cached_services: BleakGATTServiceCollection | None = None
         self._write_uuid = None
+        # Кольцевой буфер трассировки: подключения, ожидания, повторы, записи
+        self._tracer = Tracer(f"{self.name} ({address})")
+        self._airtime = airtime.share(address, lambda: self.adapter) if airtime else None
+        self._writer = BLEDOMWriter(
+            self.name, self._async_connect_for_write, self._send_frame, self._tracer, self._airtime
+        )
+        # Текущее поколение команд по атрибутам ("power", "color", ...)
+        self._generations: dict[str, int] = {}
 
         # Начальные значения
-        self._is_on = False
-        self._rgb_color: Tuple[int, int, int] = (255, 255, 255)
-        self._brightness: int = 255
-        self._color_temp_kelvin: int = 5000
-
-        self._effect_speed: int = 16
-        self._last_effect: int | None = None
-
-        self._min_color_temp_kelvin = 1800
-        self._max_color_temp_kelvin = 7000
+        self._state = DeviceState()
 
-        self._brightness_mode: str = DEFAULT_BRIGHTNESS_MODE
-        self._is_melk_og10w = False  # Флаг для специальной модели
+        # Подписчики на изменения состояния (все сущности устройства)
+        self._listeners: list[Callable[[], None]] = []
+        self._notify_pending = False
+        # Предохранитель: мёртвое устройство не задерживает команды и не занимает эфир
+        self._breaker = CircuitBreaker()
+        self._reconnect_task: asyncio.Task | None = None
+        # Офлайн-журнал: желаемое состояние уже в self._state, флаг — «не доставлено»
+        self._journal_pending = False
 
-        self._detect_model()
-        asyncio.create_task(self._async_init_state())
-        asyncio.create_task(self._delayed_connect())
-        asyncio.create_task(self._heartbeat())
+        # Результат пробы для "auto": {"fingerprint": ..., "strategy": "native"|"rgb"}
+        self._brightness_caps: dict | None = None
+        self._probe_task: asyncio.Task | None = None
+        self._profile: ModelProfile = self._detect_model()
+        self._save_handle: asyncio.TimerHandle | None = None
+        self._link_latency: float | None = None  # оценка доставки кадра, сек
+        self._init_task = asyncio.create_task(self._async_init_state())
+        self._background = [
+            asyncio.create_task(self._delayed_connect()),
+            asyncio.create_task(self._heartbeat()),
+        ]
+        # Реклама устройства в эфире — повод досрочно проверить разомкнутый предохранитель
+        self._unsub_advertisement = resolver.watch(address, self._on_advertisement)
 
     # ---------------------------------------------------------
-    # JSON-состояние (асинхронно)
+    # Состояние между перезапусками (StateStore, вне event loop)
     # ---------------------------------------------------------
-    def _load_state_sync(self):
-        try:
-            os.makedirs(os.path.dirname(STATE_FILE), exist_ok=True)
-            if os.path.exists(STATE_FILE):
-                with open(STATE_FILE, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                    return data.get(self.address, {})
-        except Exception as e:
-            LOGGER.warning("Failed to load state for %s: %s", self.address, e)
-        return {}
-
     async def _async_load_state(self):
-        return await self._hass.async_add_executor_job(self._load_state_sync)
-
-    def _save_state_sync(self, payload: dict | None = None):
-        try:
-            os.makedirs(os.path.dirname(STATE_FILE), exist_ok=True)
-            data: dict = {}
-            if os.path.exists(STATE_FILE):
-                try:
-                    with open(STATE_FILE, "r", encoding="utf-8") as f:
-                        data = json.load(f)
-                except json.JSONDecodeError:
-                    data = {}
-
-            if payload is None:
-                payload = {
-                    "rgb": self._rgb_color,
-                    "brightness": self._brightness,
-                    "color_temp": self._color_temp_kelvin,
-                    "brightness_mode": self._brightness_mode,
-                }
-
-            data[self.address] = payload
-            with open(STATE_FILE, "w", encoding="utf-8") as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
-        except Exception as e:
-            LOGGER.error("Failed to save state for %s: %s", self.address, e)
+        return await self._run_blocking(self._store.load, self.address)
 
     async def _async_save_state(self, payload: dict | None = None):
-        await self._hass.async_add_executor_job(self._save_state_sync, payload)
+        # Снимок — в event loop: executor не должен читать изменяемое состояние
+        if payload is None:
+            payload = self._state_payload()
+        queued = time.perf_counter()
+
+        def _job() -> None:
+            # Ожидание свободного потока executor'а — отдельным спаном
+            self._tracer.record("executor_queue", queued)
+            with self._tracer.span("save_state"):
+                self._store.save(self.address, payload)
+
+        await self._run_blocking(_job)
+
+    def _schedule_save(self) -> None:
+        """Отложенное сохранение: частые изменения (анимации) пишут файл раз в SAVE_DEBOUNCE."""
+        if self._save_handle is None:
+            self._save_handle = asyncio.get_running_loop().call_later(
+                SAVE_DEBOUNCE, self._run_scheduled_save
+            )
+
+    def _run_scheduled_save(self) -> None:
+        self._save_handle = None
+        asyncio.create_task(self._async_save_state())
+
+    def _state_payload(self) -> dict:
+        st = self._state
+        payload = {
+            "rgb": st.rgb,
+            "brightness": st.brightness,
+            "color_temp": st.color_temp_kelvin,
+            "brightness_mode": st.brightness_mode,
+        }
+        if self._brightness_caps:
+            payload["brightness_caps"] = self._brightness_caps
+        if st.timers:
+            payload["timers"] = st.timers
+        return payload
 
     async def _async_init_state(self):
         state = await self._async_load_state()
-        self._rgb_color = tuple(state.get("rgb", (255, 255, 255)))  # type: ignore[arg-type]
-        self._brightness = int(state.get("brightness", 255))
-        self._color_temp_kelvin = int(state.get("color_temp", 5000))
-        self._brightness_mode = str(state.get("brightness_mode", DEFAULT_BRIGHTNESS_MODE))
+        st = self._state
+        st.rgb = tuple(state.get("rgb", (255, 255, 255)))  # type: ignore[assignment]
+        st.brightness = int(state.get("brightness", 255))
+        st.color_temp_kelvin = int(state.get("color_temp", 5000))
+        st.brightness_mode = str(state.get("brightness_mode", DEFAULT_BRIGHTNESS_MODE))
+        timers = state.get("timers")
+        if isinstance(timers, dict):
+            st.timers = {k: v for k, v in timers.items() if k in TIMER_CODES}
+        caps = state.get("brightness_caps")
+        if isinstance(caps, dict) and caps.get("strategy") in ("native", "rgb"):
+            self._brightness_caps = caps
 
     # ---------------------------------------------------------
     # Режим яркости и переподключение
     # ---------------------------------------------------------
+    async def async_apply_options(self, reset: bool, delay: int, brightness_mode: str):
+        """Применяет опции на живом экземпляре — BLE-связь не трогаем."""
+        # Опции приоритетнее сохранённого состояния — ждём его загрузки
+        await self._init_task
+        self._reset = reset
+        self._delay = delay
+        await self.apply_brightness_mode(brightness_mode)
+
     async def apply_brightness_mode(self, mode: str):
         mode = (mode or DEFAULT_BRIGHTNESS_MODE).lower()
         if mode not in ("auto", "rgb", "native"):
             mode = DEFAULT_BRIGHTNESS_MODE
-        if mode == self._brightness_mode:
+        if mode == self._state.brightness_mode:
             return
-        self._brightness_mode = mode
-        await self._async_save_state()
-        await self.reconnect()
+        self._state.brightness_mode = mode
+        LOGGER.info("%s: brightness mode changed to %s", self.name, mode)
+        self._async_state_changed()
+        if mode == "auto":
+            self._schedule_brightness_probe()
+        if self._state.is_on and self._client and self._client.is_connected:
+            # Сразу переприменяем яркость в новом режиме (заодно сохраняет состояние)
+            await self.set_brightness(self._state.brightness)
+        else:
+            await self._async_save_state()
 
-    async def reconnect(self):
+    # ---------------------------------------------------------
+    # Проба возможностей яркости (auto)
+    # ---------------------------------------------------------
+    @property
+    def brightness_strategy(self) -> str:
+        """Фактическая стратегия яркости: "auto" разрешается результатом пробы."""
+        mode = (self._state.brightness_mode or DEFAULT_BRIGHTNESS_MODE).lower()
+        if mode != "auto":
+            return mode
+        if not self._profile.native_brightness:
+            return "rgb"
+        if self._brightness_caps:
+            return self._brightness_caps["strategy"]
+        # До пробы ведём себя как раньше: нативная яркость + RGB
+        return "native"
+
+    async def _async_device_fingerprint(self, client: BleakClientWithServiceCache) -> str:
+        """Модель + прошивка (или хэш таблицы GATT, если ревизию не прочитать)."""
+        firmware = None
+        if client.services.get_characteristic(FIRMWARE_REVISION_UUID):
+            try:
+                raw = await client.read_gatt_char(FIRMWARE_REVISION_UUID)
+                firmware = bytes(raw).decode("utf-8", "ignore").strip("\x00 ")
+            except Exception as e:
+                LOGGER.debug("%s: firmware revision read failed: %s", self.name, e)
+        if not firmware:
+            services = json.dumps(self._serialize_services(client.services), sort_keys=True)
+            firmware = "gatt-" + hashlib.sha1(services.encode()).hexdigest()[:12]
+        return f"{self._device.name}|{firmware}"
+
+    def _schedule_brightness_probe(self) -> None:
+        if (self._state.brightness_mode or DEFAULT_BRIGHTNESS_MODE).lower() != "auto":
+            return
+        if not self._profile.native_brightness:
+            return  # модель заведомо без нативной яркости — пробовать нечего
+        if self._probe_task and not self._probe_task.done():
+            return
+        # Чистый контекст: проба не принадлежит команде, во время которой подключились
+        self._probe_task = asyncio.create_task(self._async_probe_brightness(), context=contextvars.Context())
+
+    async def _async_probe_brightness(self) -> None:
+        client = self._client
+        if not client or not client.is_connected or self._write_uuid is None:
+            return
         try:
-            await self.stop()
-        except Exception:
-            pass
-        await asyncio.sleep(1.0)
-        await self._ensure_connected()
-        LOGGER.info("%s: reconnected after mode change (%s)", self.name, self._brightness_mode)
+            fingerprint = await self._async_device_fingerprint(client)
+            caps = self._brightness_caps
+            if caps and caps.get("fingerprint") == fingerprint:
+                return
+
+            # Текущая яркость — проба не даёт видимого скачка
+            percent = round(self._state.brightness * 100 / 255)
+            with write_priority(Priority.BACKGROUND):
+                strategy = await self._async_probe_native(client, percent)
+
+            self._brightness_caps = {"fingerprint": fingerprint, "strategy": strategy}
+            LOGGER.info("%s: brightness auto resolved to %s", self.name, strategy)
+            await self._async_save_state()
+        except Exception as e:
+            LOGGER.debug("%s: brightness probe failed: %s", self.name, e)
+
+    async def _async_probe_native(self, client: BleakClientWithServiceCache, percent: int) -> str:
+        """Нативная яркость подтверждается только статусом контроллера.
+
+        Две нативные команды с соседними значениями, после каждой — запрос
+        статуса. Контроллер понимает команду, если ответы отличаются ровно в
+        тех байтах, где стоят отправленные проценты. Подтверждение ATT-записи
+        ничего не доказывает: его отдаёт любой контроллер.
+        """
+        notify = None
+        if self._profile.notify:
+            notify = client.services.get_characteristic(NOTIFY_CHARACTERISTIC_UUID)
+        if notify is None or "notify" not in notify.properties:
+            # Проверить нечем — верим заявленным возможностям модели
+            return "native" if self._profile.native_brightness else "rgb"
+
+        other = percent - 1 if percent > 1 else percent + 1
+        replies: asyncio.Queue[bytes] = asyncio.Queue()
+        await client.start_notify(notify, lambda _c, data: replies.put_nowait(bytes(data)))
+        try:
+            first = await self._async_query_status(replies, percent)
+            second = await self._async_query_status(replies, other)
+        finally:
+            try:
+                await client.stop_notify(notify)
+            except Exception:
+                pass
+        echoed = first is not None and second is not None and _brightness_echoed(first, second, percent, other)
+        # native — возвращаем исходную яркость; rgb — нативный регистр на 100 %:
+        # контроллер, который кадр применяет, но не отражает в статусе, иначе
+        # умножал бы RGB-масштабирование на оставшийся процент
+        await self._write_delivered(self._native_brightness_frame(percent if echoed else 100))
+        return "native" if echoed else "rgb"
+
+    async def _async_query_status(self, replies: asyncio.Queue[bytes], percent: int) -> bytes | None:
+        """Нативная яркость percent, затем первый кадр статуса 7E … EF (или None по таймауту)."""
+        while not replies.empty():
+            replies.get_nowait()  # ответы на чужие запросы
+        # Недоставленная проба — ошибка, а не «нет поддержки»: результат не запоминается
+        await self._write_delivered(self._native_brightness_frame(percent), QUERY_STATE_CMD)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + BRIGHTNESS_PROBE_TIMEOUT
+        while (remaining := deadline - loop.time()) > 0:
+            try:
+                reply = await asyncio.wait_for(replies.get(), remaining)
+            except asyncio.TimeoutError:
+                break
+            if len(reply) >= STATUS_MIN_LEN and reply[0] == 0x7E and reply[-1] == 0xEF:
+                return reply
+        return None
+
+    # ---------------------------------------------------------
+    # Подписка на изменения состояния
+    # ---------------------------------------------------------
+    def async_add_listener(self, update_callback: Callable[[], None]) -> Callable[[], None]:
+        """Подписка на изменения; возвращает функцию отписки."""
+        self._listeners.append(update_callback)
+
+        def _remove() -> None:
+            if update_callback in self._listeners:
+                self._listeners.remove(update_callback)
+
+        return _remove
+
+    def _async_state_changed(self) -> None:
+        """Объединяет изменения: не больше одного оповещения за тик event loop."""
+        if self._notify_pending or not self._listeners:
+            return
+        self._notify_pending = True
+        asyncio.get_running_loop().call_soon(self._async_fire_listeners)
+
+    def _async_fire_listeners(self) -> None:
+        self._notify_pending = False
+        for update_callback in list(self._listeners):
+            try:
+                update_callback()
+            except Exception as e:
+                LOGGER.error("%s: state listener failed: %s", self.name, e)
 
     # ---------------------------------------------------------
     # Свойства
@@ -204,22 +561,90 @@ class BLEDOMInstance:
     def name(self):
         return self._device.name if self._device else self.address
 
+    @property
+    def available(self) -> bool:
+        """Недоступно, пока предохранитель разомкнут (до успешного подключения)."""
+        return self._breaker.closed
+
+    def state_snapshot(self) -> DeviceState:
+        """Копия состояния — чтобы откатить оптимистичную команду, если запись не удалась."""
+        return dataclasses.replace(self._state, timers=dict(self._state.timers))
+
+    def restore_state(self, snapshot: DeviceState) -> None:
+        # На месте, а не заменой объекта: выполняющиеся команды держат ссылку на него
+        for f in dataclasses.fields(DeviceState):
+            setattr(self._state, f.name, getattr(snapshot, f.name))
+        self._async_state_changed()
+        self._schedule_save()
+
+    @property
+    def adapter(self) -> str:
+        """Адаптер или BLE-прокси, через который сейчас виден контроллер."""
+        details = self._device.details if self._device else None
+        if isinstance(details, dict) and details.get("source"):
+            return str(details["source"])
+        return "default"
+
+    @property
+    def state(self) -> DeviceState:
+        return self._state
+
+    @property
+    def profile(self) -> ModelProfile:
+        return self._profile
+
     @property
     def is_on(self) -> bool:
         """Состояние включения устройства."""
-        return getattr(self, "_is_on", False)
+        return self._state.is_on
 
     @property
     def brightness(self) -> int:
-        return getattr(self, "_brightness", 255)
+        return self._state.brightness
 
     @property
     def rgb_color(self) -> tuple[int, int, int]:
-        return getattr(self, "_rgb_color", (255, 255, 255))
+        return self._state.rgb
 
     @property
     def color_temp_kelvin(self) -> int:
-        return getattr(self, "_color_temp_kelvin", 5000)
+        return self._state.color_temp_kelvin
+
+    @property
+    def min_color_temp_kelvin(self) -> int:
+        return self._profile.min_color_temp_kelvin
+
+    @property
+    def max_color_temp_kelvin(self) -> int:
+        return self._profile.max_color_temp_kelvin
+
+    @property
+    def color_mode(self) -> str:
+        return self._state.color_mode
+
+    @property
+    def effect(self) -> int | None:
+        return self._state.effect
+
+    @property
+    def effect_speed(self) -> int:
+        return self._state.effect_speed
+
+    @property
+    def brightness_mode(self) -> str:
+        return self._state.brightness_mode
+
+    @property
+    def timers(self) -> dict[str, dict]:
+        """Запрограммированные таймеры в читаемом виде (дни — списком имён)."""
+        return {
+            timer: {
+                "time": f"{t['hour']:02d}:{t['minute']:02d}",
+                "days": week_days_names(t["days"]),
+                "enabled": t["enabled"],
+            }
+            for timer, t in self._state.timers.items()
+        }
 
     # ---------------------------------------------------------
     # Подключение BLE
@@ -228,48 +653,106 @@ class BLEDOMInstance:
         await asyncio.sleep(3)
         await self._ensure_connected()
 
-    def _detect_model(self):
-        for i, name in enumerate(NAME_ARRAY):
-            if self._device.name and self._device.name.lower().startswith(name.lower()):
-                self._turn_on_cmd = TURN_ON_CMD[i]
-                self._turn_off_cmd = TURN_OFF_CMD[i]
-                self._min_color_temp_kelvin = MIN_COLOR_TEMPS_K[i]
-                self._max_color_temp_kelvin = MAX_COLOR_TEMPS_K[i]
-                # Проверяем, является ли это моделью MELK-OG10W
-                if name == "MELK-OG10W":
-                    self._is_melk_og10w = True
-                    LOGGER.info("%s: detected as MELK-OG10W model", self.name)
-                return
-        self._turn_on_cmd = TURN_ON_CMD[0]
-        self._turn_off_cmd = TURN_OFF_CMD[0]
+    def _detect_model(self) -> ModelProfile:
+        profile = profile_for_name(self._device.name)
+        LOGGER.debug("%s: detected as %s model", self.name, profile.name)
+        return profile
+
+    # ---------------------------------------------------------
+    # Таблица GATT
+    # ---------------------------------------------------------
+    @staticmethod
+    def _serialize_services(services: BleakGATTServiceCollection) -> dict[str, dict[str, int]]:
+        return {
+            str(svc.uuid): {str(ch.uuid): ch.handle for ch in svc.characteristics}
+            for svc in services
+        }
+
+    def _resolve_write_char(self, client: BleakClientWithServiceCache) -> None:
+        self._write_uuid = None
+        for uuid in WRITE_CHARACTERISTIC_UUIDS:
+            ch = client.services.get_characteristic(uuid)
+            if ch:
+                self._write_uuid = ch
+                break
+        if self._write_uuid is None:
+            LOGGER.error("%s: write characteristic not found", self.name)
+
+    @property
+    def is_connected(self) -> bool:
+        return bool(self._client and self._client.is_connected)
 
     async def _ensure_connected(self):
-        if self._client and self._client.is_connected:
+        if self.is_connected:
             return
+        waited = time.perf_counter()
         async with self._connect_lock:
+            self._tracer.record("lock_wait", waited, lock="connect")
+            if self.is_connected:
+                return
+            now = asyncio.get_running_loop().time()
+            if not self._breaker.allow(now):
+                # Разомкнут: не подключаемся, проба уже назначена по таймеру или рекламе
+                self._tracer.event("breaker_open")
+                self._schedule_reconnect(self._breaker.retry_in(now))
+                return
             try:
-                client = await establish_connection(
-                    BleakClientWithServiceCache,
-                    self._device,
-                    self._device.name,
-                    self._disconnected,
-                    cached_services=self._cached_services,
-                )
-                self._client = client
-                self._cached_services = client.services
-                for ch in WRITE_CHARACTERISTIC_UUIDS:
-                    c = client.services.get_characteristic(ch)
-                    if c:
-                        self._write_uuid = c
-                        break
+                with self._tracer.span("connect", breaker=self._breaker.state.value):
+                    client = await establish_connection(
+                        BleakClientWithServiceCache,
+                        self._device,
+                        self._device.name,
+                        self._disconnected,
+                        cached_services=self._cached_services,
+                    )
+                    self._client = client
+                    self._cached_services = client.services
+                    self._resolve_write_char(client)
                 LOGGER.info("%s connected", self._device.name)
+                self._breaker.record_success()
+                self._async_state_changed()
+                self._schedule_brightness_probe()
+                if self._journal_pending:
+                    asyncio.create_task(self._async_flush_journal(), context=contextvars.Context())
             except Exception as e:
                 LOGGER.error("%s: connection failed: %s", self._device.name, e)
-                await asyncio.sleep(5)
-                asyncio.create_task(self._ensure_connected())
+                was_closed = self._breaker.closed
+                self._breaker.record_failure(asyncio.get_running_loop().time())
+                if self._breaker.closed:
+                    delay = RECONNECT_BACKOFF
+                else:
+                    delay = self._breaker.retry_in(asyncio.get_running_loop().time())
+                    if was_closed:
+                        LOGGER.warning("%s: circuit open, next probe in %.0f s", self.name, delay)
+                        self._async_state_changed()
+                # Пауза перед повтором — в фоне, без удержания lock и без ожидания вызывающим
+                self._schedule_reconnect(delay)
+
+    def _schedule_reconnect(self, delay: float = 0.0, replace: bool = False) -> None:
+        if self._stopping:
+            return
+        if self._reconnect_task and not self._reconnect_task.done():
+            if not replace:
+                return
+            self._reconnect_task.cancel()
+        self._reconnect_task = asyncio.create_task(self._async_reconnect_later(delay))
+
+    async def _async_reconnect_later(self, delay: float) -> None:
+        with self._tracer.span("sleep", reason="reconnect_backoff"):
+            await asyncio.sleep(delay)
+        await self._ensure_connected()
+
+    def _on_advertisement(self, device: BLEDevice) -> None:
+        """Устройство снова в эфире: свежий BLEDevice и досрочная проба при OPEN."""
+        self._device = device
+        if self._breaker.reset_timeout(asyncio.get_running_loop().time()):
+            LOGGER.debug("%s: advertisement seen, probing now", self.name)
+            self._schedule_reconnect(replace=True)
 
     def _disconnected(self, _client):
-        asyncio.create_task(self._ensure_connected())
+        self._tracer.event("disconnected")
+        self._async_state_changed()
+        self._schedule_reconnect()
 
     async def _heartbeat(self):
         while True:
@@ -280,127 +763,468 @@ class BLEDOMInstance:
     # ---------------------------------------------------------
     # BLE-команды
     # ---------------------------------------------------------
-    @retry_bluetooth_connection_error
-    async def _write(self, data: list[int]):
+    async def _async_connect_for_write(self):
+        """Проверка соединения writer'ом — один раз на пачку кадров."""
         await self._ensure_connected()
-        await self._client.write_gatt_char(self._write_uuid, bytearray(data), False)
+        if not self._client or not self._client.is_connected or self._write_uuid is None:
+            raise BleakError(f"{self.name}: not connected")
+
+    async def _send_frame(self, data: bytes):
+        with self._tracer.span("write", frame=data.hex()):
+            await self._client.write_gatt_char(self._write_uuid, data, False)
+
+    def _link_down(self) -> bool:
+        """Связи нет и быстро не будет: идёт подключение или последнее не удалось."""
+        if self.is_connected:
+            return False
+        return self._connect_lock.locked() or self._breaker.failures > 0
+
+    def _journal(self) -> None:
+        """Запоминает, что желаемое состояние не доставлено; отправим при подключении."""
+        if not self._journal_pending:
+            LOGGER.debug("%s: link down, command journaled until reconnect", self.name)
+            self._tracer.event("journaled")
+        self._journal_pending = True
+        self._schedule_reconnect()
+
+    def _require_link(self) -> None:
+        """Для команд вне журнала состояния (таймеры): без связи — сразу ошибка."""
+        if self._link_down():
+            self._schedule_reconnect()
+            raise BleakError(f"{self.name}: not connected")
+
+    async def _write(self, data: list[int]):
+        await self._write_frames(data)
 
+    @retry_bluetooth_connection_error
+    async def _write_frames(self, *frames: list[int]):
+        """Несколько кадров одной пачкой (без ожидания каждого по отдельности).
+
+        Без связи кадры не отправляются: команда возвращается сразу, а итоговое
+        состояние досылается минимальным набором кадров после переподключения.
+        """
+        if self._link_down():
+            self._journal()
+        else:
+            try:
+                await self._writer.write(frames)
+            except BLEAK_EXCEPTIONS:
+                if self.is_connected:
+                    raise
+                self._journal()
+        # Пока ждали writer, пришла более новая команда — её кадры и состояние главнее
+        raise_if_superseded()
+
+    def _state_frames(self) -> list[list[int] | bytes]:
+        """Минимальный набор кадров, приводящий контроллер к self._state."""
+        st = self._state
+        if not st.is_on:
+            return [self._profile.turn_off_cmd]
+        if st.effect:
+            return [
+                [0x7E, 0x00, 0x02, st.effect_speed, 0x03, 0x00, 0x00, 0x00, 0xEF],
+                [0x7E, 0x00, 0x03, st.effect, 0x03, 0x00, 0x00, 0x00, 0xEF],
+            ]
+        if self._profile.cold_white and st.color_mode == "color_temp" and st.color_temp_kelvin > 5000:
+            return [self._melk_og10w_cold_white_frame(st.brightness)]
+        r, g, b = st.rgb
+        if self.brightness_strategy == "rgb":
+            scale = st.brightness / 255.0
+            return [[0x7E, 0x00, 0x05, 0x03, int(r * scale), int(g * scale), int(b * scale), 0x00, 0xEF]]
+        return [
+            self._native_brightness_frame(round(st.brightness * 100 / 255)),
+            [0x7E, 0x00, 0x05, 0x03, r, g, b, 0x00, 0xEF],
+        ]
+
+    async def _async_flush_journal(self) -> None:
+        """Досылает журнал после переподключения."""
+        if not self._journal_pending or not self.is_connected:
+            return
+        self._journal_pending = False
+        LOGGER.debug("%s: flushing journaled state", self.name)
+        try:
+            if self._state.is_on:
+                await self._writer.write((self._profile.turn_on_cmd,))
+                with self._tracer.span("sleep", reason="power_on_settle"):
+                    await asyncio.sleep(POWER_ON_SETTLE)
+            await self._writer.write(self._state_frames())
+        except Exception as e:
+            LOGGER.warning("%s: journal flush failed: %s", self.name, e)
+            self._journal_pending = True
+
+    @supersedable("power")
     @retry_bluetooth_connection_error
     async def turn_on(self):
-        await self._write(self._turn_on_cmd)
-        await asyncio.sleep(0.2)
-        await self.set_color(self._rgb_color, self._brightness)
-        self._is_on = True
+        await self._write(self._profile.turn_on_cmd)
+        if not self._journal_pending:
+            with self._tracer.span("sleep", reason="power_on_settle"):
+                await asyncio.sleep(POWER_ON_SETTLE)
+            raise_if_superseded()
+        await self._async_set_color(self._state.rgb, self._state.brightness)
+        self._state.is_on = True
+        self._async_state_changed()
 
+    @supersedable("power")
     @retry_bluetooth_connection_error
     async def turn_off(self):
         await self._async_save_state()
-        await self._write(self._turn_off_cmd)
-        self._is_on = False
+        raise_if_superseded()
+        await self._write(self._profile.turn_off_cmd)
+        self._state.is_on = False
+        self._async_state_changed()
 
-    async def _write_native_brightness(self, percent: int):
+    @staticmethod
+    def _native_brightness_frame(percent: int) -> list[int]:
         p = max(0, min(int(percent), 100))
-        await self._write([0x7E, 0x04, 0x01, p, 0xFF, 0x00, 0xFF, 0x00, 0xEF])
+        return [0x7E, 0x04, 0x01, p, 0xFF, 0x00, 0xFF, 0x00, 0xEF]
 
-    async def _write_melk_og10w_cold_white(self, intensity: int):
-        """Спеціальна команда для холодного білого світла MELK-OG10W"""
+    async def _write_native_brightness(self, percent: int):
+        await self._write(self._native_brightness_frame(percent))
+
+    @staticmethod
+    def _melk_og10w_cold_white_frame(intensity: int) -> list[int]:
         i = max(0, min(int(intensity), 255))
         percent = int(i * 100 / 255)
-        await self._write([0x7E, 0x07, 0x05, 0x01, percent, 0xFF, 0x02, 0x01, 0xEF])
+        return [0x7E, 0x07, 0x05, 0x01, percent, 0xFF, 0x02, 0x01, 0xEF]
 
+    async def _write_melk_og10w_cold_white(self, intensity: int):
+        """Спеціальна команда для холодного білого світла MELK-OG10W"""
+        await self._write(self._melk_og10w_cold_white_frame(intensity))
+
+    @supersedable("color")
     @retry_bluetooth_connection_error
     async def set_brightness(self, value: int):
-        self._brightness = max(1, min(int(value), 255))
-        r, g, b = self._rgb_color
-        percent = round(self._brightness * 100 / 255)
-        mode = (self._brightness_mode or DEFAULT_BRIGHTNESS_MODE).lower()
+        self._state.brightness = max(1, min(int(value), 255))
+        self._async_state_changed()
+        r, g, b = self._state.rgb
+        percent = round(self._state.brightness * 100 / 255)
+        mode = self.brightness_strategy
 
         async def write_rgb_scaled():
-            scale = self._brightness / 255.0
+            scale = self._state.brightness / 255.0
             rr, gg, bb = int(r * scale), int(g * scale), int(b * scale)
             await self._write([0x7E, 0x00, 0x05, 0x03, rr, gg, bb, 0x00, 0xEF])
 
         async def write_native_then_rgb():
-            await self._write_native_brightness(percent)
-            await asyncio.sleep(0.05)
-            await self._write([0x7E, 0x00, 0x05, 0x03, r, g, b, 0x00, 0xEF])
+            await self._write_frames(
+                self._native_brightness_frame(percent),
+                [0x7E, 0x00, 0x05, 0x03, r, g, b, 0x00, 0xEF],
+            )
 
         try:
             if mode == "rgb":
                 await write_rgb_scaled()
-            elif mode == "native":
-                await write_native_then_rgb()
             else:
-                try:
-                    await write_native_then_rgb()
-                    LOGGER.debug("%s: brightness auto→native success (%s%%)", self.name, percent)
-                except Exception as e:
-                    LOGGER.warning("%s: native failed (%s), fallback to RGB: %s", self.name, percent, e)
-                    await write_rgb_scaled()
+                await write_native_then_rgb()
         finally:
             await self._async_save_state()
 
+    @supersedable("color")
     @retry_bluetooth_connection_error
     async def set_color(self, rgb: Tuple[int, int, int], brightness: int | None = None):
+        self._state.color_mode = "rgb"
+        self._state.effect = None
+        await self._async_set_color(rgb, brightness)
+
+    async def _async_set_color(self, rgb: Tuple[int, int, int], brightness: int | None = None):
+        """Запись цвета без смены color_mode (общая для RGB и эмуляции CCT)."""
         if brightness is not None:
-            self._brightness = max(1, min(int(brightness), 255))
+            self._state.brightness = max(1, min(int(brightness), 255))
         r, g, b = (max(0, min(255, c)) for c in rgb)
-        self._rgb_color = (int(r), int(g), int(b))
+        self._state.rgb = (int(r), int(g), int(b))
 
-        scale = self._brightness / 255.0
+        scale = self._state.brightness / 255.0
         rr, gg, bb = int(r * scale), int(g * scale), int(b * scale)
         await self._write([0x7E, 0x00, 0x05, 0x03, rr, gg, bb, 0x00, 0xEF])
 
-        self._is_on = True
+        self._state.is_on = True
+        self._async_state_changed()
         await self._async_save_state()
 
+    @supersedable("color", deadline=ANIMATION_FRAME_DEADLINE)
+    async def push_color(self, rgb: Tuple[int, int, int], brightness: int | None = None):
+        """Быстрый путь для анимаций: последний цвет выигрывает, без повторов,
+        фоновый приоритет, состояние сохраняется отложенно."""
+        st = self._state
+        st.color_mode = "rgb"
+        st.effect = None
+        if brightness is not None:
+            st.brightness = max(1, min(int(brightness), 255))
+        r, g, b = (max(0, min(255, int(c))) for c in rgb)
+        st.rgb = (r, g, b)
+        scale = st.brightness / 255.0
+        with write_priority(Priority.BACKGROUND):
+            await self._write([0x7E, 0x00, 0x05, 0x03, int(r * scale), int(g * scale), int(b * scale), 0x00, 0xEF])
+        st.is_on = True
+        self._async_state_changed()
+        self._schedule_save()
+
+    @supersedable("color")
     @retry_bluetooth_connection_error
     async def set_color_temp_kelvin(self, value: int, brightness: int | None = None):
-        k_min, k_max = self._min_color_temp_kelvin, self._max_color_temp_kelvin
+        k_min, k_max = self._profile.min_color_temp_kelvin, self._profile.max_color_temp_kelvin
         k = max(k_min, min(int(value), k_max))
-        self._color_temp_kelvin = k
+        self._state.color_temp_kelvin = k
+        self._state.color_mode = "color_temp"
+        self._state.effect = None
 
         if brightness is not None:
-            self._brightness = max(1, min(int(brightness), 255))
+            self._state.brightness = max(1, min(int(brightness), 255))
 
         # Для MELK-OG10W використовуємо спеціальну команду для холодного білого
-        if self._is_melk_og10w and k > 5000:  # Холодний білий
-            await self._write_melk_og10w_cold_white(self._brightness)
-            self._is_on = True
+        if self._profile.cold_white and k > 5000:  # Холодний білий
+            await self._write_melk_og10w_cold_white(self._state.brightness)
+            self._state.is_on = True
+            self._async_state_changed()
             await self._async_save_state()
             return
 
         # Для інших моделей або теплого світла - стандартна RGB-емуляція
+        await self._async_set_color(self._kelvin_rgb(k), self._state.brightness)
+
+    def _kelvin_rgb(self, k: int) -> tuple[int, int, int]:
+        """RGB-эмуляция цветовой температуры: линейно от тёплого к холодному."""
+        k_min, k_max = self._profile.min_color_temp_kelvin, self._profile.max_color_temp_kelvin
         warm = (255, 138, 18)
         cool = (180, 220, 255)
         t = (k - k_min) / (k_max - k_min) if k_max > k_min else 1.0
+        return (
+            int(warm[0] + (cool[0] - warm[0]) * t),
+            int(warm[1] + (cool[1] - warm[1]) * t),
+            int(warm[2] + (cool[2] - warm[2]) * t),
+        )
 
-        r = int(warm[0] + (cool[0] - warm[0]) * t)
-        g = int(warm[1] + (cool[1] - warm[1]) * t)
-        b = int(warm[2] + (cool[2] - warm[2]) * t)
-
-        await self.set_color((r, g, b), self._brightness)
+    @supersedable("color")
+    async def push_color_temp(self, value: int, brightness: int | None = None):
+        """Фоновая подстройка температуры (циркадный режим): без повторов —
+        следующий такт всё равно пришлёт новое значение, сохранение отложенное."""
+        st = self._state
+        k_min, k_max = self._profile.min_color_temp_kelvin, self._profile.max_color_temp_kelvin
+        k = max(k_min, min(int(value), k_max))
+        st.color_temp_kelvin = k
+        st.color_mode = "color_temp"
+        st.effect = None
+        if brightness is not None:
+            st.brightness = max(1, min(int(brightness), 255))
+        with write_priority(Priority.BACKGROUND):
+            if self._profile.cold_white and k > 5000:
+                await self._write_melk_og10w_cold_white(st.brightness)
+            else:
+                st.rgb = self._kelvin_rgb(k)
+                scale = st.brightness / 255.0
+                r, g, b = st.rgb
+                await self._write([0x7E, 0x00, 0x05, 0x03, int(r * scale), int(g * scale), int(b * scale), 0x00, 0xEF])
+        st.is_on = True
+        self._async_state_changed()
+        self._schedule_save()
 
+    @supersedable("effect")
     @retry_bluetooth_connection_error
     async def set_effect(self, value: int):
         try:
-            await self._ensure_connected()
             if value in (0x00, None):
-                await self.set_color(self._rgb_color, self._brightness)
-                self._last_effect = None
+                self._state.effect = None
+                await self._async_set_color(self._state.rgb, self._state.brightness)
                 return
-            await self._write([0x7E, 0x00, 0x03, value, 0x03, 0x00, 0x00, 0x00, 0xEF])
-            self._last_effect = value
+            await self._write(self._effect_frame(value))
+            self._state.effect = value
+            self._async_state_changed()
+        except Superseded:
+            raise
         except Exception as e:
             LOGGER.error("%s: set_effect error: %s", self.name, e)
 
+    @staticmethod
+    def _effect_frame(value: int) -> list[int]:
+        return [0x7E, 0x00, 0x03, value, 0x03, 0x00, 0x00, 0x00, 0xEF]
+
+    @supersedable("speed")
     @retry_bluetooth_connection_error
     async def set_effect_speed(self, speed: int):
-        s = max(1, min(int(speed), 31))
-        self._effect_speed = s
+        s = max(self._profile.speed_min, min(int(speed), self._profile.speed_max))
+        self._state.effect_speed = s
+        self._async_state_changed()
         await self._write([0x7E, 0x00, 0x02, s, 0x03, 0x00, 0x00, 0x00, 0xEF])
 
+    # ---------------------------------------------------------
+    # Синхронный старт эффектов (см. async_sync_effect)
+    # ---------------------------------------------------------
+    @property
+    def tracer(self) -> Tracer:
+        return self._tracer
+
+    def diagnostics(self) -> dict[str, Any]:
+        """Снимок состояния соединения и последних спанов для диагностики HA."""
+        return {
+            "name": self.name,
+            "profile": self._profile.name,
+            "connected": self.is_connected,
+            "available": self.available,
+            "breaker": self._breaker.as_dict(asyncio.get_running_loop().time()),
+            "journal_pending": self._journal_pending,
+            "writer_pending": self._writer.pending,
+            "adapter": self.adapter,
+            "airtime": self._airtime.stats() if self._airtime else None,
+            "link_latency_ms": round(self._link_latency * 1000, 2) if self._link_latency else None,
+            "brightness_strategy": self.brightness_strategy,
+            "state": dataclasses.asdict(self._state),
+            "trace": self._tracer.as_dicts(),
+        }
+
+    @property
+    def link_latency(self) -> float | None:
+        return self._link_latency
+
+    async def measure_latency(self, samples: int = SYNC_LATENCY_SAMPLES) -> float:
+        """Задержка доставки кадра: медиана RTT записи с подтверждением, пополам.
+
+        Для замера шлётся безвредный запрос статуса; кадр без подтверждения
+        доходит до контроллера примерно за половину этого RTT.
+        """
+        await self._async_connect_for_write()
+        loop = asyncio.get_running_loop()
+        rtts = []
+        for _ in range(samples):
+            started = loop.time()
+            await self._client.write_gatt_char(self._write_uuid, bytes(QUERY_STATE_CMD), True)
+            rtts.append(loop.time() - started)
+        rtts.sort()
+        self._link_latency = rtts[len(rtts) // 2] / 2
+        return self._link_latency
+
+    @supersedable("effect")
+    async def fire_effect_at(self, when: float, value: int) -> None:
+        """Отправляет кадр эффекта в момент when (время event loop), минуя очередь writer'а.
+
+        Очередь добавила бы непредсказуемое ожидание за чужими кадрами;
+        более старые кадры эффекта в очереди устаревают по поколению.
+        """
+        await self._async_connect_for_write()
+        await asyncio.sleep(max(0.0, when - asyncio.get_running_loop().time()))
+        raise_if_superseded()
+        await self._send_frame(bytes(self._effect_frame(value)))
+        self._state.effect = value
+        self._async_state_changed()
+
+    # ---------------------------------------------------------
+    # Встроенные таймеры (расписание выполняется самим контроллером)
+    # ---------------------------------------------------------
+    async def _write_delivered(self, *frames: list[int]):
+        """Запись вне журнала состояния (таймеры): не доставлено — ошибка.
+
+        Журнал досылает только self._state, таймеры в него не входят, поэтому
+        такие кадры нельзя «отложить до подключения».
+        """
+        self._require_link()
+        try:
+            await self._writer.write(frames)
+        except BLEAK_EXCEPTIONS:
+            if not self.is_connected:
+                self._schedule_reconnect()
+            raise
+
+    async def sync_time(self):
+        """Передаёт контроллеру текущее локальное время и день недели (1 = пн)."""
+        await self._write_delivered(self._time_frame())
+
+    def _time_frame(self) -> list[int]:
+        now = self._now()
+        return [0x7E, 0x00, 0x83, now.hour, now.minute, now.second, now.isoweekday(), 0x00, 0xEF]
+
+    @retry_bluetooth_connection_error
+    async def set_timer(self, timer: str, hour: int, minute: int, days: int, enabled: bool = True):
+        """Программирует таймер включения/выключения; days — маска WEEK_DAYS."""
+        days &= 0x7F
+        value = days | TIMER_ENABLED_FLAG if enabled else days
+        # Таймеры считаются по часам контроллера — сначала синхронизируем их,
+        # обе записи — одной пачкой под одними повторами
+        await self._write_delivered(
+            self._time_frame(),
+            [0x7E, 0x00, 0x82, hour, minute, 0x00, TIMER_CODES[timer], value, 0xEF],
+        )
+        # Только после доставки: запись не должна переживать неотправленный таймер
+        self._state.timers[timer] = {"hour": hour, "minute": minute, "days": days, "enabled": enabled}
+        self._async_state_changed()
+        await self._async_save_state()
+
+    @retry_bluetooth_connection_error
+    async def clear_timer(self, timer: str):
+        await self._write_delivered([0x7E, 0x00, 0x82, 0x00, 0x00, 0x00, TIMER_CODES[timer], 0x00, 0xEF])
+        if self._state.timers.pop(timer, None) is not None:
+            self._async_state_changed()
+            await self._async_save_state()
+
+    # ---------------------------------------------------------
+    # Потоковая отправка «сырых» кадров (для экспериментов с протоколом)
+    # ---------------------------------------------------------
+    async def stream_frames(
+        self,
+        frames: list[tuple[bytes, float]],
+        max_rate: float | None = None,
+    ) -> dict[str, Any]:
+        """Отправляет кадры по текущему соединению по расписанию и возвращает статистику.
+
+        frames — пары (кадр, пауза после него в секундах); max_rate — предел кадров/с.
+        Кадры идут через общий writer (с приоритетами и backpressure), но минуют
+        журнал состояния: без связи поток сразу завершается ошибкой.
+        """
+        self._require_link()
+        loop = asyncio.get_running_loop()
+        interval = 1.0 / max_rate if max_rate else 0.0
+
+        async def _timed_write(frame: bytes) -> float:
+            queued = loop.time()
+            await self._writer.write((frame,))
+            return loop.time() - queued
+
+        tasks: list[asyncio.Task] = []
+        started = next_at = loop.time()
+        for frame, delay in frames:
+            wait = next_at - loop.time()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            # Задачи стартуют в порядке создания — порядок кадров сохраняется
+            tasks.append(asyncio.create_task(_timed_write(frame)))
+            next_at += max(delay, interval)
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        duration = loop.time() - started
+
+        latencies = sorted(r for r in results if isinstance(r, float))
+        errors = [r for r in results if isinstance(r, BaseException)]
+        stats: dict[str, Any] = {
+            "frames": len(frames),
+            "sent": len(latencies),
+            "failed": len(errors),
+            "duration_s": round(duration, 4),
+            "rate_fps": round(len(latencies) / duration, 1) if duration > 0 else None,
+        }
+        if latencies:
+            stats["latency_ms"] = {
+                "min": round(latencies[0] * 1000, 2),
+                "avg": round(sum(latencies) / len(latencies) * 1000, 2),
+                "p95": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000, 2),
+                "max": round(latencies[-1] * 1000, 2),
+            }
+        if errors:
+            stats["first_error"] = str(errors[0]) or type(errors[0]).__name__
+        return stats
+
+    async def connect(self) -> bool:
+        """Подключиться сейчас (не дожидаясь отложенного подключения)."""
+        await self._init_task  # сохранённый GATT-кэш ускоряет подключение
+        await self._ensure_connected()
+        return self.is_connected
+
     async def stop(self):
+        self._stopping = True
+        self._unsub_advertisement()
+        for task in (*self._background, self._reconnect_task, self._probe_task):
+            if task is not None and not task.done():
+                task.cancel()
+        if self._save_handle is not None:
+            self._save_handle.cancel()
+            self._save_handle = None
         await self._async_save_state()
+        await self._writer.stop()
         if self._client and self._client.is_connected:
             await self._client.disconnect()
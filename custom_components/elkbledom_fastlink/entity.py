@@ -0,0 +1,26 @@
+from __future__ import annotations
+
+from homeassistant.helpers.entity import Entity
+
+from .elkbledom import BLEDOMInstance
+
+
+class BLEDOMEntity(Entity):
+    """Общая база сущностей ELK-BLEDOM: состояние читается прямо из BLEDOMInstance.
+
+    Сущности не хранят своих копий состояния и не опрашиваются — экземпляр
+    устройства сам оповещает всех подписчиков (не чаще раза за тик event loop).
+    """
+
+    _attr_should_poll = False
+
+    def __init__(self, instance: BLEDOMInstance) -> None:
+        self._instance = instance
+
+    @property
+    def available(self) -> bool:
+        return self._instance.available
+
+    async def async_added_to_hass(self) -> None:
+        await super().async_added_to_hass()
+        self.async_on_remove(self._instance.async_add_listener(self.async_write_ha_state))
@@ -1,5 +1,7 @@
 from __future__ import annotations
+import asyncio
 import logging
+from typing import Any
 from homeassistant.components.light import (
     ColorMode,
     LightEntity,
@@ -9,19 +11,40 @@ from homeassistant.components.light import (
     ATTR_COLOR_TEMP_KELVIN,
     ATTR_EFFECT,
 )
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, ServiceResponse, SupportsResponse
 from homeassistant.config_entries import ConfigEntry
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers import config_validation as cv, entity_platform
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
+import voluptuous as vol
 from homeassistant.helpers.entity import DeviceInfo
 from homeassistant.helpers import device_registry
 
 # ВАЖНО: из const берем и «сырые» effect-ключи/ID, и красивые лейблы
 from .const import (
     DOMAIN,
-    EFFECTS_MAP,        # {"crossfade_red": 0x8B, ...}
-    EFFECT_LABELS,      # {"crossfade_red": "🔴 Fade Red", ...}
+    EFFECTS_MAP,          # {"crossfade_red": 0x8B, ...}
+    EFFECT_KEY_TO_LABEL,  # {"crossfade_red": "🔴 Fade Red", ...}
+    EFFECT_LABEL_TO_KEY,  # обратная мапа: красивая строка -> «сырой» ключ
+    EFFECT_ID_TO_KEY,     # ID эффекта устройства -> «сырой» ключ
+    EFFECT_LABEL_LIST,    # красивые строки для селектора, "none" первым
+    WEEK_DAYS,
+    TIMER_TYPES,
+    SERVICE_SET_TIMER,
+    SERVICE_CLEAR_TIMER,
+    SERVICE_GET_TIMERS,
+    SERVICE_STREAM_FRAMES,
+    SERVICE_SET_GRADIENT,
+    BLEDOMEntityFeature,
+    CONF_VIRTUAL,
+    CONF_OPTIMISTIC,
+    DEFAULT_OPTIMISTIC,
+    week_days_mask,
 )
-from .elkbledom import BLEDOMInstance
+from .elkbledom import BLEDOMInstance, parse_frame_stream
+from .entity import BLEDOMEntity
+from .virtual import BLEDOMVirtualStrip
+from .writer import priority_for_context, write_priority
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -32,72 +55,137 @@ _LOGGER = logging.getLogger(__name__)
 async def async_setup_entry(
     hass: HomeAssistant, entry: ConfigEntry, async_add_entities: AddEntitiesCallback
 ):
-    instance: BLEDOMInstance = hass.data[DOMAIN][entry.entry_id]
-    async_add_entities([BLEDOMLight(instance, entry.data["name"], entry.entry_id)])
+    if entry.data.get(CONF_VIRTUAL):
+        # Виртуальная лента: собственного контроллера нет, только участники
+        async_add_entities([BLEDOMVirtualStrip(hass, entry)])
+    else:
+        instance: BLEDOMInstance = hass.data[DOMAIN][entry.entry_id]
+        async_add_entities([BLEDOMLight(instance, entry.data["name"], entry.entry_id)])
 
+    # Сервисы встроенных таймеров контроллера; required_features отсекает
+    # сущности другого типа (виртуальная лента и контроллер — на одной платформе)
+    platform = entity_platform.async_get_current_platform()
+    platform.async_register_entity_service(
+        SERVICE_SET_TIMER,
+        {
+            vol.Required("timer"): vol.In(TIMER_TYPES),
+            vol.Required("time"): cv.time,
+            vol.Optional("days", default=[WEEK_DAYS.all.name]): vol.All(
+                cv.ensure_list, [vol.In([d.name for d in WEEK_DAYS])]
+            ),
+            vol.Optional("enabled", default=True): cv.boolean,
+        },
+        "async_set_timer",
+        required_features=[BLEDOMEntityFeature.TIMERS],
+    )
+    platform.async_register_entity_service(
+        SERVICE_CLEAR_TIMER,
+        {vol.Optional("timer", default="all"): vol.In([*TIMER_TYPES, "all"])},
+        "async_clear_timer",
+        required_features=[BLEDOMEntityFeature.TIMERS],
+    )
+    platform.async_register_entity_service(
+        SERVICE_GET_TIMERS,
+        {},
+        "async_get_timers",
+        supports_response=SupportsResponse.ONLY,
+        required_features=[BLEDOMEntityFeature.TIMERS],
+    )
 
-class BLEDOMLight(LightEntity):
+    # Потоковая отправка «сырых» кадров по соединению интеграции
+    platform.async_register_entity_service(
+        SERVICE_STREAM_FRAMES,
+        {
+            vol.Required("frames"): vol.All(cv.ensure_list, [cv.string]),
+            vol.Optional("delay", default=0): vol.All(vol.Coerce(float), vol.Range(min=0)),
+            vol.Optional("max_rate"): vol.All(vol.Coerce(float), vol.Range(min=0.1)),
+        },
+        "async_stream_frames",
+        supports_response=SupportsResponse.OPTIONAL,
+        required_features=[BLEDOMEntityFeature.STREAM_FRAMES],
+    )
+
+    # Градиент на виртуальной ленте
+    platform.async_register_entity_service(
+        SERVICE_SET_GRADIENT,
+        {
+            vol.Required("colors"): vol.All(
+                cv.ensure_list,
+                vol.Length(min=1),
+                [vol.All(vol.ExactSequence((cv.byte, cv.byte, cv.byte)), vol.Coerce(list))],
+            ),
+            vol.Optional("speed"): vol.All(vol.Coerce(float), vol.Range(min=0, max=5)),
+        },
+        "async_set_gradient",
+        required_features=[BLEDOMEntityFeature.GRADIENT],
+    )
+
+
+class BLEDOMLight(BLEDOMEntity, LightEntity):
     """ELK-BLEDOM RGB/CCT light с красивыми лейблами эффектов."""
 
     _attr_supported_color_modes = {ColorMode.RGB, ColorMode.COLOR_TEMP}
     _attr_color_mode = ColorMode.RGB
     _attr_min_color_temp_kelvin = 1800
     _attr_max_color_temp_kelvin = 7000
-    _attr_supported_features = LightEntityFeature.EFFECT
+    _attr_supported_features = (
+        LightEntityFeature.EFFECT | BLEDOMEntityFeature.TIMERS | BLEDOMEntityFeature.STREAM_FRAMES
+    )
+    # Общие для всех светильников таблицы (см. const.py)
+    _attr_effect_list = EFFECT_LABEL_LIST
 
     def __init__(self, instance: BLEDOMInstance, name: str, entry_id: str) -> None:
-        self._instance = instance
+        super().__init__(instance)
         self._attr_name = name
         self._entry_id = entry_id
         self._attr_unique_id = f"{self._instance.address}_light"
-        self._last_color_mode = ColorMode.RGB
-
-        # Текущее «сырое» имя эффекта (ключ из const), по умолчанию none
-        self._current_effect_key: str = "none"
 
-        # Подготовим красивые списки/мапы для UI
-        # порядок: "none" первым, далее остальные по исходному EFFECTS_MAP
-        pretty = []
-        for key in ["none"] + [k for k in EFFECTS_MAP.keys() if k != "none"]:
-            pretty.append(EFFECT_LABELS.get(key, key))
+        self._attr_min_color_temp_kelvin = instance.min_color_temp_kelvin
+        self._attr_max_color_temp_kelvin = instance.max_color_temp_kelvin
 
-        self._pretty_effect_list = pretty                          # список красивых строк
-        self._key2pretty = {k: EFFECT_LABELS.get(k, k) for k in EFFECTS_MAP.keys()}
-        # обратная мапа: красивая строка -> «сырой» ключ
-        self._pretty2key = {v: k for k, v in self._key2pretty.items()}
+        # Оптимистичный слой поверх состояния экземпляра: запрошенные значения,
+        # пока фоновая запись не завершилась
+        self._optimistic: dict[str, Any] = {}
+        self._command_seq = 0
+        self._pending: set[asyncio.Task] = set()
+        self._last_error: str | None = None
 
     # -----------------------
     # Обязательные свойства
     # -----------------------
     @property
     def is_on(self):
-        return self._instance.is_on
+        return self._optimistic.get("is_on", self._instance.is_on)
 
     @property
     def brightness(self):
-        return self._instance.brightness
+        return self._optimistic.get("brightness", self._instance.brightness)
 
     @property
     def rgb_color(self):
-        return self._instance.rgb_color
+        return self._optimistic.get("rgb_color", self._instance.rgb_color)
 
     @property
     def color_temp_kelvin(self):
-        return self._instance.color_temp_kelvin
+        return self._optimistic.get("color_temp_kelvin", self._instance.color_temp_kelvin)
 
     @property
     def color_mode(self):
-        return self._last_color_mode
+        if self._optimistic.get("color_mode", self._instance.color_mode) == "color_temp":
+            return ColorMode.COLOR_TEMP
+        return ColorMode.RGB
 
     # Красивый текущий эффект:
     @property
     def effect(self) -> str | None:
-        return self._key2pretty.get(self._current_effect_key, "none")
+        effect_id = self._optimistic.get("effect", self._instance.effect)
+        effect_key = EFFECT_ID_TO_KEY.get(effect_id, "none")
+        return EFFECT_KEY_TO_LABEL.get(effect_key, "none")
 
-    # Список эффектов для селектора — красивые лейблы:
     @property
-    def effect_list(self) -> list[str] | None:
-        return self._pretty_effect_list
+    def extra_state_attributes(self) -> dict[str, Any] | None:
+        # Фоновая запись не удалась — состояние откатили, причина видна в атрибутах
+        return {"last_command_error": self._last_error} if self._last_error else None
 
     @property
     def device_info(self) -> DeviceInfo:
@@ -114,38 +202,136 @@ class BLEDOMLight(LightEntity):
     # --------------------------------
     async def async_turn_on(self, **kwargs):
         _LOGGER.debug("Turn ON with kwargs: %s", kwargs)
+        # Состояние в HA обновляется через подписку на BLEDOMInstance
+        with write_priority(priority_for_context(self._context)):
+            if self._optimistic_enabled():
+                self._async_run_optimistic(self._predict_turn_on(kwargs), self._async_turn_on(**kwargs))
+            else:
+                await self._async_turn_on(**kwargs)
+
+    async def _async_turn_on(self, **kwargs):
         await self._instance.turn_on()
 
         if ATTR_BRIGHTNESS in kwargs:
             await self._instance.set_brightness(kwargs[ATTR_BRIGHTNESS])
 
         if ATTR_RGB_COLOR in kwargs:
-            self._last_color_mode = ColorMode.RGB
             await self._instance.set_color(kwargs[ATTR_RGB_COLOR])
-            self._current_effect_key = "none"
 
         if ATTR_COLOR_TEMP_KELVIN in kwargs:
-            self._last_color_mode = ColorMode.COLOR_TEMP
             await self._instance.set_color_temp_kelvin(kwargs[ATTR_COLOR_TEMP_KELVIN])
-            self._current_effect_key = "none"
 
         if ATTR_EFFECT in kwargs:
             # Пользователь присылает КРАСИВОЕ имя (из effect_list)
             pretty_name = kwargs[ATTR_EFFECT]
             # Конвертим в «сырой» ключ, если возможно
-            effect_key = self._pretty2key.get(pretty_name, pretty_name)
+            effect_key = EFFECT_LABEL_TO_KEY.get(pretty_name, pretty_name)
             if effect_key in EFFECTS_MAP:
                 effect_id = EFFECTS_MAP[effect_key]
                 await self._instance.set_effect(effect_id)
-                self._current_effect_key = effect_key
                 _LOGGER.debug("Applied effect: key=%s id=0x%02X", effect_key, effect_id)
 
         if not kwargs:
             await self._instance.set_color(self._instance.rgb_color)
 
-        self.async_write_ha_state()
-
     async def async_turn_off(self, **kwargs):
-        await self._instance.turn_off()
+        with write_priority(priority_for_context(self._context)):
+            if self._optimistic_enabled():
+                self._async_run_optimistic({"is_on": False}, self._instance.turn_off())
+            else:
+                await self._instance.turn_off()
         # оставляем запомненным последний выбранный эффект; UI сам его покажет
+
+    # --------------------------------
+    # Оптимистичное состояние
+    # --------------------------------
+    def _optimistic_enabled(self) -> bool:
+        entry = self.hass.config_entries.async_get_entry(self._entry_id)
+        return bool(entry and entry.options.get(CONF_OPTIMISTIC, DEFAULT_OPTIMISTIC)) and self.available
+
+    def _predict_turn_on(self, kwargs: dict[str, Any]) -> dict[str, Any]:
+        """Состояние, которое получится после _async_turn_on (без обращения к устройству)."""
+        # Без цвета/температуры/эффекта в kwargs режим остаётся последним подтверждённым —
+        # иначе в слое остались бы color_mode/effect предыдущей оптимистичной команды
+        predicted: dict[str, Any] = {
+            "is_on": True,
+            "color_mode": self._instance.color_mode,
+            "effect": self._instance.effect,
+        }
+        if ATTR_BRIGHTNESS in kwargs:
+            predicted["brightness"] = max(1, min(int(kwargs[ATTR_BRIGHTNESS]), 255))
+        if ATTR_RGB_COLOR in kwargs:
+            predicted.update(rgb_color=tuple(kwargs[ATTR_RGB_COLOR]), color_mode="rgb", effect=None)
+        if ATTR_COLOR_TEMP_KELVIN in kwargs:
+            kelvin = max(self.min_color_temp_kelvin, min(int(kwargs[ATTR_COLOR_TEMP_KELVIN]), self.max_color_temp_kelvin))
+            predicted.update(color_temp_kelvin=kelvin, color_mode="color_temp", effect=None)
+        if ATTR_EFFECT in kwargs:
+            effect_key = EFFECT_LABEL_TO_KEY.get(kwargs[ATTR_EFFECT], kwargs[ATTR_EFFECT])
+            if effect_key in EFFECTS_MAP:
+                predicted["effect"] = EFFECTS_MAP[effect_key] or None
+        return predicted
+
+    def _async_run_optimistic(self, predicted: dict[str, Any], command) -> None:
+        """Сразу показывает predicted, запись — в фоне; при ошибке — откат и last_command_error."""
+        self._command_seq += 1
+        seq = self._command_seq
+        snapshot = self._instance.state_snapshot()
+        self._optimistic.update(predicted)
         self.async_write_ha_state()
+
+        async def _async_reconcile() -> None:
+            error: Exception | None = None
+            try:
+                await command
+            except Exception as e:
+                error = e
+            if seq != self._command_seq:
+                return  # пришла более новая команда — итог определит она
+            self._optimistic.clear()
+            if error is not None:
+                self._last_error = str(error) or type(error).__name__
+                _LOGGER.warning("%s: command failed, state reverted: %s", self.name, self._last_error)
+                self._instance.restore_state(snapshot)
+            else:
+                self._last_error = None
+            self.async_write_ha_state()
+
+        # Контекст (приоритет записи) копируется в задачу при создании
+        task = self.hass.async_create_background_task(_async_reconcile(), f"{self.entity_id} command")
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def async_will_remove_from_hass(self) -> None:
+        for task in self._pending:
+            task.cancel()
+        await super().async_will_remove_from_hass()
+
+    # --------------------------------
+    # Встроенные таймеры
+    # --------------------------------
+    async def async_set_timer(self, timer: str, time, days: list[str], enabled: bool = True) -> None:
+        with write_priority(priority_for_context(self._context)):
+            await self._instance.set_timer(timer, time.hour, time.minute, week_days_mask(days), enabled)
+
+    async def async_clear_timer(self, timer: str = "all") -> None:
+        timers = TIMER_TYPES if timer == "all" else [timer]
+        with write_priority(priority_for_context(self._context)):
+            for t in timers:
+                await self._instance.clear_timer(t)
+
+    async def async_get_timers(self) -> ServiceResponse:
+        """Таймеры, запрограммированные через интеграцию (контроллер их не отдаёт)."""
+        return {"timers": self._instance.timers}
+
+    # --------------------------------
+    # «Сырые» кадры
+    # --------------------------------
+    async def async_stream_frames(
+        self, frames: list[str], delay: float = 0, max_rate: float | None = None
+    ) -> ServiceResponse:
+        try:
+            parsed = parse_frame_stream(frames, delay)
+        except ValueError as e:
+            raise HomeAssistantError(str(e)) from e
+        with write_priority(priority_for_context(self._context)):
+            return await self._instance.stream_frames(parsed, max_rate)
@@ -0,0 +1,111 @@
+"""Модели данных ELK-BLEDOM: состояние устройства и профили моделей."""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+
+from .const import DEFAULT_BRIGHTNESS_MODE
+
+
+# =========================================================
+# Состояние устройства (компактная запись на slots)
+# =========================================================
+@dataclass(slots=True)
+class DeviceState:
+    """Изменяемое состояние одного контроллера."""
+
+    is_on: bool = False
+    rgb: tuple[int, int, int] = (255, 255, 255)
+    brightness: int = 255
+    color_temp_kelvin: int = 5000
+    color_mode: str = "rgb"  # "rgb" | "color_temp"
+    effect: int | None = None
+    effect_speed: int = 16
+    brightness_mode: str = DEFAULT_BRIGHTNESS_MODE
+    # Запрограммированные встроенные таймеры: {"on": {"hour", "minute", "days", "enabled"}}
+    timers: dict[str, dict] = field(default_factory=dict)
+
+
+# =========================================================
+# Профили моделей (неизменяемые, общие для всех устройств модели)
+# =========================================================
+@dataclass(frozen=True, slots=True)
+class ModelProfile:
+    """BLE-префикс имени модели, её кадры и заявленные возможности."""
+
+    name: str
+    turn_on_cmd: bytes
+    turn_off_cmd: bytes
+    min_color_temp_kelvin: int = 1800
+    max_color_temp_kelvin: int = 7000
+    native_brightness: bool = True  # понимает кадр 7E 04 01 <pct> ...
+    cold_white: bool = False  # отдельный канал холодного белого (MELK-OG10W)
+    notify: bool = True  # отвечает статусом через fff4
+    speed_min: int = 1
+    speed_max: int = 31
+
+
+_ON = bytes([0x7E, 0x00, 0x04, 0xF0, 0x00, 0x01, 0xFF, 0x00, 0xEF])
+_OFF = bytes([0x7E, 0x00, 0x04, 0x00, 0x00, 0x00, 0xFF, 0x00, 0xEF])
+
+# Единый реестр поддерживаемых моделей. Порядок не важен — выбирается
+# самый длинный совпавший префикс. Matcher'ы в manifest.json и список
+# в BTScan.py должны покрывать эти префиксы.
+MODEL_PROFILES: tuple[ModelProfile, ...] = (
+    ModelProfile("ELK-BLEDDM", _ON, _OFF),
+    ModelProfile("ELK-BLE", _ON, _OFF),
+    ModelProfile("LEDBLE", _ON, _OFF),
+    ModelProfile("MELK", _ON, _OFF),
+    ModelProfile("ELK-BULB2", _ON, _OFF),
+    ModelProfile("ELK-BULB", _ON, _OFF),
+    ModelProfile("ELK-LAMPL", _ON, _OFF),
+    ModelProfile(
+        "MELK-OG10W",
+        bytes([0x7E, 0x07, 0x04, 0xFF, 0x00, 0x01, 0x02, 0x01, 0xEF]),
+        bytes([0x7E, 0x07, 0x04, 0x00, 0x00, 0x00, 0x02, 0x01, 0xEF]),
+        native_brightness=False,
+        cold_white=True,
+        notify=False,
+    ),
+)
+DEFAULT_PROFILE = MODEL_PROFILES[0]
+
+
+class ModelRegistry:
+    """Поиск профиля по BLE-имени: префиксное дерево, самый длинный префикс."""
+
+    def __init__(self, profiles: tuple[ModelProfile, ...]) -> None:
+        self._profiles = profiles
+        self._root: dict = {}
+        for profile in profiles:
+            node = self._root
+            for char in profile.name.lower():
+                node = node.setdefault(char, {})
+            node[None] = profile  # терминальный узел
+
+    @property
+    def profiles(self) -> tuple[ModelProfile, ...]:
+        return self._profiles
+
+    def lookup(self, device_name: str | None) -> ModelProfile | None:
+        if not device_name:
+            return None
+        node = self._root
+        found: ModelProfile | None = None
+        for char in device_name.lower():
+            node = node.get(char)
+            if node is None:
+                break
+            found = node.get(None, found)
+        return found
+
+
+MODEL_REGISTRY = ModelRegistry(MODEL_PROFILES)
+
+
+def profile_for_name(device_name: str | None) -> ModelProfile:
+    """Профиль по BLE-имени устройства (без учёта регистра), иначе профиль по умолчанию."""
+    return MODEL_REGISTRY.lookup(device_name) or DEFAULT_PROFILE
+
+
+def is_supported_name(device_name: str | None) -> bool:
+    return MODEL_REGISTRY.lookup(device_name) is not None
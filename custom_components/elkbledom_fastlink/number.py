@@ -9,6 +9,8 @@ from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
 from .elkbledom import BLEDOMInstance
+from .entity import BLEDOMEntity
+from .writer import priority_for_context, write_priority
 from .const import DOMAIN
 
 _LOGGER = logging.getLogger(__name__)
@@ -26,7 +28,7 @@ async def async_setup_entry(
     )
 
 
-class BLEDOMSpeedControl(NumberEntity):
+class BLEDOMSpeedControl(BLEDOMEntity, NumberEntity):
     """Entity for controlling ELK-BLEDOM effect speed."""
 
     _attr_mode = "slider"
@@ -36,21 +38,17 @@ class BLEDOMSpeedControl(NumberEntity):
     _attr_icon = "mdi:speedometer"
 
     def __init__(self, bledomInstance: BLEDOMInstance, name: str, entry_id: str) -> None:
-        self._instance = bledomInstance
+        super().__init__(bledomInstance)
         self._attr_name = name
         self._attr_unique_id = f"{self._instance.address}_speed"
-        self._effect_speed = getattr(self._instance, "_effect_speed", 16)
         self._entry_id = entry_id
-
-    @property
-    def available(self) -> bool:
-        """Device is available if BLE client is connected."""
-        return bool(getattr(self._instance, "_client", None) and self._instance._client.is_connected)
+        self._attr_native_min_value = bledomInstance.profile.speed_min
+        self._attr_native_max_value = bledomInstance.profile.speed_max
 
     @property
     def native_value(self) -> int:
         """Return the current effect speed."""
-        return self._effect_speed
+        return self._instance.effect_speed
 
     @property
     def device_info(self) -> DeviceInfo:
@@ -65,10 +63,9 @@ class BLEDOMSpeedControl(NumberEntity):
     async def async_set_native_value(self, value: float) -> None:
         """Send BLE speed command to device."""
         try:
-            value_int = int(max(1, min(value, 31)))
-            await self._instance.set_effect_speed(value_int)
-            self._effect_speed = value_int
-            self.async_write_ha_state()
+            value_int = int(max(self.native_min_value, min(value, self.native_max_value)))
+            with write_priority(priority_for_context(self._context)):
+                await self._instance.set_effect_speed(value_int)
             _LOGGER.debug("%s: effect speed set to %d", self._instance.name, value_int)
         except Exception as e:
             _LOGGER.error("Failed to set effect speed: %s", e)
@@ -0,0 +1,185 @@
+"""Профилирование интеграции по запросу, без перезапуска HA."""
+from __future__ import annotations
+
+import asyncio
+import cProfile
+import io
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Any
+
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+SAMPLE_INTERVAL = 0.005  # сек; период выборки стеков в режиме sampling
+TOP_FUNCTIONS = 20
+
+MODE_SAMPLING = "sampling"
+MODE_DETERMINISTIC = "deterministic"
+PROFILE_MODES = [MODE_SAMPLING, MODE_DETERMINISTIC]
+
+# Одновременно — только один профиль: два cProfile на одном потоке мешают друг другу
+_PROFILE_LOCK = asyncio.Lock()
+
+Frame = tuple[str, int, str]  # (файл, строка, функция)
+
+
+def _is_ours(filename: str) -> bool:
+    return filename.startswith(PACKAGE_DIR)
+
+
+def _label(frame: Frame) -> str:
+    filename, lineno, func = frame
+    return f"{os.path.basename(filename)}:{lineno}({func})"
+
+
+class StackSampler(threading.Thread):
+    """Выборка стеков всех потоков (event loop и executor) через sys._current_frames().
+
+    Учитываются только выборки, где в стеке есть код интеграции. Накладные
+    расходы не зависят от числа вызовов, поэтому режим годится для продакшена.
+    """
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL) -> None:
+        super().__init__(name="elkbledom profiler", daemon=True)
+        self._interval = interval
+        self._stop_event = threading.Event()
+        self.samples = 0
+        self.own: Counter[Frame] = Counter()  # функция интеграции на вершине «своего» стека
+        self.cumulative: Counter[Frame] = Counter()  # функция где-либо в стеке
+        self.stacks: Counter[str] = Counter()  # свёрнутые стеки для flame graph
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self.join()
+
+    def run(self) -> None:
+        me = threading.get_ident()
+        while not self._stop_event.wait(self._interval):
+            self.samples += 1
+            for tid, frame in sys._current_frames().items():
+                if tid == me:
+                    continue
+                stack: list[Frame] = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append((code.co_filename, code.co_firstlineno, code.co_name))
+                    frame = frame.f_back
+                ours = [f for f in stack if _is_ours(f[0])]
+                if not ours:
+                    continue
+                self.own[ours[0]] += 1
+                self.cumulative.update(set(ours))
+                self.stacks[";".join(_label(f) for f in reversed(stack))] += 1
+
+    def top(self, limit: int = TOP_FUNCTIONS) -> list[dict[str, Any]]:
+        total = max(self.samples, 1)
+        return [
+            {
+                "function": _label(frame),
+                "samples": count,
+                "cumulative_pct": round(count * 100 / total, 2),
+                "own_pct": round(self.own[frame] * 100 / total, 2),
+            }
+            for frame, count in self.cumulative.most_common(limit)
+        ]
+
+    def collapsed(self) -> str:
+        """Формат «стек;стек;стек N» — для flamegraph.pl и speedscope."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+def _deterministic_top(profiler: cProfile.Profile, limit: int = TOP_FUNCTIONS) -> list[dict[str, Any]]:
+    stats = pstats.Stats(profiler).stats  # {(file, line, func): (cc, nc, tt, ct, callers)}
+    ours = sorted(
+        ((key, value) for key, value in stats.items() if _is_ours(key[0])),
+        key=lambda item: item[1][3],
+        reverse=True,
+    )
+    return [
+        {
+            "function": _label(key),
+            "calls": nc,
+            "own_ms": round(tt * 1000, 3),
+            "cumulative_ms": round(ct * 1000, 3),
+        }
+        for key, (_cc, nc, tt, ct, _callers) in ours[:limit]
+    ]
+
+
+def _write_deterministic(profiler: cProfile.Profile, base: str) -> list[str]:
+    profiler.dump_stats(f"{base}.prof")
+    stream = io.StringIO()
+    stats = pstats.Stats(profiler, stream=stream)
+    stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(re.escape(PACKAGE_DIR), TOP_FUNCTIONS)
+    with open(f"{base}.txt", "w", encoding="utf-8") as f:
+        f.write(stream.getvalue())
+    return [f"{base}.prof", f"{base}.txt"]
+
+
+def _write_sampling(sampler: StackSampler, base: str) -> list[str]:
+    with open(f"{base}.collapsed", "w", encoding="utf-8") as f:
+        f.write(sampler.collapsed())
+    with open(f"{base}.txt", "w", encoding="utf-8") as f:
+        f.write(f"samples: {sampler.samples}, interval: {SAMPLE_INTERVAL * 1000:.1f} ms\n\n")
+        for row in sampler.top():
+            f.write(f"{row['cumulative_pct']:6.2f}% cum {row['own_pct']:6.2f}% own  {row['function']}\n")
+    return [f"{base}.collapsed", f"{base}.txt"]
+
+
+async def async_profile(hass, duration: float, mode: str, tracers: list) -> dict[str, Any]:
+    """Профилирует интеграцию duration секунд и пишет файлы профиля в каталог конфигурации.
+
+    tracers — трассировщики устройств: их спаны за то же окно (ожидание lock,
+    очередь executor'а, сохранение состояния, записи) добавляются в сводку.
+    """
+    if _PROFILE_LOCK.locked():
+        raise RuntimeError("A profile is already running")
+    async with _PROFILE_LOCK:
+        started = time.perf_counter()
+        if mode == MODE_DETERMINISTIC:
+            # cProfile видит только поток event loop — там живёт весь async-код
+            profiler = cProfile.Profile()
+            profiler.enable()
+            try:
+                await asyncio.sleep(duration)
+            finally:
+                profiler.disable()
+        else:
+            sampler = StackSampler()
+            sampler.start()
+            try:
+                await asyncio.sleep(duration)
+            finally:
+                await hass.async_add_executor_job(sampler.stop)
+
+        base = hass.config.path(f"elkbledom_fastlink_profile_{time.strftime('%Y%m%d_%H%M%S')}")
+        if mode == MODE_DETERMINISTIC:
+            files = await hass.async_add_executor_job(_write_deterministic, profiler, base)
+            # Сводка pstats по всем функциям процесса — тоже не в event loop
+            top = await hass.async_add_executor_job(_deterministic_top, profiler)
+        else:
+            files = await hass.async_add_executor_job(_write_sampling, sampler, base)
+            top = sampler.top()
+
+        spans: dict[str, dict[str, float]] = {}
+        for tracer in tracers:
+            for name, agg in tracer.summary(since=started).items():
+                total = spans.setdefault(name, {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+                total["count"] += agg["count"]
+                total["total_ms"] += agg["total_ms"]
+                total["max_ms"] = max(total["max_ms"], agg["max_ms"])
+        for agg in spans.values():
+            agg["total_ms"] = round(agg["total_ms"], 2)
+            agg["max_ms"] = round(agg["max_ms"], 2)
+
+        return {
+            "mode": mode,
+            "duration_s": round(time.perf_counter() - started, 2),
+            "files": files,
+            "top_functions": top,
+            "spans": dict(sorted(spans.items(), key=lambda kv: kv[1]["total_ms"], reverse=True)),
+        }
@@ -0,0 +1,315 @@
+"""Приём E1.31 (sACN) и DDP по UDP: пульт / xLights управляет контроллерами напрямую.
+
+Каждому контроллеру — один RGB-пиксель (три канала) в адресном пространстве
+протокола. Пакеты разбираются без копирования (memoryview), контроллеру уходит
+только последний изменившийся цвет — с той скоростью, которую он выдерживает.
+Модуль не зависит от Home Assistant.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import socket
+import struct
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from .elkbledom import BLEDOMInstance
+
+LOGGER = logging.getLogger(__name__)
+
+PROTOCOL_E131 = "e131"
+PROTOCOL_DDP = "ddp"
+REALTIME_PROTOCOLS = [PROTOCOL_E131, PROTOCOL_DDP]
+DEFAULT_PORTS = {PROTOCOL_E131: 5568, PROTOCOL_DDP: 4048}
+
+CHANNELS_PER_UNIVERSE = 510  # 170 RGB-пикселей — раскладка xLights по умолчанию
+REALTIME_MAX_RATE = 50.0  # кадров/с на контроллер; выше BLE всё равно не успевает
+
+# ---------------------------------------------------------
+# E1.31: заголовок фиксированной длины, данные DMX — с 126-го байта
+# ---------------------------------------------------------
+E131_ACN_ID = b"ASC-E1.17\x00\x00\x00"
+E131_VECTOR_ROOT_DATA = 0x00000004
+E131_VECTOR_FRAMING_DATA = 0x00000002
+E131_VECTOR_DMP_SET_PROPERTY = 0x02
+E131_OPT_PREVIEW = 0x80
+E131_OPT_TERMINATED = 0x40
+E131_DMX_OFFSET = 126
+E131_SEQUENCE_WINDOW = 20  # пакеты «старше» на столько — устаревшие (E1.31 6.7.2)
+
+# ---------------------------------------------------------
+# DDP: 10 байт заголовка (+4 при timecode), смещение — в байтах
+# ---------------------------------------------------------
+DDP_VERSION_MASK = 0xC0
+DDP_VERSION_1 = 0x40
+DDP_FLAG_TIMECODE = 0x10
+DDP_FLAG_QUERY = 0x02
+DDP_DESTINATIONS = (0x01, 0xFF)  # устройство вывода по умолчанию / все
+DDP_HEADER = 10
+DDP_HEADER_TIMECODE = 14
+
+
+def parse_e131(data: bytes) -> tuple[int, int, memoryview] | None:
+    """(universe, sequence, DMX-данные) или None для чужих и служебных пакетов."""
+    if len(data) <= E131_DMX_OFFSET or data[4:16] != E131_ACN_ID:
+        return None
+    (root_vector,) = struct.unpack_from(">I", data, 18)
+    (framing_vector,) = struct.unpack_from(">I", data, 40)
+    if root_vector != E131_VECTOR_ROOT_DATA or framing_vector != E131_VECTOR_FRAMING_DATA:
+        return None  # синхронизация и discovery не несут цветов
+    if data[112] & (E131_OPT_PREVIEW | E131_OPT_TERMINATED):
+        return None
+    if data[117] != E131_VECTOR_DMP_SET_PROPERTY or data[125] != 0x00:
+        return None  # не DMX (start code != 0)
+    sequence = data[111]
+    (universe,) = struct.unpack_from(">H", data, 113)
+    (count,) = struct.unpack_from(">H", data, 123)
+    return universe, sequence, memoryview(data)[E131_DMX_OFFSET:E131_DMX_OFFSET + count - 1]
+
+
+def parse_ddp(data: bytes) -> tuple[int, memoryview] | None:
+    """(смещение в байтах, данные) или None для запросов и чужих пакетов."""
+    if len(data) < DDP_HEADER:
+        return None
+    flags = data[0]
+    if flags & DDP_VERSION_MASK != DDP_VERSION_1 or flags & DDP_FLAG_QUERY:
+        return None
+    if data[3] not in DDP_DESTINATIONS:
+        return None
+    offset, length = struct.unpack_from(">IH", data, 4)
+    start = DDP_HEADER_TIMECODE if flags & DDP_FLAG_TIMECODE else DDP_HEADER
+    return offset, memoryview(data)[start:start + length]
+
+
+def channel_layout(
+    count: int, protocol: str, universe: int, start_channel: int
+) -> list[tuple[int, int]]:
+    """(universe, смещение) для count контроллеров подряд начиная со start_channel (с 1).
+
+    E1.31: пиксели не разрываются между universe — как в xLights при 510 каналах.
+    DDP: адресное пространство плоское, universe не используется (0).
+    """
+    offset = start_channel - 1
+    if protocol == PROTOCOL_DDP:
+        return [(0, offset + 3 * i) for i in range(count)]
+    layout = []
+    universe += offset // CHANNELS_PER_UNIVERSE
+    offset %= CHANNELS_PER_UNIVERSE
+    for _ in range(count):
+        if offset + 3 > CHANNELS_PER_UNIVERSE:
+            universe, offset = universe + 1, 0
+        layout.append((universe, offset))
+        offset += 3
+    return layout
+
+
+def e131_multicast_group(universe: int) -> str:
+    return f"239.255.{(universe >> 8) & 0xFF}.{universe & 0xFF}"
+
+
+@dataclass(slots=True, eq=False)
+class _Slot:
+    """Один контроллер: последний принятый цвет и задача отправки."""
+
+    address: str
+    offset: int = 0
+    latest: bytes | None = None
+    sent: bytes | None = None
+    wake: asyncio.Event = field(default_factory=asyncio.Event)
+    task: asyncio.Task | None = None
+    frames: int = 0
+    coalesced: int = 0
+    errors: int = 0
+
+    def submit(self, pixel: bytes | memoryview) -> None:
+        """O(1) и без await: можно звать прямо из обработчика пакета."""
+        if pixel == self.latest:
+            return
+        if self.wake.is_set():
+            self.coalesced += 1  # предыдущий цвет так и не ушёл — заменяем
+        self.latest = bytes(pixel)
+        self.wake.set()
+
+
+class ColorSender:
+    """Последний цвет выигрывает: по задаче на контроллер, не чаще max_rate
+    и не быстрее, чем контроллер успевает записывать.
+
+    lookup возвращает экземпляр по MAC (или None, пока он не загружен) —
+    контроллеры могут появиться позже источника кадров.
+    """
+
+    def __init__(
+        self,
+        addresses: list[str],
+        lookup: Callable[[str], "BLEDOMInstance | None"],
+        max_rate: float = REALTIME_MAX_RATE,
+    ) -> None:
+        self.slots = [_Slot(address) for address in addresses]
+        self._lookup = lookup
+        self._interval = 1.0 / max_rate
+
+    def submit(self, index: int, pixel: bytes | memoryview) -> None:
+        self.slots[index].submit(pixel)
+
+    def start(self) -> None:
+        for slot in self.slots:
+            slot.task = asyncio.create_task(self._async_pump(slot))
+
+    async def stop(self) -> None:
+        tasks = [slot.task for slot in self.slots if slot.task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _async_pump(self, slot: _Slot) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            await slot.wake.wait()
+            slot.wake.clear()
+            pixel = slot.latest
+            if pixel is None or pixel == slot.sent:
+                continue
+            # Каждый раз заново: запись контроллера могла перезагрузиться
+            instance = self._lookup(slot.address)
+            if instance is None:
+                continue
+            started = loop.time()
+            try:
+                # Значения источника — уже итоговые: яркость полная
+                await instance.push_color(tuple(pixel), 255)
+                slot.sent = pixel
+                slot.frames += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                slot.errors += 1
+                LOGGER.debug("Realtime: %s write failed: %s", slot.address, e)
+            pause = self._interval - (loop.time() - started)
+            if pause > 0:
+                await asyncio.sleep(pause)
+
+    def stats(self, slot: _Slot) -> dict[str, Any]:
+        return {
+            "loaded": self._lookup(slot.address) is not None,
+            "frames": slot.frames,
+            "coalesced": slot.coalesced,
+            "errors": slot.errors,
+        }
+
+
+class RealtimeReceiver(asyncio.DatagramProtocol):
+    """UDP-приёмник: пакет -> изменившиеся пиксели -> ColorSender."""
+
+    def __init__(
+        self,
+        members: list[str],
+        lookup: Callable[[str], "BLEDOMInstance | None"],
+        protocol: str = PROTOCOL_E131,
+        universe: int = 1,
+        start_channel: int = 1,
+        port: int | None = None,
+        host: str = "0.0.0.0",
+        max_rate: float = REALTIME_MAX_RATE,
+    ) -> None:
+        self.protocol = protocol
+        self.port = port or DEFAULT_PORTS[protocol]
+        self._host = host
+        self._transport: asyncio.DatagramTransport | None = None
+        self._sender = ColorSender(members, lookup, max_rate)
+        # universe -> слоты (для DDP — единственный ключ 0), порядок по смещению
+        self._universes: dict[int, list[_Slot]] = {}
+        layout = channel_layout(len(members), protocol, universe, start_channel)
+        for slot, (u, offset) in zip(self._sender.slots, layout):
+            slot.offset = offset
+            self._universes.setdefault(u, []).append(slot)
+        self._sequences: dict[int, int] = {}
+        self.packets = 0
+        self.ignored = 0
+
+    # ---------------------------------------------------------
+    # Жизненный цикл
+    # ---------------------------------------------------------
+    def _open_socket(self) -> socket.socket:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((self._host, self.port))
+        if self.protocol == PROTOCOL_E131:
+            # sACN обычно шлётся multicast-ом на группу universe; unicast работает и без этого
+            for universe in self._universes:
+                mreq = struct.pack("4s4s", socket.inet_aton(e131_multicast_group(universe)), socket.inet_aton(self._host))
+                try:
+                    sock.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, mreq)
+                except OSError as e:
+                    LOGGER.debug("sACN: cannot join multicast for universe %s: %s", universe, e)
+        sock.setblocking(False)
+        return sock
+
+    async def async_start(self) -> None:
+        loop = asyncio.get_running_loop()
+        await loop.create_datagram_endpoint(lambda: self, sock=self._open_socket())
+        self._sender.start()
+        LOGGER.info(
+            "Realtime %s receiver listening on %s:%s for %d controllers",
+            self.protocol, self._host, self.port, len(self._sender.slots),
+        )
+
+    async def stop(self) -> None:
+        if self._transport is not None:
+            self._transport.close()
+            self._transport = None
+        await self._sender.stop()
+
+    def connection_made(self, transport: asyncio.BaseTransport) -> None:
+        self._transport = transport  # type: ignore[assignment]
+
+    # ---------------------------------------------------------
+    # Приём: только сравнение трёх байт на контроллер, без копий пакета
+    # ---------------------------------------------------------
+    def datagram_received(self, data: bytes, addr: tuple[str, int]) -> None:
+        self.packets += 1
+        if self.protocol == PROTOCOL_E131:
+            parsed = parse_e131(data)
+            if parsed is None:
+                self.ignored += 1
+                return
+            universe, sequence, dmx = parsed
+            slots = self._universes.get(universe)
+            if slots is None:
+                return
+            last = self._sequences.get(universe)
+            if last is not None and -E131_SEQUENCE_WINDOW < ((sequence - last + 128) & 0xFF) - 128 <= 0:
+                self.ignored += 1
+                return  # опоздавший пакет из UDP-перестановки
+            self._sequences[universe] = sequence
+            self._update(slots, 0, dmx)
+        else:
+            parsed = parse_ddp(data)
+            if parsed is None:
+                self.ignored += 1
+                return
+            offset, payload = parsed
+            self._update(self._universes.get(0, ()), offset, payload)
+
+    @staticmethod
+    def _update(slots, base: int, payload: memoryview) -> None:
+        end = base + len(payload)
+        for slot in slots:
+            if base <= slot.offset and slot.offset + 3 <= end:
+                slot.submit(payload[slot.offset - base:slot.offset - base + 3])
+
+    def diagnostics(self) -> dict[str, Any]:
+        return {
+            "protocol": self.protocol,
+            "port": self.port,
+            "packets": self.packets,
+            "ignored": self.ignored,
+            "devices": {
+                slot.address: {"universe": u, "channel": slot.offset + 1, **self._sender.stats(slot)}
+                for u, slots in self._universes.items()
+                for slot in slots
+            },
+        }
@@ -8,6 +8,7 @@ from homeassistant.helpers import device_registry
 
 from .const import DOMAIN, BRIGHTNESS_MODES, CONF_BRIGHTNESS_MODE
 from .elkbledom import BLEDOMInstance
+from .entity import BLEDOMEntity
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -17,26 +18,24 @@ async def async_setup_entry(
 ):
     """Set up brightness mode selector for ELK-BLEDOM."""
     instance: BLEDOMInstance = hass.data[DOMAIN][entry.entry_id]
-    async_add_entities([BLEDOMBrightnessModeSelect(instance, entry)], True)
+    async_add_entities([BLEDOMBrightnessModeSelect(instance, entry)])
 
 
-class BLEDOMBrightnessModeSelect(SelectEntity):
+class BLEDOMBrightnessModeSelect(BLEDOMEntity, SelectEntity):
     """Select entity for choosing brightness mode."""
 
     _attr_options = BRIGHTNESS_MODES
-    _attr_should_poll = False
 
     def __init__(self, instance: BLEDOMInstance, entry: ConfigEntry) -> None:
-        self._instance = instance
+        super().__init__(instance)
         self._entry = entry
         self._attr_name = f"{entry.data.get('name', 'ELK-BLEDOM')} Brightness Mode"
         self._attr_unique_id = f"{instance.address}_brightness_mode"
-        self._current_option = entry.options.get(CONF_BRIGHTNESS_MODE, "auto")
 
     @property
     def current_option(self) -> str:
         """Return the current brightness mode."""
-        return self._current_option
+        return self._instance.brightness_mode
 
     @property
     def device_info(self) -> DeviceInfo:
@@ -55,19 +54,15 @@ class BLEDOMBrightnessModeSelect(SelectEntity):
             _LOGGER.warning("Invalid brightness mode selected: %s", option)
             return
 
-        if option == self._current_option:
+        if option == self.current_option:
             return  # nothing to change
 
         _LOGGER.info("Changing brightness mode to %s for %s", option, self._instance.address)
-        self._current_option = option
 
-        # Update HA entry options
+        # Apply on the live instance — the BLE link stays up
+        await self._instance.apply_brightness_mode(option)
+
+        # Update HA entry options (the update listener sees no change left to apply)
         data = dict(self._entry.options)
         data[CONF_BRIGHTNESS_MODE] = option
         self.hass.config_entries.async_update_entry(self._entry, options=data)
-
-        # Trigger reconnect for mode change
-        await self._instance.stop()
-        await self._instance._ensure_connected()
-
-        self.async_write_ha_state()
@@ -0,0 +1,218 @@
+"""Сервисы уровня интеграции (работают сразу с несколькими контроллерами)."""
+from __future__ import annotations
+
+import json
+import logging
+
+import voluptuous as vol
+from homeassistant.const import ATTR_ENTITY_ID
+from homeassistant.core import HomeAssistant, ServiceCall, ServiceResponse, SupportsResponse
+from homeassistant.components.ffmpeg import get_ffmpeg_manager
+from homeassistant.exceptions import HomeAssistantError, ServiceValidationError
+from homeassistant.helpers import config_validation as cv, entity_registry as er
+from homeassistant.util import dt as dt_util
+
+from .const import (
+    DOMAIN,
+    CONF_MEMBERS,
+    CONF_VIRTUAL,
+    EFFECTS_MAP,
+    EFFECT_LABEL_TO_KEY,
+    SERVICE_SYNC_EFFECT,
+    SERVICE_EXPORT_TRACE,
+    SERVICE_PROFILE,
+    SERVICE_AUDIO_START,
+    SERVICE_AUDIO_STOP,
+)
+from .adapter import instance_lookup
+from .audio import AUDIO_MODE_BANDS, AUDIO_MODES, DEFAULT_SAMPLE_RATE, AudioReactive
+from .elkbledom import BLEDOMInstance, async_sync_effect
+from .profiler import MODE_SAMPLING, PROFILE_MODES, async_profile
+from .tracing import chrome_trace_document
+
+LOGGER = logging.getLogger(__name__)
+
+# Запущенная светомузыка (одна на HA: один источник звука)
+DATA_AUDIO = f"{DOMAIN}_audio"
+
+SYNC_EFFECT_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_ENTITY_ID): cv.entity_ids,
+        vol.Optional("effect"): cv.string,
+        # Как у number-сущности скорости: байт скорости контроллера — 1..31
+        vol.Optional("speed"): vol.All(vol.Coerce(int), vol.Range(min=1, max=31)),
+    }
+)
+
+EXPORT_TRACE_SCHEMA = vol.Schema({vol.Optional(ATTR_ENTITY_ID): cv.entity_ids})
+
+PROFILE_SCHEMA = vol.Schema(
+    {
+        vol.Optional("duration", default=30): vol.All(vol.Coerce(float), vol.Range(min=1, max=600)),
+        vol.Optional("mode", default=MODE_SAMPLING): vol.In(PROFILE_MODES),
+    }
+)
+
+AUDIO_START_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_ENTITY_ID): cv.entity_ids,
+        vol.Required("source"): cv.string,
+        vol.Optional("mode", default=AUDIO_MODE_BANDS): vol.In(AUDIO_MODES),
+        vol.Optional("sample_rate", default=DEFAULT_SAMPLE_RATE): vol.All(
+            vol.Coerce(int), vol.Range(min=8000, max=192000)
+        ),
+        vol.Optional("channels", default=1): vol.All(vol.Coerce(int), vol.Range(min=1, max=8)),
+    }
+)
+
+
+def _resolve_instances(hass: HomeAssistant, entity_ids: list[str]) -> list[BLEDOMInstance]:
+    """Экземпляры контроллеров за сущностями; виртуальная лента раскрывается в участников."""
+    registry = er.async_get(hass)
+    instances: dict[str, BLEDOMInstance] = {}
+    by_address = {
+        inst.address: inst
+        for inst in hass.data.get(DOMAIN, {}).values()
+        if isinstance(inst, BLEDOMInstance)
+    }
+    for entity_id in entity_ids:
+        reg_entry = registry.async_get(entity_id)
+        if reg_entry is None or reg_entry.platform != DOMAIN:
+            raise HomeAssistantError(f"{entity_id} is not an ELK-BLEDOM light")
+        config_entry = hass.config_entries.async_get_entry(reg_entry.config_entry_id)
+        if config_entry and config_entry.data.get(CONF_VIRTUAL):
+            members = [by_address.get(addr) for addr in config_entry.data[CONF_MEMBERS]]
+        else:
+            members = [hass.data[DOMAIN].get(reg_entry.config_entry_id)]
+        for inst in members:
+            if inst is not None:
+                instances.setdefault(inst.address, inst)
+    return list(instances.values())
+
+
+def _effect_id(name: str) -> int:
+    effect_key = EFFECT_LABEL_TO_KEY.get(name, name)
+    if effect_key not in EFFECTS_MAP:
+        raise HomeAssistantError(f"Unknown effect: {name}")
+    return EFFECTS_MAP[effect_key]
+
+
+def _write_json(path: str, document: dict) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(document, f)
+
+
+def async_setup_services(hass: HomeAssistant) -> None:
+    """Регистрирует сервисы один раз — при загрузке первой записи."""
+    if hass.services.has_service(DOMAIN, SERVICE_SYNC_EFFECT):
+        return
+
+    async def _async_sync_effect(call: ServiceCall) -> ServiceResponse:
+        instances = _resolve_instances(hass, call.data[ATTR_ENTITY_ID])
+        if not instances:
+            raise HomeAssistantError("No loaded ELK-BLEDOM controllers to sync")
+        value = _effect_id(call.data["effect"]) if "effect" in call.data else None
+        report = await async_sync_effect(instances, value, call.data.get("speed"))
+        LOGGER.debug("sync_effect: %s", report)
+        return report
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_SYNC_EFFECT,
+        _async_sync_effect,
+        schema=SYNC_EFFECT_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+
+    async def _async_export_trace(call: ServiceCall) -> ServiceResponse:
+        """Трассировка в формате Chrome Trace (chrome://tracing, ui.perfetto.dev)."""
+        if ATTR_ENTITY_ID in call.data:
+            instances = _resolve_instances(hass, call.data[ATTR_ENTITY_ID])
+        else:
+            instances = [
+                inst for inst in hass.data.get(DOMAIN, {}).values() if isinstance(inst, BLEDOMInstance)
+            ]
+        document = chrome_trace_document([inst.tracer for inst in instances])
+        path = hass.config.path(f"{DOMAIN}_trace_{dt_util.now().strftime('%Y%m%d_%H%M%S')}.json")
+        await hass.async_add_executor_job(_write_json, path, document)
+        LOGGER.info("Trace of %d devices written to %s", len(instances), path)
+        return {"path": path, "devices": len(instances), "events": len(document["traceEvents"])}
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_EXPORT_TRACE,
+        _async_export_trace,
+        schema=EXPORT_TRACE_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+
+    async def _async_profile(call: ServiceCall) -> ServiceResponse:
+        """Профиль кода интеграции за ограниченное окно; файлы — в каталоге конфигурации."""
+        tracers = [
+            inst.tracer for inst in hass.data.get(DOMAIN, {}).values() if isinstance(inst, BLEDOMInstance)
+        ]
+        LOGGER.info("Profiling %s for %.0f s", DOMAIN, call.data["duration"])
+        try:
+            result = await async_profile(hass, call.data["duration"], call.data["mode"], tracers)
+        except (RuntimeError, ValueError) as e:
+            # ValueError — cProfile.enable(), когда в процессе уже активен другой профилировщик
+            raise HomeAssistantError(str(e)) from e
+        LOGGER.info("Profile written to %s", ", ".join(result["files"]))
+        return result
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_PROFILE,
+        _async_profile,
+        schema=PROFILE_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+
+    async def _async_audio_stop(call: ServiceCall | None = None) -> ServiceResponse:
+        engine: AudioReactive | None = hass.data.pop(DATA_AUDIO, None)
+        if engine is None:
+            return {"running": False}
+        await engine.stop()
+        return engine.diagnostics()
+
+    async def _async_audio_start(call: ServiceCall) -> ServiceResponse:
+        """Светомузыка: порядок сущностей (и участников виртуальной ленты) — порядок полос."""
+        instances = _resolve_instances(hass, call.data[ATTR_ENTITY_ID])
+        if not instances:
+            raise HomeAssistantError("No loaded ELK-BLEDOM controllers for audio")
+        source = call.data["source"]
+        # Локальный путь — только из разрешённых каталогов (allowlist_external_dirs)
+        if "://" not in source and not hass.config.is_allowed_path(source):
+            raise ServiceValidationError(f"Audio source path is not allowed: {source}")
+        await _async_audio_stop()
+        engine = AudioReactive(
+            [inst.address for inst in instances],
+            instance_lookup(hass),
+            source,
+            call.data["mode"],
+            call.data["sample_rate"],
+            call.data["channels"],
+            run_blocking=hass.async_add_executor_job,
+            ffmpeg=get_ffmpeg_manager(hass).binary,
+        )
+        try:
+            await engine.async_start()
+        except (OSError, ValueError) as e:
+            await engine.stop()
+            raise HomeAssistantError(f"Cannot open audio source {call.data['source']}: {e}") from e
+        hass.data[DATA_AUDIO] = engine
+        return {"devices": len(instances), "mode": engine.mode}
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_AUDIO_START,
+        _async_audio_start,
+        schema=AUDIO_START_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_AUDIO_STOP,
+        _async_audio_stop,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
@@ -0,0 +1,119 @@
+"""Кольцевой буфер трассировки команд ELK-BLEDOM (без debug-логов)."""
+from __future__ import annotations
+
+import time
+from collections import deque
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any
+
+TRACE_BUFFER_SIZE = 512  # спанов на устройство; старые вытесняются
+
+
+@dataclass(slots=True)
+class Span:
+    """Один отрезок работы: подключение, ожидание lock, запись, пауза..."""
+
+    name: str
+    start: float  # time.perf_counter()
+    duration: float  # 0 — мгновенное событие
+    args: dict[str, Any] | None = None
+
+
+class Tracer:
+    """Фиксированный буфер спанов одного устройства.
+
+    Запись — одно добавление в deque(maxlen), без аллокаций сверх самого
+    спана, поэтому трассировка включена всегда. Экспорт — в JSON для
+    диагностики HA и в формат Chrome Trace (chrome://tracing, Perfetto).
+    """
+
+    def __init__(self, name: str, size: int = TRACE_BUFFER_SIZE) -> None:
+        self.name = name
+        self._spans: deque[Span] = deque(maxlen=size)
+        # perf_counter монотонный, но без эпохи — запоминаем смещение до wall clock
+        self._epoch_offset = time.time() - time.perf_counter()
+
+    def __len__(self) -> int:
+        return len(self._spans)
+
+    @contextmanager
+    def span(self, name: str, **args: Any) -> Iterator[dict[str, Any]]:
+        """Замеряет блок (в т.ч. с await внутри); в yield-словарь можно дописать аргументы."""
+        start = time.perf_counter()
+        try:
+            yield args
+        except BaseException as err:
+            args["error"] = str(err) or type(err).__name__
+            raise
+        finally:
+            self._spans.append(Span(name, start, time.perf_counter() - start, args or None))
+
+    def record(self, name: str, start: float, **args: Any) -> None:
+        """Отрезок от start (perf_counter) до текущего момента — когда with неудобен."""
+        self._spans.append(Span(name, start, time.perf_counter() - start, args or None))
+
+    def event(self, name: str, **args: Any) -> None:
+        """Мгновенное событие (повтор, журнал, отброшенный кадр)."""
+        self._spans.append(Span(name, time.perf_counter(), 0.0, args or None))
+
+    def summary(self, since: float = 0.0) -> dict[str, dict[str, float]]:
+        """Сводка по именам спанов начиная с since (perf_counter): число, сумма и максимум, мс."""
+        out: dict[str, dict[str, float]] = {}
+        for s in self._spans:
+            if s.start < since:
+                continue
+            agg = out.setdefault(s.name, {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+            agg["count"] += 1
+            agg["total_ms"] += s.duration * 1000
+            agg["max_ms"] = max(agg["max_ms"], s.duration * 1000)
+        return out
+
+    def clear(self) -> None:
+        self._spans.clear()
+
+    # ---------------------------------------------------------
+    # Экспорт
+    # ---------------------------------------------------------
+    def as_dicts(self) -> list[dict[str, Any]]:
+        """Спаны от старых к новым; время — Unix, длительность — мс."""
+        return [
+            {
+                "name": s.name,
+                "time": round(s.start + self._epoch_offset, 6),
+                "duration_ms": round(s.duration * 1000, 3),
+                **({"args": s.args} if s.args else {}),
+            }
+            for s in self._spans
+        ]
+
+    def to_chrome_trace(self, pid: int = 1, tid: int = 1) -> list[dict[str, Any]]:
+        """События формата Chrome Trace: "X" — отрезок, "i" — мгновенное, время в мкс."""
+        events: list[dict[str, Any]] = [
+            {"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": self.name}}
+        ]
+        for s in self._spans:
+            event: dict[str, Any] = {
+                "name": s.name,
+                "ph": "X" if s.duration else "i",
+                "ts": round((s.start + self._epoch_offset) * 1_000_000),
+                "pid": pid,
+                "tid": tid,
+            }
+            if s.duration:
+                event["dur"] = round(s.duration * 1_000_000)
+            else:
+                event["s"] = "t"
+            if s.args:
+                event["args"] = s.args
+            events.append(event)
+        return events
+
+
+def chrome_trace_document(tracers: list[Tracer]) -> dict[str, Any]:
+    """Один файл трассировки; каждое устройство — отдельная дорожка."""
+    events: list[dict[str, Any]] = []
+    for tid, tracer in enumerate(tracers, start=1):
+        events.extend(tracer.to_chrome_trace(pid=1, tid=tid))
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
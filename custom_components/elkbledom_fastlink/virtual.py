@@ -0,0 +1,260 @@
+"""Виртуальная лента: несколько контроллеров ELK-BLEDOM как одна градиентная поверхность."""
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Any
+
+import numpy as np
+from homeassistant.components.light import (
+    ATTR_BRIGHTNESS,
+    ATTR_EFFECT,
+    ATTR_RGB_COLOR,
+    ColorMode,
+    LightEntity,
+    LightEntityFeature,
+)
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import CONF_MEMBERS, DOMAIN, BLEDOMEntityFeature
+from .elkbledom import BLEDOMInstance
+
+_LOGGER = logging.getLogger(__name__)
+
+# ---------------------------------------------------------
+# Параметры анимации
+# ---------------------------------------------------------
+FRAME_INTERVAL = 0.1  # сек; ~10 кадров/с — предел, который тянет BLE на контроллер
+DEFAULT_SPEED = 0.2  # длин ленты в секунду
+CHASE_WIDTH = 0.25  # ширина «головы» бегущего огня, доля длины ленты
+
+EFFECT_GRADIENT = "gradient"
+EFFECT_GRADIENT_SCROLL = "gradient_scroll"
+EFFECT_RAINBOW = "rainbow"
+EFFECT_CHASE = "chase"
+VIRTUAL_EFFECTS = [EFFECT_GRADIENT, EFFECT_GRADIENT_SCROLL, EFFECT_RAINBOW, EFFECT_CHASE]
+ANIMATED_EFFECTS = {EFFECT_GRADIENT_SCROLL, EFFECT_RAINBOW, EFFECT_CHASE}
+
+
+# =========================================================
+# Векторная математика: все контроллеры считаются одним массивом
+# =========================================================
+def member_positions(count: int) -> np.ndarray:
+    """Позиции контроллеров вдоль ленты, равномерно от 0 до 1."""
+    if count <= 1:
+        return np.zeros(count)
+    return np.linspace(0.0, 1.0, count)
+
+
+def ring_positions(count: int) -> np.ndarray:
+    """Позиции для замкнутых эффектов: последний контроллер не совпадает с первым."""
+    return np.arange(count) / max(count, 1)
+
+
+def gradient(stops: np.ndarray, positions: np.ndarray, offset: float = 0.0, wrap: bool = False) -> np.ndarray:
+    """Линейная интерполяция опорных цветов (k, 3) в позициях (n,) -> (n, 3) uint8.
+
+    wrap=True замыкает градиент в кольцо (последний цвет переходит в первый),
+    чтобы сдвиг offset давал бесшовную прокрутку.
+    """
+    stops = np.asarray(stops, dtype=np.float64).reshape(-1, 3)
+    if len(stops) == 1:
+        stops = np.vstack([stops, stops])
+    if wrap:
+        stops = np.vstack([stops, stops[:1]])
+        pos = np.mod(positions + offset, 1.0)
+    else:
+        pos = np.clip(positions + offset, 0.0, 1.0)
+    stop_pos = np.linspace(0.0, 1.0, len(stops))
+    seg = np.clip(np.searchsorted(stop_pos, pos, side="right") - 1, 0, len(stops) - 2)
+    t = (pos - stop_pos[seg]) / (stop_pos[seg + 1] - stop_pos[seg])
+    colors = stops[seg] + (stops[seg + 1] - stops[seg]) * t[:, None]
+    return np.clip(np.rint(colors), 0, 255).astype(np.uint8)
+
+
+def rainbow(positions: np.ndarray, offset: float = 0.0) -> np.ndarray:
+    """Полный круг оттенков (HSV, s=v=1) вдоль ленты -> (n, 3) uint8."""
+    h6 = np.mod(positions + offset, 1.0) * 6.0
+    rgb = np.stack(
+        [
+            np.abs(h6 - 3.0) - 1.0,
+            2.0 - np.abs(h6 - 2.0),
+            2.0 - np.abs(h6 - 4.0),
+        ],
+        axis=1,
+    )
+    return np.rint(np.clip(rgb, 0.0, 1.0) * 255).astype(np.uint8)
+
+
+def chase(color: np.ndarray, positions: np.ndarray, offset: float, width: float = CHASE_WIDTH) -> np.ndarray:
+    """Бегущий огонь: яркость спадает линейно от «головы» в позиции offset (по кольцу)."""
+    dist = np.abs(positions - np.mod(offset, 1.0))
+    dist = np.minimum(dist, 1.0 - dist)
+    level = np.clip(1.0 - dist / width, 0.0, 1.0)
+    colors = np.asarray(color, dtype=np.float64)[None, :] * level[:, None]
+    return np.rint(colors).astype(np.uint8)
+
+
+# =========================================================
+# Сущность виртуальной ленты
+# =========================================================
+class BLEDOMVirtualStrip(LightEntity):
+    """Упорядоченный набор контроллеров, управляемый как одна лента."""
+
+    _attr_should_poll = False
+    _attr_supported_color_modes = {ColorMode.RGB}
+    _attr_color_mode = ColorMode.RGB
+    _attr_supported_features = LightEntityFeature.EFFECT | BLEDOMEntityFeature.GRADIENT
+    _attr_effect_list = VIRTUAL_EFFECTS
+
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry) -> None:
+        self.hass = hass
+        self._attr_name = entry.data["name"]
+        self._attr_unique_id = f"{entry.unique_id or entry.entry_id}_light"
+        self._members: list[str] = list(entry.data[CONF_MEMBERS])
+        self._positions = member_positions(len(self._members))
+        self._ring = ring_positions(len(self._members))
+
+        self._attr_is_on = False
+        self._attr_brightness = 255
+        self._attr_rgb_color = (255, 255, 255)
+        self._attr_effect = EFFECT_GRADIENT
+        self._stops = np.array([[255, 255, 255]], dtype=np.float64)
+        self._speed = DEFAULT_SPEED
+
+        self._last: np.ndarray | None = None  # последние отправленные цвета
+        self._task: asyncio.Task | None = None
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        return {
+            "members": self._members,
+            "gradient": self._stops.astype(int).tolist(),
+            "speed": self._speed,
+        }
+
+    # --------------------------------
+    # Участники
+    # --------------------------------
+    def _resolve_members(self) -> list[BLEDOMInstance | None]:
+        """Экземпляры участников по MAC; None — контроллер не загружен."""
+        by_address = {
+            inst.address: inst
+            for inst in self.hass.data.get(DOMAIN, {}).values()
+            if isinstance(inst, BLEDOMInstance)
+        }
+        return [by_address.get(address) for address in self._members]
+
+    # --------------------------------
+    # Кадры
+    # --------------------------------
+    def _render(self, elapsed: float) -> np.ndarray:
+        offset = elapsed * self._speed
+        if self._attr_effect == EFFECT_RAINBOW:
+            return rainbow(self._ring, offset)
+        if self._attr_effect == EFFECT_CHASE:
+            return chase(self._stops[0], self._ring, offset)
+        if self._attr_effect == EFFECT_GRADIENT_SCROLL:
+            return gradient(self._stops, self._ring, -offset, wrap=True)
+        return gradient(self._stops, self._positions)
+
+    async def _async_push(self, frame: np.ndarray) -> None:
+        """Отправляет только изменившиеся цвета, всем участникам одновременно."""
+        members = self._resolve_members()
+        if self._last is None:
+            # -1 не совпадает ни с одним цветом — первый кадр уходит целиком
+            self._last = np.full(frame.shape, -1, dtype=np.int16)
+        changed = np.any(frame != self._last, axis=1)
+
+        indices = [i for i in np.flatnonzero(changed) if members[i] is not None]
+        if not indices:
+            return
+        results = await asyncio.gather(
+            *(
+                members[i].push_color(tuple(int(c) for c in frame[i]), self._attr_brightness)
+                for i in indices
+            ),
+            return_exceptions=True,
+        )
+        for i, res in zip(indices, results):
+            if isinstance(res, BaseException):
+                # Не запоминаем — цвет уйдёт повторно со следующим кадром
+                _LOGGER.debug("%s: member %s failed: %s", self.name, self._members[i], res)
+            else:
+                self._last[i] = frame[i]
+
+    async def _async_animate(self) -> None:
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        next_frame = start
+        while True:
+            await self._async_push(self._render(loop.time() - start))
+            next_frame += FRAME_INTERVAL
+            # Отстали (медленный BLE) — пропускаем кадры, а не копим долг
+            next_frame = max(next_frame, loop.time())
+            await asyncio.sleep(next_frame - loop.time())
+
+    async def _async_stop_animation(self) -> None:
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    async def _async_apply(self) -> None:
+        """Перезапуск анимации или однократная отправка статичного кадра."""
+        await self._async_stop_animation()
+        if self._attr_effect in ANIMATED_EFFECTS:
+            self._task = self.hass.async_create_background_task(
+                self._async_animate(), f"elkbledom virtual strip {self.name}"
+            )
+        else:
+            await self._async_push(self._render(0.0))
+
+    # --------------------------------
+    # Управление
+    # --------------------------------
+    async def async_turn_on(self, **kwargs) -> None:
+        if ATTR_BRIGHTNESS in kwargs:
+            self._attr_brightness = kwargs[ATTR_BRIGHTNESS]
+            self._last = None  # яркость участника входит в кадр — переотправить всё
+        if ATTR_RGB_COLOR in kwargs:
+            self._attr_rgb_color = tuple(kwargs[ATTR_RGB_COLOR])
+            self._stops = np.array([self._attr_rgb_color], dtype=np.float64)
+            if ATTR_EFFECT not in kwargs and self._attr_effect != EFFECT_CHASE:
+                self._attr_effect = EFFECT_GRADIENT
+        if ATTR_EFFECT in kwargs and kwargs[ATTR_EFFECT] in VIRTUAL_EFFECTS:
+            self._attr_effect = kwargs[ATTR_EFFECT]
+
+        if not self._attr_is_on:
+            self._last = None
+        self._attr_is_on = True
+        await self._async_apply()
+        self.async_write_ha_state()
+
+    async def async_turn_off(self, **kwargs) -> None:
+        await self._async_stop_animation()
+        self._attr_is_on = False
+        self._last = None
+        await asyncio.gather(
+            *(inst.turn_off() for inst in self._resolve_members() if inst is not None),
+            return_exceptions=True,
+        )
+        self.async_write_ha_state()
+
+    async def async_set_gradient(self, colors: list[list[int]], speed: float | None = None) -> None:
+        """Новый набор опорных цветов; speed > 0 — прокрутка, 0 — статичный градиент."""
+        self._stops = np.clip(np.array(colors, dtype=np.float64).reshape(-1, 3), 0, 255)
+        self._attr_rgb_color = tuple(int(c) for c in self._stops[0])
+        if speed is not None:
+            self._speed = speed
+        self._attr_effect = EFFECT_GRADIENT_SCROLL if self._speed > 0 else EFFECT_GRADIENT
+        self._attr_is_on = True
+        await self._async_apply()
+        self.async_write_ha_state()
+
+    async def async_will_remove_from_hass(self) -> None:
+        await self._async_stop_animation()
@@ -0,0 +1,286 @@
+"""Конвейерная отправка BLE-кадров (write-without-response) для ELK-BLEDOM."""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections.abc import Awaitable, Callable, Iterable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from enum import IntEnum
+from typing import TYPE_CHECKING
+
+from .tracing import Tracer
+
+if TYPE_CHECKING:
+    from .airtime import AirtimeShare
+
+LOGGER = logging.getLogger(__name__)
+
+# ---------------------------------------------------------
+# Параметры конвейера
+# ---------------------------------------------------------
+WRITE_QUEUE_SIZE = 64  # глубина буфера; при заполнении продюсеры ждут
+WRITE_BATCH_SIZE = 16  # кадров на одну проверку соединения
+MAX_IN_FLIGHT = 4  # одновременно отправляемых кадров без подтверждения
+COMMAND_DEADLINE = 5.0  # сек; не отправленный к этому сроку кадр отбрасывается
+
+
+# ---------------------------------------------------------
+# Классы приоритета
+# ---------------------------------------------------------
+class Priority(IntEnum):
+    """Меньше значение — выше приоритет."""
+
+    INTERACTIVE = 0  # нажатия пользователя в UI
+    AUTOMATION = 1  # автоматизации, скрипты, сервисы
+    BACKGROUND = 2  # анимации, ресинхронизация, повторы после reconnect
+
+
+# Приоритет текущей задачи; наследуется вложенными вызовами и create_task
+_PRIORITY: ContextVar[Priority] = ContextVar("elkbledom_write_priority", default=Priority.AUTOMATION)
+
+
+def current_priority() -> Priority:
+    return _PRIORITY.get()
+
+
+def priority_for_context(context) -> Priority:
+    """Вызов из UI (в контексте HA есть user_id) — INTERACTIVE, иначе AUTOMATION."""
+    if context is not None and getattr(context, "user_id", None):
+        return Priority.INTERACTIVE
+    return Priority.AUTOMATION
+
+
+@contextmanager
+def write_priority(priority: Priority) -> Iterator[None]:
+    """Все записи внутри блока уходят в указанную полосу."""
+    token = _PRIORITY.set(priority)
+    try:
+        yield
+    finally:
+        _PRIORITY.reset(token)
+
+
+# ---------------------------------------------------------
+# Поколения команд и дедлайны
+# ---------------------------------------------------------
+@dataclass(slots=True)
+class CommandToken:
+    """Команда над одним атрибутом устройства (цвет, питание, эффект...).
+
+    Новая команда над тем же атрибутом увеличивает поколение — все кадры
+    и повторы старых поколений становятся ненужными.
+    """
+
+    key: str
+    generation: int
+    deadline: float
+    generations: dict[str, int]  # общий для устройства счётчик поколений
+
+    @property
+    def superseded(self) -> bool:
+        return self.generations.get(self.key) != self.generation
+
+    def expired(self, now: float) -> bool:
+        return self.superseded or now > self.deadline
+
+
+class Superseded(Exception):
+    """Команду заменила более новая над тем же атрибутом: её состояние не фиксируется."""
+
+
+_COMMAND: ContextVar[CommandToken | None] = ContextVar("elkbledom_command", default=None)
+
+
+def current_command() -> CommandToken | None:
+    return _COMMAND.get()
+
+
+def raise_if_superseded() -> None:
+    """Зовётся после каждого await команды, до изменения состояния."""
+    token = _COMMAND.get()
+    if token is not None and token.superseded:
+        raise Superseded(token.key)
+
+
+@contextmanager
+def command_scope(token: CommandToken) -> Iterator[None]:
+    """Все записи внутри блока помечаются поколением/дедлайном команды."""
+    reset = _COMMAND.set(token)
+    try:
+        yield
+    finally:
+        _COMMAND.reset(reset)
+
+
+class BLEDOMWriter:
+    """Фоновая задача записи: один writer на устройство.
+
+    Кадры попадают в ограниченный буфер своей полосы приоритета, writer
+    забирает их пачками, проверяет соединение один раз на пачку и держит до
+    MAX_IN_FLIGHT кадров в полёте. Перед каждым окном выбирается самая
+    приоритетная непустая полоса, так что свежий INTERACTIVE-кадр обгоняет
+    уже стоящие в очереди фоновые. Переполненная полоса блокирует только
+    своих продюсеров (backpressure). Кадры устаревших поколений и кадры
+    с истёкшим дедлайном не отправляются: их ожидание завершается без ошибки.
+    С бюджетом эфира (airtime) окно не больше выданных адаптером токенов.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        connect: Callable[[], Awaitable[None]],
+        send: Callable[[bytes], Awaitable[None]],
+        tracer: Tracer | None = None,
+        airtime: AirtimeShare | None = None,
+    ) -> None:
+        self._name = name
+        self._connect = connect
+        self._send = send
+        self._tracer = tracer
+        self._airtime = airtime
+        self._lanes: list[asyncio.Queue[tuple[bytes, asyncio.Future, CommandToken | None]]] = [
+            asyncio.Queue(WRITE_QUEUE_SIZE) for _ in Priority
+        ]
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    @property
+    def pending(self) -> int:
+        return sum(lane.qsize() for lane in self._lanes)
+
+    async def write(
+        self,
+        frames: Iterable[bytes | bytearray | list[int]],
+        priority: Priority | None = None,
+    ) -> None:
+        """Ставит кадры в очередь и ждёт, пока все они уйдут в эфир (или устареют)."""
+        self._ensure_task()
+        lane = self._lanes[current_priority() if priority is None else priority]
+        token = current_command()
+        loop = asyncio.get_running_loop()
+        futures: list[asyncio.Future] = []
+        for frame in frames:
+            fut = loop.create_future()
+            await lane.put((bytes(frame), fut, token))
+            futures.append(fut)
+            self._wakeup.set()
+
+        results = await asyncio.gather(*futures, return_exceptions=True)
+        for res in results:
+            if isinstance(res, BaseException):
+                raise res
+
+    async def stop(self) -> None:
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+        for lane in self._lanes:
+            while not lane.empty():
+                _, fut, _ = lane.get_nowait()
+                if not fut.done():
+                    fut.cancel()
+
+    # ---------------------------------------------------------
+    # Внутренний цикл
+    # ---------------------------------------------------------
+    def _ensure_task(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name=f"elkbledom writer {self._name}")
+
+    def _take_window(
+        self, limit: int = MAX_IN_FLIGHT, priority: Priority | None = None
+    ) -> list[tuple[bytes, asyncio.Future]]:
+        """До limit актуальных кадров из самой приоритетной непустой полосы
+        (или только из полосы priority)."""
+        now = asyncio.get_running_loop().time()
+        lanes = self._lanes if priority is None else (self._lanes[priority],)
+        for lane in lanes:
+            window = []
+            while len(window) < limit and not lane.empty():
+                frame, fut, token = lane.get_nowait()
+                if fut.done():
+                    continue
+                if token is not None and token.expired(now):
+                    reason = "superseded" if token.superseded else "deadline passed"
+                    LOGGER.debug("%s: dropped %s frame (%s)", self._name, token.key, reason)
+                    if self._tracer is not None:
+                        self._tracer.event("frame_dropped", key=token.key, reason=reason)
+                    fut.set_result(None)
+                    continue
+                window.append((frame, fut))
+            if window:
+                return window
+        return []
+
+    async def _next_window(self) -> list[tuple[bytes, asyncio.Future]]:
+        if self._airtime is None:
+            return self._take_window()
+        while True:
+            priority = next((p for p in Priority if not self._lanes[p].empty()), None)
+            if priority is None:
+                return []
+            waited = time.perf_counter()
+            granted = await self._airtime.acquire(priority, min(MAX_IN_FLIGHT, self._lanes[priority].qsize()))
+            if self._tracer is not None and time.perf_counter() - waited > 0.001:
+                self._tracer.record("airtime_wait", waited, priority=priority.name)
+            # Токены выданы классу priority — и кадры берутся только из его полосы:
+            # резерв INTERACTIVE не должен уйти фоновым кадрам
+            window = self._take_window(granted, priority)
+            # Кадры устарели, пока ждали токены, — их доля возвращается адаптеру
+            self._airtime.refund(granted - len(window))
+            if window:
+                return window
+
+    async def _run(self) -> None:
+        while True:
+            # Сброс до выборки: set() от кадров, пришедших во время ожидания
+            # токенов, не теряется
+            self._wakeup.clear()
+            window = await self._next_window()
+            if not window:
+                await self._wakeup.wait()
+                continue
+
+            sent = 0
+            try:
+                # Соединение проверяется один раз на пачку из нескольких окон
+                await self._connect()
+                while window:
+                    await self._send_window(window)
+                    sent += len(window)
+                    if sent >= WRITE_BATCH_SIZE:
+                        break
+                    window = await self._next_window()
+            except asyncio.CancelledError:
+                for _, fut in window:
+                    if not fut.done():
+                        fut.cancel()
+                raise
+            except Exception as err:
+                LOGGER.debug("%s: write batch failed: %s", self._name, err)
+                for _, fut in window:
+                    if not fut.done():
+                        fut.set_exception(err)
+
+    async def _send_window(self, window: list[tuple[bytes, asyncio.Future]]) -> None:
+        # Задачи стартуют в порядке создания — порядок кадров сохраняется
+        results = await asyncio.gather(
+            *(self._send(frame) for frame, _ in window), return_exceptions=True
+        )
+        error: BaseException | None = None
+        for (_, fut), res in zip(window, results):
+            if isinstance(res, BaseException):
+                error = error or res
+                if not fut.done():
+                    fut.set_exception(res)
+            elif not fut.done():
+                fut.set_result(None)
+        if error is not None:
+            raise error
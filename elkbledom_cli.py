@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+💡 elkbledom_cli.py — Управление контроллерами ELK-BLEDOM без Home Assistant
+Автор: Satimaro
+
+Использует ядро интеграции (custom_components/elkbledom_fastlink) как обычную
+asyncio-библиотеку: поиск устройств — через BleakScanner, состояние —
+в JSON-файле. Нужны только bleak и bleak-retry-connector.
+
+    python elkbledom_cli.py scan
+    python elkbledom_cli.py -a BE:16:83:00:16:21 on
+    python elkbledom_cli.py -a BE:16:83:00:16:21 -a BE:16:83:00:16:22 color 255 80 0
+    python elkbledom_cli.py -a ... effect crossfade_red --speed 10 --sync
+    python elkbledom_cli.py -a ... raw 7E0005030000FF00EF@50 7E00050300FF0000EF
+    python elkbledom_cli.py -a ... bench --frames 500 --rate 60
+    python elkbledom_cli.py -a ... realtime --protocol e131 --universe 1 --channel 1
+    python elkbledom_cli.py -a ... audio /tmp/music.fifo --mode spectrum
+
+Из своего кода:
+    from elkbledom_cli import load_core
+    core = load_core()
+    instance = core.elkbledom.BLEDOMInstance(address, False, 0, resolver, store)
+"""
+
+import argparse
+import asyncio
+import colorsys
+import importlib
+import json
+import logging
+import os
+import sys
+import time
+import types
+
+PACKAGE = "elkbledom_fastlink"
+CORE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "custom_components", PACKAGE)
+DEFAULT_STATE = "~/.config/elkbledom/state.json"
+
+_LOGGER = logging.getLogger("elkbledom_cli")
+
+
+# -----------------------------------------------
+# Загрузка ядра без Home Assistant
+# -----------------------------------------------
+def load_core(path: str = CORE_DIR) -> types.SimpleNamespace:
+    """Импортирует модули ядра как пакет elkbledom_fastlink, минуя его __init__.py.
+
+    __init__.py — точка входа интеграции HA и импортирует homeassistant;
+    модули ядра (elkbledom, backend, models, writer, ...) от HA не зависят.
+    """
+    if PACKAGE not in sys.modules:
+        package = types.ModuleType(PACKAGE)
+        package.__path__ = [path]
+        sys.modules[PACKAGE] = package
+    return types.SimpleNamespace(
+        **{name: importlib.import_module(f"{PACKAGE}.{name}") for name in ("airtime", "audio", "backend", "const", "elkbledom", "models", "realtime")}
+    )
+
+
+# -----------------------------------------------
+# Команды
+# -----------------------------------------------
+def _bench_frames(count: int) -> list[bytes]:
+    """Плавный круг оттенков — каждый кадр отличается от предыдущего."""
+    frames = []
+    for i in range(count):
+        r, g, b = (int(c * 255) for c in colorsys.hsv_to_rgb(i / max(count, 1), 1.0, 1.0))
+        frames.append(bytes([0x7E, 0x00, 0x05, 0x03, r, g, b, 0x00, 0xEF]))
+    return frames
+
+
+async def _run_command(core, inst, args) -> dict:
+    cmd = args.command
+    if cmd == "on":
+        await inst.turn_on()
+    elif cmd == "off":
+        await inst.turn_off()
+    elif cmd == "color":
+        await inst.set_color((args.r, args.g, args.b))
+    elif cmd == "brightness":
+        await inst.set_brightness(args.value)
+    elif cmd == "temp":
+        await inst.set_color_temp_kelvin(args.kelvin)
+    elif cmd == "effect":
+        if args.speed is not None:
+            await inst.set_effect_speed(args.speed)
+        await inst.set_effect(_effect_id(core, args.name))
+    elif cmd == "raw":
+        frames = core.elkbledom.parse_frame_stream(args.frames, args.delay)
+        return await inst.stream_frames(frames, args.max_rate)
+    elif cmd == "bench":
+        frames = [(frame, 0.0) for frame in _bench_frames(args.frames)]
+        return await inst.stream_frames(frames, args.rate)
+    return {"ok": True}
+
+
+def _effect_id(core, name: str) -> int:
+    key = core.const.EFFECT_LABEL_TO_KEY.get(name, name)
+    if key not in core.const.EFFECTS_MAP:
+        raise SystemExit(f"Unknown effect: {name} (one of: {', '.join(core.const.EFFECTS_MAP)})")
+    return core.const.EFFECTS_MAP[key]
+
+
+async def _async_scan(core, args) -> int:
+    resolver = core.backend.ScannerResolver()
+    devices = await resolver.async_scan(args.timeout)
+    for device in sorted(devices, key=lambda d: d.address):
+        if core.models.is_supported_name(device.name):
+            print(f"{device.address}  {device.name:<16} {core.models.profile_for_name(device.name).name}")
+    return 0
+
+
+async def _async_realtime(core, instances, args) -> None:
+    """Приём E1.31 / DDP до Ctrl+C; порядок -a — порядок пикселей."""
+    by_address = {inst.address: inst for inst in instances}
+    receiver = core.realtime.RealtimeReceiver(
+        list(by_address), by_address.get, args.protocol, args.universe, args.channel, args.port
+    )
+    await receiver.async_start()
+    print(f"Listening for {args.protocol} on UDP {receiver.port}, Ctrl+C to stop", file=sys.stderr)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await receiver.stop()
+        print(json.dumps(receiver.diagnostics(), indent=2), file=sys.stderr)
+
+
+async def _async_audio(core, instances, args) -> None:
+    """Светомузыка до конца источника или Ctrl+C; порядок -a — порядок полос."""
+    by_address = {inst.address: inst for inst in instances}
+    engine = core.audio.AudioReactive(
+        list(by_address), by_address.get, args.source, args.mode, args.rate, args.channels
+    )
+    await engine.async_start()
+    try:
+        while engine.running:
+            await asyncio.sleep(0.2)
+    finally:
+        await engine.stop()
+        print(json.dumps(engine.diagnostics(), indent=2), file=sys.stderr)
+
+
+async def _async_main(args) -> int:
+    core = load_core()
+    if args.command == "scan":
+        return await _async_scan(core, args)
+    if not args.address:
+        raise SystemExit("At least one --address is required")
+
+    addresses = list(dict.fromkeys(a.upper() for a in args.address))
+    resolver = core.backend.ScannerResolver()
+    await resolver.async_scan(args.timeout, set(addresses))
+    store = core.backend.JsonFileStore(os.path.expanduser(args.state))
+    airtime = core.airtime.AirtimeScheduler(rate=args.airtime) if args.airtime else None
+
+    instances = []
+    for address in addresses:
+        try:
+            instances.append(core.elkbledom.BLEDOMInstance(address, False, 0, resolver, store, airtime=airtime))
+        except core.backend.DeviceNotFound as e:
+            print(f"{address}: {e}", file=sys.stderr)
+    if not instances:
+        return 1
+
+    results: dict[str, dict] = {}
+    try:
+        # Подключаемся ко всем сразу; время подключения — часть отчёта bench
+        async def _connect(inst) -> None:
+            started = time.perf_counter()
+            if await inst.connect():
+                results[inst.address] = {"connect_s": round(time.perf_counter() - started, 3)}
+            else:
+                results[inst.address] = {"ok": False, "error": "connection failed"}
+
+        await asyncio.gather(*(_connect(inst) for inst in instances))
+        ready = [inst for inst in instances if results[inst.address].get("ok", True)]
+
+        if args.command == "realtime":
+            await _async_realtime(core, ready, args)
+        elif args.command == "audio":
+            await _async_audio(core, ready, args)
+        elif args.command == "effect" and args.sync and len(ready) > 1:
+            report = await core.elkbledom.async_sync_effect(ready, _effect_id(core, args.name), args.speed)
+            for address, entry in report["devices"].items():
+                results[address].update(entry)
+        else:
+            outcomes = await asyncio.gather(*(_run_command(core, inst, args) for inst in ready), return_exceptions=True)
+            for inst, outcome in zip(ready, outcomes):
+                if isinstance(outcome, BaseException):
+                    results[inst.address].update(ok=False, error=str(outcome) or type(outcome).__name__)
+                else:
+                    results[inst.address].update(outcome)
+    finally:
+        await asyncio.gather(*(inst.stop() for inst in instances), return_exceptions=True)
+
+    print(json.dumps(results, indent=2, ensure_ascii=False))
+    return 0 if all(r.get("ok", True) for r in results.values()) else 1
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Control ELK-BLEDOM controllers without Home Assistant")
+    parser.add_argument("-a", "--address", action="append", default=[], help="controller MAC (repeatable)")
+    parser.add_argument("--timeout", type=float, default=10.0, help="scan timeout, seconds")
+    parser.add_argument("--state", default=DEFAULT_STATE, help="state file (last color, GATT cache)")
+    parser.add_argument("--airtime", type=float, default=None, help="writes/s budget per adapter (off by default)")
+    parser.add_argument("-v", "--verbose", action="store_true")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("scan", help="list supported controllers in range")
+    sub.add_parser("on")
+    sub.add_parser("off")
+    p = sub.add_parser("color")
+    for channel in ("r", "g", "b"):
+        p.add_argument(channel, type=int, choices=range(256), metavar=channel.upper())
+    p = sub.add_parser("brightness")
+    p.add_argument("value", type=int, choices=range(256), metavar="0-255")
+    p = sub.add_parser("temp")
+    p.add_argument("kelvin", type=int)
+    p = sub.add_parser("effect")
+    p.add_argument("name", help="effect key or label, e.g. crossfade_red")
+    p.add_argument("--speed", type=int)
+    p.add_argument("--sync", action="store_true", help="start in phase on all devices")
+    p = sub.add_parser("raw", help="send raw frames and print timing statistics")
+    p.add_argument("frames", nargs="+", help='hex frames, "@<ms>" suffix sets the pause after a frame')
+    p.add_argument("--delay", type=float, default=0.0, help="default pause after each frame, ms")
+    p.add_argument("--max-rate", type=float, default=None, help="frames per second")
+    p = sub.add_parser("bench", help="stream color frames and print throughput and latency")
+    p.add_argument("--frames", type=int, default=300)
+    p.add_argument("--rate", type=float, default=None, help="frames per second (unlimited by default)")
+    p = sub.add_parser("realtime", help="drive controllers from E1.31 (sACN) / DDP until Ctrl+C")
+    p.add_argument("--protocol", choices=["e131", "ddp"], default="e131")
+    p.add_argument("--port", type=int, default=None, help="UDP port (5568 / 4048 by default)")
+    p.add_argument("--universe", type=int, default=1)
+    p.add_argument("--channel", type=int, default=1, help="start channel of the first controller")
+    p = sub.add_parser("audio", help="audio-reactive colors from a PCM FIFO, WAV file or ffmpeg URL")
+    p.add_argument("source", help="FIFO / raw s16le file / 16-bit WAV / URL for ffmpeg")
+    p.add_argument("--mode", choices=["bands", "spectrum"], default="bands")
+    p.add_argument("--rate", type=int, default=44100, help="sample rate of raw PCM")
+    p.add_argument("--channels", type=int, default=1, help="channel count of raw PCM")
+
+    args = parser.parse_args()
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.WARNING,
+        format="%(asctime)s | %(levelname)-8s | %(message)s",
+        datefmt="%H:%M:%S",
+    )
+    sys.exit(asyncio.run(_async_main(args)))
+
+
+if __name__ == "__main__":
+    main()
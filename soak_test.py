@@ -0,0 +1,389 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+🧪 soak_test.py — Нагрузочный прогон интеграции на сотнях симулированных контроллеров
+Автор: Satimaro
+
+Запускает много настоящих BLEDOMInstance против программных «периферий»
+с внедрёнными сбоями: разрывами связи, медленными и неудачными подключениями,
+ошибками записи. Раз в интервал печатает задержку event loop, число задач,
+память, записи файла состояния и задержку команд — регрессии масштабирования
+видны до того, как доедут до объектов.
+
+Home Assistant не нужен — ядро грузится как в elkbledom_cli.py; нужен bleak:
+    python soak_test.py --devices 150 --duration 600 --disconnect-rate 0.002 \\
+        --slow-connect 0.1 --connect-fail 0.05 --write-fail 0.01 --json soak.json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, field
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bleak.exc import BleakError  # noqa: E402
+
+from elkbledom_cli import load_core  # noqa: E402
+
+CORE = load_core()
+core = CORE.elkbledom
+EFFECTS_MAP = CORE.const.EFFECTS_MAP
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s | %(levelname)-8s | %(message)s",
+    datefmt="%H:%M:%S",
+)
+_LOGGER = logging.getLogger("soak")
+
+SERVICE_UUID = "0000fff0-0000-1000-8000-00805f9b34fb"
+LAG_PROBE_INTERVAL = 0.05  # сек; период замера задержки event loop
+
+
+# -----------------------------------------------
+# Параметры сбоев и накопитель метрик
+# -----------------------------------------------
+@dataclass(slots=True)
+class Faults:
+    disconnect_rate: float  # разрывов на устройство в секунду
+    slow_connect: float  # доля подключений с дополнительной задержкой
+    slow_connect_s: float
+    connect_fail: float  # доля неудачных подключений
+    write_fail: float  # доля неудачных записей
+    write_latency_ms: float
+
+
+@dataclass(slots=True)
+class Metrics:
+    """Счётчики за текущий интервал отчёта (сбрасываются) и за весь прогон."""
+
+    lag: list[float] = field(default_factory=list)
+    cmd_latency: list[float] = field(default_factory=list)
+    cmd_errors: int = 0
+    connects: int = 0
+    connect_failures: int = 0
+    disconnects: int = 0
+    disk_writes: int = 0
+    disk_write_time: float = 0.0
+    totals: dict = field(default_factory=lambda: {"commands": 0, "cmd_errors": 0, "disk_writes": 0})
+
+    def reset_interval(self) -> None:
+        self.totals["commands"] += len(self.cmd_latency) + self.cmd_errors
+        self.totals["cmd_errors"] += self.cmd_errors
+        self.totals["disk_writes"] += self.disk_writes
+        self.lag.clear()
+        self.cmd_latency.clear()
+        self.cmd_errors = self.connects = self.connect_failures = self.disconnects = 0
+        self.disk_writes = 0
+        self.disk_write_time = 0.0
+
+
+def _percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+def _rss_mb() -> float:
+    """Текущий RSS процесса (Linux), иначе пиковый."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+# -----------------------------------------------
+# Симулированная периферия
+# -----------------------------------------------
+class FakeCharacteristic:
+    def __init__(self, uuid: str, handle: int, properties: list[str]) -> None:
+        self.uuid = uuid
+        self.handle = handle
+        self.properties = properties
+
+
+class FakeServices:
+    """Минимальная таблица GATT контроллера: fff3 (запись) и fff4 (уведомления)."""
+
+    def __init__(self) -> None:
+        self.characteristics = [
+            FakeCharacteristic(core.WRITE_CHARACTERISTIC_UUIDS[0], 0x0D, ["write-without-response", "write"]),
+            FakeCharacteristic(core.NOTIFY_CHARACTERISTIC_UUID, 0x10, ["notify"]),
+        ]
+        self.uuid = SERVICE_UUID
+
+    def __iter__(self):
+        return iter([self])
+
+    def get_characteristic(self, key):
+        for ch in self.characteristics:
+            if key == ch.handle or str(key).lower() == ch.uuid:
+                return ch
+        return None
+
+
+class FakeClient:
+    """Одно соединение с периферией; после разрыва больше не используется."""
+
+    def __init__(self, peripheral: "FakePeripheral", disconnected_callback) -> None:
+        self._peripheral = peripheral
+        self._disconnected_callback = disconnected_callback
+        self._notify = None
+        self.services = FakeServices()
+        self.is_connected = True
+
+    def drop(self) -> None:
+        """Разрыв со стороны контроллера (или эфира)."""
+        if self.is_connected:
+            self.is_connected = False
+            if self._disconnected_callback:
+                self._disconnected_callback(self)
+
+    async def disconnect(self) -> None:
+        self.drop()
+
+    async def clear_cache(self) -> None:
+        pass
+
+    async def read_gatt_char(self, _char) -> bytes:
+        raise BleakError("characteristic not readable")
+
+    async def start_notify(self, _char, callback) -> None:
+        self._notify = callback
+
+    async def stop_notify(self, _char) -> None:
+        self._notify = None
+
+    async def write_gatt_char(self, _char, data, response: bool = False) -> None:
+        faults = self._peripheral.faults
+        if not self.is_connected:
+            raise BleakError("not connected")
+        await asyncio.sleep(faults.write_latency_ms / 1000 * random.uniform(0.5, 1.5) * (2 if response else 1))
+        if random.random() < faults.write_fail:
+            raise BleakError("injected write failure")
+        data = bytes(data)
+        if data[2:3] == b"\x81" and self._notify:
+            # Ответ на запрос статуса: яркость из последнего нативного кадра
+            self._notify(None, bytearray([0x66, 0x01, self._peripheral.brightness_pct, 0x00, 0x99]))
+        elif data[1:3] == b"\x04\x01":
+            self._peripheral.brightness_pct = data[3]
+
+
+class FakePeripheral:
+    def __init__(self, address: str, name: str, faults: Faults, metrics: Metrics) -> None:
+        self.device = SimpleNamespace(address=address, name=name)
+        self.faults = faults
+        self.metrics = metrics
+        self.brightness_pct = 100
+        self.client: FakeClient | None = None
+
+    async def connect(self, disconnected_callback) -> FakeClient:
+        self.metrics.connects += 1
+        delay = random.uniform(0.3, 1.0)
+        if random.random() < self.faults.slow_connect:
+            delay += self.faults.slow_connect_s
+        await asyncio.sleep(delay)
+        if random.random() < self.faults.connect_fail:
+            self.metrics.connect_failures += 1
+            raise BleakError("injected connect failure")
+        self.client = FakeClient(self, disconnected_callback)
+        return self.client
+
+
+class SoakResolver:
+    """Устройства — симулированные периферии; рекламы нет."""
+
+    def __init__(self, peripherals: dict[str, FakePeripheral]) -> None:
+        self._peripherals = peripherals
+
+    def resolve(self, address: str):
+        return self._peripherals[address].device
+
+    def watch(self, _address, _on_seen):
+        return lambda: None
+
+
+class CountingStore(CORE.backend.JsonFileStore):
+    """Настоящий JSON-файл состояния; дополнительно считает записи."""
+
+    def __init__(self, path: str, metrics: Metrics) -> None:
+        super().__init__(path)
+        self.metrics = metrics
+
+    def save(self, address: str, payload: dict) -> None:
+        started = time.perf_counter()
+        super().save(address, payload)
+        self.metrics.disk_writes += 1
+        self.metrics.disk_write_time += time.perf_counter() - started
+
+
+# -----------------------------------------------
+# Нагрузка и сбои
+# -----------------------------------------------
+async def inject_disconnects(peripherals: list[FakePeripheral], faults: Faults, metrics: Metrics) -> None:
+    while True:
+        await asyncio.sleep(1.0)
+        for peripheral in peripherals:
+            client = peripheral.client
+            if client and client.is_connected and random.random() < faults.disconnect_rate:
+                metrics.disconnects += 1
+                client.drop()
+
+
+async def drive_device(inst: core.BLEDOMInstance, rate: float, metrics: Metrics) -> None:
+    """Случайные команды с экспоненциальными интервалами (в среднем rate в секунду)."""
+    effects = list(EFFECTS_MAP.values())
+    commands = (
+        lambda: inst.set_color((random.randrange(256), random.randrange(256), random.randrange(256))),
+        lambda: inst.set_brightness(random.randint(1, 255)),
+        lambda: inst.set_color_temp_kelvin(random.randint(2700, 6500)),
+        lambda: inst.set_effect(random.choice(effects)),
+        inst.turn_on,
+        inst.turn_off,
+    )
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(random.expovariate(rate))
+        started = loop.time()
+        try:
+            await random.choice(commands)()
+            metrics.cmd_latency.append(loop.time() - started)
+        except Exception:
+            metrics.cmd_errors += 1
+
+
+async def monitor_lag(metrics: Metrics) -> None:
+    loop = asyncio.get_running_loop()
+    while True:
+        started = loop.time()
+        await asyncio.sleep(LAG_PROBE_INTERVAL)
+        metrics.lag.append(loop.time() - started - LAG_PROBE_INTERVAL)
+
+
+# -----------------------------------------------
+# Прогон
+# -----------------------------------------------
+async def run(args: argparse.Namespace) -> list[dict]:
+    faults = Faults(
+        disconnect_rate=args.disconnect_rate,
+        slow_connect=args.slow_connect,
+        slow_connect_s=args.slow_connect_s,
+        connect_fail=args.connect_fail,
+        write_fail=args.write_fail,
+        write_latency_ms=args.write_latency,
+    )
+    metrics = Metrics()
+
+    peripherals = [
+        FakePeripheral(
+            f"AA:BB:CC:{i >> 16 & 0xFF:02X}:{i >> 8 & 0xFF:02X}:{i & 0xFF:02X}",
+            "MELK-OG10W" if i % 10 == 9 else "ELK-BLEDDM",
+            faults,
+            metrics,
+        )
+        for i in range(args.devices)
+    ]
+    by_address = {p.device.address: p for p in peripherals}
+
+    async def _establish_connection(_client_class, device, _name, disconnected_callback=None, **_kwargs):
+        return await by_address[device.address].connect(disconnected_callback)
+
+    # Подключение — то же имя, что импортирует elkbledom.py
+    core.establish_connection = _establish_connection
+
+    resolver = SoakResolver(by_address)
+    store = CountingStore(os.path.join(args.state_dir, "elkbledom_fastlink_state.json"), metrics)
+    instances = [core.BLEDOMInstance(p.device.address, False, 0, resolver, store) for p in peripherals]
+    workers = [asyncio.create_task(monitor_lag(metrics)), asyncio.create_task(inject_disconnects(peripherals, faults, metrics))]
+    workers += [asyncio.create_task(drive_device(inst, args.rate, metrics)) for inst in instances]
+
+    series: list[dict] = []
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    _LOGGER.info(
+        "%5s | %-20s | %5s | %4s | %4s | %7s | %-19s | %-20s | %s",
+        "t,s", "loop lag p50/p99/max", "tasks", "conn", "down", "RSS MB",
+        "disk writes/s, ms", "cmd p50/p95/max, ms", "errors / connects / drops",
+    )
+    try:
+        while loop.time() - started < args.duration:
+            await asyncio.sleep(args.interval)
+            row = {
+                "t": round(loop.time() - started, 1),
+                "lag_ms": [round(_percentile(metrics.lag, q) * 1000, 1) for q in (0.5, 0.99, 1.0)],
+                "tasks": len(asyncio.all_tasks()),
+                "connected": sum(inst.is_connected for inst in instances),
+                "unavailable": sum(not inst.available for inst in instances),
+                "rss_mb": round(_rss_mb(), 1),
+                "disk_writes_per_s": round(metrics.disk_writes / args.interval, 1),
+                "disk_write_ms_avg": round(metrics.disk_write_time / metrics.disk_writes * 1000, 2) if metrics.disk_writes else 0.0,
+                "cmd_ms": [round(_percentile(metrics.cmd_latency, q) * 1000, 1) for q in (0.5, 0.95, 1.0)],
+                "cmd_errors": metrics.cmd_errors,
+                "connects": metrics.connects,
+                "connect_failures": metrics.connect_failures,
+                "disconnects": metrics.disconnects,
+            }
+            series.append(row)
+            _LOGGER.info(
+                "%5.0f | %-20s | %5d | %4d | %4d | %7.1f | %6.1f/s %7.2f ms | %-20s | %d / %d (%d failed) / %d",
+                row["t"], "/".join(map(str, row["lag_ms"])), row["tasks"], row["connected"],
+                row["unavailable"], row["rss_mb"], row["disk_writes_per_s"], row["disk_write_ms_avg"],
+                "/".join(map(str, row["cmd_ms"])), row["cmd_errors"], row["connects"],
+                row["connect_failures"], row["disconnects"],
+            )
+            metrics.reset_interval()
+    finally:
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        await asyncio.gather(*(inst.stop() for inst in instances), return_exceptions=True)
+        metrics.reset_interval()
+        _LOGGER.info("Totals: %s", metrics.totals)
+    return series
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Soak test for elkbledom_fastlink with simulated controllers")
+    parser.add_argument("--devices", type=int, default=150)
+    parser.add_argument("--duration", type=float, default=300, help="seconds")
+    parser.add_argument("--interval", type=float, default=10, help="report interval, seconds")
+    parser.add_argument("--rate", type=float, default=0.2, help="commands per device per second")
+    parser.add_argument("--disconnect-rate", type=float, default=0.002, help="drops per device per second")
+    parser.add_argument("--slow-connect", type=float, default=0.05, help="share of slow connects")
+    parser.add_argument("--slow-connect-s", type=float, default=8.0, help="extra delay of a slow connect")
+    parser.add_argument("--connect-fail", type=float, default=0.02, help="share of failed connects")
+    parser.add_argument("--write-fail", type=float, default=0.005, help="share of failed writes")
+    parser.add_argument("--write-latency", type=float, default=15.0, help="mean write latency, ms")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--state-dir", default=None, help="directory for the state file (temp by default)")
+    parser.add_argument("--json", default=None, help="write the per-interval series to this file")
+    parser.add_argument("--verbose", action="store_true", help="show integration log messages")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    logging.getLogger("elkbledom_fastlink").setLevel(logging.INFO if args.verbose else logging.CRITICAL)
+
+    with tempfile.TemporaryDirectory(prefix="elkbledom_soak_") as tmp:
+        args.state_dir = args.state_dir or tmp
+        series = asyncio.run(run(args))
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "series": series}, f, indent=2)
+        _LOGGER.info("Series written to %s", args.json)
+
+
+if __name__ == "__main__":
+    main()